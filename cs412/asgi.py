@@ -2,6 +2,8 @@
 ASGI config for cs412 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is how the site is served (see Procfile), so the live update streams in
+tide/events.py hold a coroutine per connected client instead of a worker thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -143,3 +143,98 @@ LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'dashboard'
 
 OPENWEATHER_API_KEY = config('OPENWEATHER_API_KEY')
+
+# Caching. Each worker gets an in-memory cache by default; set REDIS_URL to share
+# cached upstream responses (NOAA, weather, geocoding) across workers. The warm_caches
+# worker (see Procfile) runs in its own process, so it needs REDIS_URL to be of any use.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "we-tide",
+    }
+}
+if config('REDIS_URL', default=''):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config('REDIS_URL'),
+    }
+
+# Entries that are deleted when their data changes (friend id sets, the spot facets) are
+# only deleted in the worker that made the change when the cache is in-memory, so there
+# they are kept for at most this many seconds.
+PROCESS_LOCAL_CACHE_TTL = 30
+
+# NOAA response cache: seconds an entry is fresh, per product, and how long an
+# expired entry may still be served while it is refreshed in the background.
+NOAA_CACHE_TTLS = {
+    'water_level': 6 * 60,
+    'predictions': 24 * 60 * 60,
+}
+NOAA_CACHE_STALE_TTL = 60 * 60
+
+# Geocoding cache: found addresses are kept for 30 days, unknown ones for a day.
+GEOCODE_CACHE_TTL = 30 * 24 * 60 * 60
+GEOCODE_NEGATIVE_TTL = 24 * 60 * 60
+GEOCODE_LRU_SIZE = 1024
+
+# Weather cache: coordinates are bucketed into grid cells of this many degrees,
+# and each cell's current conditions are reused for WEATHER_CACHE_TTL seconds.
+WEATHER_GRID_RESOLUTION = 0.05
+WEATHER_CACHE_TTL = 10 * 60
+
+# Upstream APIs: (connect, read) timeouts per provider, and the circuit breaker that
+# fails fast after repeated timeouts or 5xx responses and retries after reset_timeout.
+UPSTREAM_TIMEOUTS = {
+    'noaa': (3.05, 10),
+    'openweather': (3.05, 5),
+    'google_geocoding': (3.05, 5),
+}
+UPSTREAM_BREAKER = {
+    'failure_threshold': 5,
+    'reset_timeout': 30,
+}
+
+# News feed: posts are copied into each recipient's FeedEntry timeline when written,
+# unless they would reach more than FEED_FANOUT_LIMIT profiles, in which case a single
+# broadcast entry is read by everyone. New profiles start with FEED_BACKFILL_LIMIT posts.
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_LIMIT = 200
+
+# Friend suggestions: candidates are scored by mutual friends, shared NOAA stations and
+# spot proximity; the best FRIEND_SUGGESTIONS_TOP_K per profile are stored and refreshed
+# by the refresh_friend_suggestions command.
+FRIEND_SUGGESTIONS_TOP_K = 20
+
+# Status cards: the rendered HTML of each status message in feeds and on profiles is
+# cached under a versioned key for this many seconds (edits bump the version).
+STATUS_CARD_CACHE_TTL = 24 * 60 * 60
+
+# Live updates: server-sent event streams (served through cs412/asgi.py) are fed by an
+# in-process broker. With several worker processes on Postgres, use
+# 'tide.events.PostgresBroker' so events reach clients connected to any worker.
+EVENT_BROKER = 'tide.events.LocalBroker'
+EVENT_QUEUE_SIZE = 100
+EVENT_HEARTBEAT = 15
+EVENT_STREAM_MAX_AGE = 10 * 60
+
+# Public surf session browser: the deduplicated spot list behind its dropdown is cached
+# for this many seconds (PROCESS_LOCAL_CACHE_TTL at most with an in-memory cache), and
+# dropped whenever a spot is saved or deleted.
+SPOT_FACETS_CACHE_TTL = 60 * 60
+
+# Session reports are read from the rollup tables (see tide/rollups.py): per user and per
+# spot by month over the last SESSION_REPORT_MONTHS months, and per station by day over
+# the last SESSION_REPORT_DAYS days.
+SESSION_REPORT_MONTHS = 12
+SESSION_REPORT_DAYS = 30
+
+# Logbook import: uploaded CSV/JSON Lines files are validated and written this many rows
+# per transaction, so imports of any size run in constant memory.
+SESSION_IMPORT_BATCH_SIZE = 500
+
+# Session conditions: a tide, moon and wind snapshot is captured for each new surf session
+# after it commits, on SESSION_CONDITIONS_WORKERS background threads (False runs it in
+# the committing thread). backfill_session_conditions fills older sessions in batches.
+SESSION_CONDITIONS_ASYNC = True
+SESSION_CONDITIONS_WORKERS = 2
+SESSION_CONDITIONS_BATCH_SIZE = 200
@@ -13,3 +13,11 @@ admin.site.register(StatusMessage)
 admin.site.register(Image)
 admin.site.register(SurfSession)
 admin.site.register(SurfSpot)
+admin.site.register(GeocodeCacheEntry)
+admin.site.register(FeedEntry)
+admin.site.register(FriendSuggestion)
+admin.site.register(FriendSuggestionRefresh)
+admin.site.register(SearchDocument)
+admin.site.register(SurfSessionMonthlyRollup)
+admin.site.register(StationDailyRollup)
+admin.site.register(SurfSessionConditions)
@@ -8,3 +8,6 @@ from django.apps import AppConfig
 class TideConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tide'
+
+    def ready(self):
+        from . import signals  # noqa: F401  connects the news feed signal handlers
@@ -0,0 +1,263 @@
+# File: cache.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Caching helpers shared by the views that call upstream APIs (NOAA, OpenWeather, Google).
+
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Cache backends whose entries live in one process's memory: nothing written or deleted
+# in one worker (or the warm_caches process) is seen by the others.
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+DEFAULT_PROCESS_LOCAL_TTL = 30
+
+
+def cache_is_process_local(alias='default'):
+    """True if the cache called alias isn't shared between processes."""
+    return settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_BACKENDS
+
+
+def invalidated_ttl(ttl, alias='default'):
+    """
+    The TTL for an entry that is deleted when its data changes rather than left to expire.
+    In a process-local cache the delete only reaches the process that made the change, so
+    there the entry is kept at most PROCESS_LOCAL_CACHE_TTL seconds, which bounds how long
+    the other workers can serve it stale.
+    """
+    if cache_is_process_local(alias):
+        return min(ttl, getattr(settings, 'PROCESS_LOCAL_CACHE_TTL', DEFAULT_PROCESS_LOCAL_TTL))
+    return ttl
+
+
+class CacheStats:
+    """Thread-safe counters (hits, misses, stale serves, ...) for one cache."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        """Increase the counter called name by amount."""
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self):
+        """
+        Return a copy of the counters plus the share of lookups that did not need their
+        own upstream call (hits, stale serves and misses coalesced onto another fetch).
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts.get('hit', 0) + counts.get('stale', 0) + counts.get('miss', 0)
+        served = lookups - counts.get('miss', 0) + counts.get('coalesced', 0)
+        counts['hit_rate'] = served / lookups if lookups else 0.0
+        return counts
+
+    def reset(self):
+        """Set every counter back to zero."""
+        with self._lock:
+            self._counts.clear()
+
+
+class LocalLRUCache:
+    """
+    A small in-process LRU with a per-entry TTL, used in front of slower caches.
+    get() returns the default for missing or expired keys, so None can be cached.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the function and
+    every caller that arrives while it is running waits for, and shares, its result.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self, stats=None):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = stats
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers with this key and return its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            if self.stats is not None:
+                self.stats.incr('coalesced')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class StaleWhileRevalidateCache:
+    """
+    A TTL cache on top of a Django cache backend that keeps serving an expired
+    entry for up to stale_ttl seconds while a single background thread refreshes it.
+    Past that window the entry is kept for another fallback_ttl seconds as the last
+    good value, returned only when fetching a replacement fails.
+
+    Entries are stored as {'value': ..., 'fresh_until': epoch seconds}. The refresh
+    lock is taken with cache.add() so that, on a shared backend, only one worker
+    revalidates a given key at a time. Concurrent misses for the same key within a
+    process share one fetch.
+    """
+
+    def __init__(self, prefix, stale_ttl=60 * 60, alias='default', refresh_lock_ttl=30, fallback_ttl=24 * 60 * 60):
+        self.prefix = prefix
+        self.stale_ttl = stale_ttl
+        self.fallback_ttl = fallback_ttl
+        self.alias = alias
+        self.refresh_lock_ttl = refresh_lock_ttl
+        self.stats = CacheStats()
+        self._misses = SingleFlight(self.stats)
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def make_key(self, parts):
+        """Build a backend key from an iterable of key parts."""
+        return ':'.join([self.prefix, *(str(part) for part in parts)])
+
+    def get(self, key_parts, fetch, ttl):
+        """
+        Return the cached value for key_parts, calling fetch() on a miss.
+
+        Fresh entries are returned as-is. Expired entries that are still inside the
+        stale window are returned immediately and refreshed in the background. Anything
+        else is fetched; if that raises requests.exceptions.RequestException the last
+        good value is returned when one is kept, otherwise the exception propagates.
+        """
+        key = self.make_key(key_parts)
+        entry = self.backend.get(key)
+        now = time.time()
+
+        if entry is not None and entry['fresh_until'] > now:
+            self.stats.incr('hit')
+            return entry['value']
+        if entry is not None and entry['fresh_until'] + self.stale_ttl > now:
+            self.stats.incr('stale')
+            self._schedule_refresh(key, fetch, ttl)
+            return entry['value']
+
+        self.stats.incr('miss')
+        try:
+            return self._misses.do(key, lambda: self._fetch_and_store(key, fetch, ttl))
+        except requests.exceptions.RequestException as e:
+            if entry is None:
+                raise
+            self.stats.incr('fallback')
+            logger.warning("Fetching %s failed (%s); serving the last good value", key, e)
+            return entry['value']
+
+    def set(self, key_parts, value, ttl):
+        """Store value under key_parts as fresh for ttl seconds."""
+        self._store(self.make_key(key_parts), value, ttl)
+
+    def peek(self, key_parts):
+        """Return the cached value for key_parts (fresh, stale or last good) without fetching, or None."""
+        entry = self.backend.get(self.make_key(key_parts))
+        return entry['value'] if entry is not None else None
+
+    def warm(self, key_parts, fetch, ttl, min_fresh=0):
+        """
+        Fetch and store key_parts unless its entry stays fresh for at least min_fresh more
+        seconds. Returns True when fetch() was called. Used by the cache-warming worker.
+        """
+        key = self.make_key(key_parts)
+        entry = self.backend.get(key)
+        if entry is not None and entry['fresh_until'] - min_fresh > time.time():
+            self.stats.incr('warm_skip')
+            return False
+        self._misses.do(key, lambda: self._fetch_and_store(key, fetch, ttl))
+        self.stats.incr('warm')
+        return True
+
+    def _store(self, key, value, ttl):
+        entry = {'value': value, 'fresh_until': time.time() + ttl}
+        self.backend.set(key, entry, timeout=ttl + self.stale_ttl + self.fallback_ttl)
+
+    def _fetch_and_store(self, key, fetch, ttl):
+        value = fetch()
+        self._store(key, value, ttl)
+        return value
+
+    def _schedule_refresh(self, key, fetch, ttl):
+        lock_key = f'{key}:refreshing'
+        if not self.backend.add(lock_key, 1, timeout=self.refresh_lock_ttl):
+            return  # another thread or worker is already revalidating this key
+
+        def refresh():
+            try:
+                self._fetch_and_store(key, fetch, ttl)
+                self.stats.incr('refresh')
+            except Exception:
+                self.stats.incr('refresh_error')
+                logger.exception("Background refresh of %s failed; keeping stale value", key)
+            finally:
+                self.backend.delete(lock_key)
+
+        threading.Thread(target=refresh, name=f'refresh-{key}', daemon=True).start()
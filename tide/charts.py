@@ -0,0 +1,56 @@
+# File: charts.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Compact JSON chart payloads for tide series, rendered in the browser with plotly.js.
+
+import hashlib
+import json
+
+import numpy as np
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+
+CHART_MAX_AGE = 5 * 60
+
+
+def series_trace(series, name):
+    """
+    Encode a TideSeries as {'name', 't0', 'm', 'y'}: the first timestamp, integer minute
+    offsets from it and heights rounded to millimetres. This is a fraction of the size of
+    a label per sample, and the browser rebuilds the timestamps.
+    """
+    if not len(series):
+        return {'name': name, 't0': None, 'm': [], 'y': []}
+    offsets = (series.times - series.times[0]).astype(np.int64)
+    return {
+        'name': name,
+        't0': np.datetime_as_string(series.times[0], unit='m'),
+        'm': offsets.tolist(),
+        'y': np.round(series.heights, 3).tolist(),
+    }
+
+
+def chart_payload(traces, title):
+    """Build the JSON document the tide chart script expects."""
+    return {
+        'title': title,
+        'xaxis_title': "Time (GMT)",
+        'yaxis_title': "Tide Height (meters)",
+        'traces': traces,
+    }
+
+
+def chart_response(request, payload):
+    """
+    Return payload as JSON with a content-hash ETag, answering a matching
+    If-None-Match with 304 Not Modified.
+    """
+    body = json.dumps(payload, separators=(',', ':')).encode()
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=CHART_MAX_AGE)
+    return response
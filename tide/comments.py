@@ -0,0 +1,81 @@
+# File: comments.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Loads comment threads by materialized path and assembles them into trees in memory.
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from .models import Comment
+from .pagination import paginate
+
+# Levels of replies shown under a post before "Load more replies" takes over.
+DEFAULT_DISPLAY_DEPTH = 4
+REPLIES_PER_PAGE = 20
+
+
+def display_depth():
+    return getattr(settings, 'COMMENT_DISPLAY_DEPTH', DEFAULT_DISPLAY_DEPTH)
+
+
+def thread_queryset(max_depth=None):
+    """
+    Comments down to max_depth levels (0 is top-level), in thread order, with each
+    commenter's profile and user joined in. has_replies is annotated in the same query
+    so the deepest loaded comments know whether there is more below them.
+    """
+    max_depth = max_depth or display_depth()
+    return (
+        Comment.objects.filter(depth__lt=max_depth)
+        .select_related('profile__user')
+        .annotate(has_replies=Exists(Comment.objects.filter(parent_comment=OuterRef('pk'))))
+        .order_by('path')
+    )
+
+
+def build_tree(comments, max_depth=None):
+    """
+    Link comments sorted by path into a forest in one pass: every comment gets a
+    thread_replies list, and more_replies is True on comments at the depth limit
+    whose replies were not loaded. Returns the top-level comments. Comments whose
+    parent is not in the list (e.g. the first replies on a page) become roots.
+    """
+    max_depth = max_depth or display_depth()
+    nodes = {}
+    roots = []
+    for comment in comments:
+        comment.thread_replies = []
+        comment.more_replies = comment.depth + 1 >= max_depth and getattr(comment, 'has_replies', False)
+        nodes[comment.pk] = comment
+        parent = nodes.get(comment.parent_comment_id)
+        if parent is not None:
+            parent.thread_replies.append(comment)
+        else:
+            roots.append(comment)
+    return roots
+
+
+def load_thread(status_message, max_depth=None):
+    """Return the comment tree of one status message, read with a single query."""
+    comments = thread_queryset(max_depth).filter(status_message=status_message)
+    return build_tree(comments, max_depth)
+
+
+def attach_threads(status_messages, max_depth=None):
+    """
+    Set comment_tree on each status message from the comment_list loaded by
+    feed.feed_item_prefetches(), so a whole page of posts shares one comment query.
+    """
+    for status_message in status_messages:
+        status_message.comment_tree = build_tree(status_message.comment_list, max_depth)
+    return status_messages
+
+
+def replies_page(request, comment):
+    """
+    One page of everything below comment, in thread order, continued by ?cursor=.
+    Each reply carries indent, its depth relative to comment.
+    """
+    page = paginate(request, comment.get_descendants().select_related('profile__user'), ('path',), REPLIES_PER_PAGE)
+    for reply in page:
+        reply.indent = reply.depth - comment.depth
+    return page
@@ -0,0 +1,226 @@
+# File: conditions.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Captures a snapshot of tide, moon and wind conditions for each surf session, off the request path, and backfills old sessions in batches.
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timezone as dt_timezone
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.timezone import is_naive, make_aware
+
+from .models import SurfSession, SurfSessionConditions
+from .noaa import get_tide_data
+from .prediction import predict_day
+from .series import TideSeries
+from .weather import get_weather
+
+logger = logging.getLogger(__name__)
+
+# The moment a session logged on another day is described at: the tide is read at midday
+# UTC of its date, since sessions only record the day.
+SESSION_HOUR_UTC = 12
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_MAX_WORKERS = 4
+SNAPSHOT_FIELDS = [
+    field.name for field in SurfSessionConditions._meta.concrete_fields if not field.primary_key
+]
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'SESSION_CONDITIONS_WORKERS', 2),
+    thread_name_prefix='conditions',
+)
+
+
+def get_moon_phase(date):
+    """Calculate the moon phase for a given date."""
+    if is_naive(date):
+        date = make_aware(date)
+
+    base_date = make_aware(datetime(2000, 1, 6))
+    diff = (date - base_date).days
+    lunations = 29.53058867  # the average length of the lunar cycle in days
+    phase_index = (diff % lunations) / lunations
+
+    if phase_index < 0.03 or phase_index > 0.97:
+        phase_name = "New Moon"
+        phase_description = "Spring tides are strongest around this phase, with high highs and low lows."
+    elif 0.22 < phase_index < 0.28:
+        phase_name = "First Quarter"
+        phase_description = "Neap tides occur with moderate tidal ranges."
+    elif 0.47 < phase_index < 0.53:
+        phase_name = "Full Moon"
+        phase_description = "Spring tides occur, creating stronger tidal effects."
+    elif 0.72 < phase_index < 0.78:
+        phase_name = "Last Quarter"
+        phase_description = "Neap tides occur, with more moderate tidal ranges."
+    else:
+        phase_name = "Waxing or Waning Phase"
+        phase_description = "Tidal ranges are gradually changing."
+
+    return {'phase_name': phase_name, 'phase_description': phase_description, 'phase_index': phase_index}
+
+
+def observed_at(day, now=None):
+    """The moment a session on day is described at: now for today's sessions, else midday UTC."""
+    now = now or timezone.now()
+    if day == timezone.localdate(now):
+        return now
+    return datetime.combine(day, time(SESSION_HOUR_UTC), tzinfo=dt_timezone.utc)
+
+
+def day_series(station_id, day):
+    """
+    A station's tide heights over one UTC day: the harmonic prediction when we have its
+    constituents, else NOAA's observed water levels (or predictions for a future day).
+    Returns (series, source). Raises requests.exceptions.RequestException.
+    """
+    series = predict_day(station_id, datetime.combine(day, time()))
+    if series is not None:
+        return series, 'harmonic'
+    product = 'water_level' if day <= timezone.localdate() else 'predictions'
+    stamp = day.strftime('%Y%m%d')
+    return TideSeries.from_noaa(get_tide_data(station_id, stamp, stamp, product=product), station_id), 'noaa'
+
+
+def tide_fields(series, at):
+    """The tide height and trend at the sample nearest to at, and the day's highest and lowest water."""
+    if not len(series):
+        return {}
+    target = np.datetime64(at.astimezone(dt_timezone.utc).replace(tzinfo=None), 'm')
+    index = min(int(np.searchsorted(series.times, target)), len(series) - 1)
+    return {
+        'tide_height': round(float(series.heights[index]), 3),
+        'tide_trend': int(series.trend()[index]),
+        'high_tide': round(float(series.heights.max()), 3),
+        'low_tide': round(float(series.heights.min()), 3),
+    }
+
+
+def wind_fields(weather):
+    wind = weather.get('wind') or {}
+    return {'wind_speed': wind.get('speed'), 'wind_gust': wind.get('gust'), 'wind_direction': wind.get('deg')}
+
+
+def snapshot(surf_session_id, station_id, day, latitude, longitude, load_tide=day_series, now=None):
+    """
+    An unsaved SurfSessionConditions for a session at a station on day. load_tide(station_id,
+    day) supplies the tide series, so a batch can fetch each station-day once. Upstream
+    failures, and days the tide series comes back empty for, leave their fields empty and
+    the snapshot incomplete.
+    """
+    now = now or timezone.now()
+    at = observed_at(day, now)
+    moon = get_moon_phase(at)
+    conditions = SurfSessionConditions(
+        surf_session_id=surf_session_id,
+        observed_at=at,
+        moon_phase=moon['phase_name'],
+        moon_phase_index=round(moon['phase_index'], 3),
+    )
+    try:
+        series, conditions.tide_source = load_tide(station_id, day)
+        for field, value in tide_fields(series, at).items():
+            setattr(conditions, field, value)
+        if not len(series):
+            # NOAA answers 200 with an {"error": ...} body when a station has no data for the day
+            conditions.complete = False
+            logger.info("No tide data for session %s at %s on %s", surf_session_id, station_id, day)
+    except requests.exceptions.RequestException as e:
+        conditions.complete = False
+        logger.warning("Tide for session %s at %s on %s failed: %s", surf_session_id, station_id, day, e)
+    if day == timezone.localdate(now):
+        try:
+            for field, value in wind_fields(get_weather(latitude, longitude)).items():
+                setattr(conditions, field, value)
+        except requests.exceptions.RequestException as e:
+            conditions.complete = False
+            logger.warning("Weather for session %s failed: %s", surf_session_id, e)
+    return conditions
+
+
+def save(snapshots):
+    """Insert or replace snapshots in one statement."""
+    SurfSessionConditions.objects.bulk_create(
+        snapshots, update_conflicts=True, unique_fields=['surf_session'], update_fields=SNAPSHOT_FIELDS)
+
+
+def session_rows(queryset):
+    return queryset.values_list('pk', 'surf_spot__station_id', 'date', 'surf_spot__latitude', 'surf_spot__longitude')
+
+
+def capture(surf_session_id):
+    """Snapshot one session's conditions now. Returns the saved snapshot, or None if the session is gone."""
+    row = session_rows(SurfSession.objects.filter(pk=surf_session_id)).first()
+    if row is None:
+        return None
+    conditions = snapshot(*row)
+    save([conditions])
+    return conditions
+
+
+def _capture_in_background(surf_session_id):
+    try:
+        capture(surf_session_id)
+    except Exception:
+        logger.exception("Capturing conditions of session %s failed", surf_session_id)
+    finally:
+        connection.close()  # this worker thread's connection
+
+
+def capture_later(surf_session_id):
+    """
+    Snapshot a session's conditions once the current transaction commits, on a worker
+    thread so the request doesn't wait on NOAA or OpenWeather. With
+    SESSION_CONDITIONS_ASYNC = False it runs in the committing thread instead.
+    """
+    def submit():
+        if getattr(settings, 'SESSION_CONDITIONS_ASYNC', True):
+            _executor.submit(_capture_in_background, surf_session_id)
+        else:
+            capture(surf_session_id)
+
+    transaction.on_commit(submit)
+
+
+def prefetch_tides(keys, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Fetch the tide series of every (station_id, day) in keys with at most max_workers
+    requests in flight. Returns a load_tide for snapshot() that re-raises a failed fetch.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='conditions-backfill') as executor:
+        futures = {key: executor.submit(day_series, *key) for key in keys}
+
+    def load_tide(station_id, day):
+        return futures[(station_id, day)].result()
+
+    return load_tide
+
+
+def backfill(batch_size=None, limit=None, max_workers=DEFAULT_MAX_WORKERS, retry=True):
+    """
+    Snapshot every session without conditions (and, with retry, those whose snapshot is
+    incomplete), batch_size at a time in id order. Each batch fetches each distinct
+    (station, day) once and saves its snapshots in one statement. Returns
+    {'captured': n, 'incomplete': n}.
+    """
+    batch_size = batch_size or getattr(settings, 'SESSION_CONDITIONS_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    pending = SurfSession.objects.exclude(conditions__complete=True) if retry else SurfSession.objects.filter(conditions=None)
+    counts = {'captured': 0, 'incomplete': 0}
+    last_pk = 0
+    while limit is None or counts['captured'] < limit:
+        size = batch_size if limit is None else min(batch_size, limit - counts['captured'])
+        rows = list(session_rows(pending.filter(pk__gt=last_pk).order_by('pk'))[:size])
+        if not rows:
+            break
+        load_tide = prefetch_tides({(station_id, day) for _, station_id, day, _, _ in rows}, max_workers)
+        snapshots = [snapshot(*row, load_tide=load_tide) for row in rows]
+        save(snapshots)
+        last_pk = rows[-1][0]
+        counts['captured'] += len(snapshots)
+        counts['incomplete'] += sum(not conditions.complete for conditions in snapshots)
+    return counts
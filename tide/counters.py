@@ -0,0 +1,60 @@
+# File: counters.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Denormalized counter columns (comments per post, friends per profile, ...) kept up to date with F() updates and repaired in bulk.
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Friend, Profile, StatusMessage, SurfSession, SurfSpot
+
+
+def increment(model, pk, field, amount=1):
+    """
+    Add amount to one row's counter with a single UPDATE ... SET field = field + amount,
+    so concurrent writers never overwrite each other. Decrements stop at zero.
+    """
+    if pk is None or not amount:
+        return
+    rows = model.objects.filter(pk=pk)
+    if amount < 0:
+        rows = rows.filter(**{f'{field}__gte': -amount})
+    rows.update(**{field: F(field) + amount})
+
+
+def related_count(model, field):
+    """Subquery counting model rows whose field points at the outer row, 0 when there are none."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(n=Count('pk')).values('n'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def actual_counts():
+    """(label, model, counter field, expression computing the true count) for every counter."""
+    return [
+        ('status message comments', StatusMessage, 'comment_count', related_count(Comment, 'status_message')),
+        ('profile status messages', Profile, 'status_count', related_count(StatusMessage, 'profile')),
+        ('profile friends', Profile, 'friend_count',
+         related_count(Friend, 'profile1') + related_count(Friend, 'profile2')),
+        ('surf spot sessions', SurfSpot, 'session_count', related_count(SurfSession, 'surf_spot')),
+    ]
+
+
+def reconcile(dry_run=False):
+    """
+    Recount every counter from the source tables and fix the rows that drifted, one
+    UPDATE per counter. Returns {label: number of rows that were (or would be) repaired}.
+    """
+    repaired = {}
+    with transaction.atomic():
+        for label, model, field, actual in actual_counts():
+            drifted = model.objects.annotate(actual=actual).filter(~Q(**{field: F('actual')}))
+            repaired[label] = drifted.count()
+            if repaired[label] and not dry_run:
+                model.objects.filter(pk__in=drifted.values('pk')).update(**{field: actual})
+    return repaired
@@ -0,0 +1,241 @@
+# File: events.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Publish/subscribe for live feed updates: an in-process hub of subscriber queues and pluggable brokers that feed it.
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROKER = 'tide.events.LocalBroker'
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+DEFAULT_STREAM_MAX_AGE = 10 * 60  # clients reconnect after this, so workers can recycle
+FEED_CHANNEL = 'feed'
+
+
+def profile_channel(profile_id):
+    return f'profile:{profile_id}'
+
+
+class Subscription:
+    """
+    One connected client's queue of events on a set of channels. Events can be put from
+    any thread; they are handed to the subscriber's event loop. A subscriber that falls
+    more than maxsize events behind is marked overflowed and gets no more events, so a
+    slow client can't grow memory without bound (it should reload instead).
+    """
+
+    def __init__(self, hub, channels, maxsize):
+        self.hub = hub
+        self.channels = tuple(channels)
+        self.maxsize = maxsize
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+
+    def put(self, event):
+        """Queue event; must run on the subscriber's event loop (see Hub.deliver)."""
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.maxsize:
+            self.overflowed = True
+            self.queue.put_nowait(None)  # wakes the reader up to find out
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """Next event, or None on overflow. Raises asyncio.TimeoutError after timeout seconds."""
+        async with asyncio.timeout(timeout):
+            return await self.queue.get()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """The subscriptions of this process, by channel. Idle subscribers cost a queue and a set entry."""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels, maxsize=None):
+        """Subscribe the running event loop to channels."""
+        subscription = Subscription(self, channels, maxsize or DEFAULT_QUEUE_SIZE)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def deliver(self, channel, event):
+        """
+        Hand event to every subscriber of channel. Subscribers are grouped by event loop so
+        each loop is woken once per event, not once per connected client.
+        """
+        by_loop = {}
+        with self._lock:
+            for subscription in self._channels.get(channel, ()):
+                by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._put_all, subscriptions, event)
+            except RuntimeError:
+                for subscription in subscriptions:  # their loop is gone
+                    self.unsubscribe(subscription)
+
+    @staticmethod
+    def _put_all(subscriptions, event):
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def __len__(self):
+        with self._lock:
+            return len(set().union(*self._channels.values()))
+
+
+hub = Hub()
+
+
+class LocalBroker:
+    """Delivers events straight to this process's subscribers. Enough for a single worker."""
+
+    def publish(self, channel, event):
+        hub.deliver(channel, event)
+
+    def start(self):
+        pass
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Shares events between worker processes with Postgres LISTEN/NOTIFY: publish() sends a
+    NOTIFY, and each process runs one listener thread that hands notifications to its hub,
+    however many clients it has connected. Needs psycopg2.
+    """
+
+    pg_channel = 'tide_events'
+    reconnect_delay = 5
+
+    def __init__(self):
+        self._started = False
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        payload = json.dumps({'channel': channel, 'event': event})
+        with connections['default'].cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.pg_channel, payload])
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self._listen_forever, name='tide-events-listener', daemon=True).start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Event listener lost its database connection; reconnecting")
+            time.sleep(self.reconnect_delay)
+
+    def _listen(self):
+        wrapper = connections['default']
+        conn = wrapper.get_new_connection(wrapper.get_connection_params())
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.pg_channel}")
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    message = json.loads(notify.payload)
+                    hub.deliver(message['channel'], message['event'])
+        finally:
+            conn.close()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """The broker named by the EVENT_BROKER setting."""
+    return import_string(getattr(settings, 'EVENT_BROKER', DEFAULT_BROKER))()
+
+
+def publish(channels, event):
+    """Send event (a small JSON-serializable dict) to the subscribers of each channel."""
+    broker = get_broker()
+    for channel in channels:
+        try:
+            broker.publish(channel, event)
+        except Exception:
+            # live updates are best effort; the page is still right after a reload
+            logger.exception("Publishing %s on %s failed", event.get('type'), channel)
+
+
+def subscribe(channels):
+    """Subscribe the running event loop to channels, starting the broker's listener if needed."""
+    broker = get_broker()
+    broker.start()
+    return hub.subscribe(channels, getattr(settings, 'EVENT_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+
+
+def format_sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream(subscription):
+    """
+    Yield a subscription's events as server-sent events until the client disconnects or
+    the stream reaches EVENT_STREAM_MAX_AGE, with a comment line every EVENT_HEARTBEAT
+    seconds to keep proxies from closing an idle connection. A subscriber that overflowed
+    gets a 'reset' event, telling the page to reload.
+    """
+    heartbeat = getattr(settings, 'EVENT_HEARTBEAT', DEFAULT_HEARTBEAT)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + getattr(settings, 'EVENT_STREAM_MAX_AGE', DEFAULT_STREAM_MAX_AGE)
+    try:
+        yield 'retry: 5000\n\n'
+        while loop.time() < deadline:
+            try:
+                event = await subscription.get(heartbeat)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if event is None:
+                yield format_sse({'type': 'reset'})
+                return
+            yield format_sse(event)
+    finally:
+        subscription.close()
+
+
+def status_event(status_message_id, author_id, event_type='status'):
+    """A new ('status'), edited ('status_changed') or deleted ('status_deleted') status message."""
+    return {'type': event_type, 'id': status_message_id, 'profile_id': author_id}
+
+
+def comment_event(comment, author_id):
+    """A comment added to or removed from a status message by author_id; clients refetch its card."""
+    return {'type': 'comment', 'id': comment.pk, 'status_id': comment.status_message_id, 'profile_id': author_id}
@@ -0,0 +1,86 @@
+# File: facets.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Filters the public surf session browser and counts its results per spot and per wave rating.
+
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .cache import invalidated_ttl
+from .models import SurfSession, SurfSpot
+
+SPOT_FACETS_KEY = 'surf-session-spot-facets'
+DEFAULT_SPOT_FACETS_TTL = 60 * 60
+RATINGS = [value for value, _ in SurfSession._meta.get_field('wave_rating').choices]
+
+
+def spot_facets():
+    """
+    The spot dropdown: each distinct non-blank nickname, sorted, with the ids of every spot
+    that has it (spots are per user, so several share a name). Cached until a spot changes
+    (and, with a process-local cache, for seconds at most: see cache.invalidated_ttl).
+    """
+    facets = cache.get(SPOT_FACETS_KEY)
+    if facets is None:
+        by_nickname = {}
+        for pk, nickname in SurfSpot.objects.exclude(nickname='').values_list('pk', 'nickname').order_by():
+            by_nickname.setdefault(nickname, []).append(pk)
+        facets = sorted(by_nickname.items())
+        cache.set(SPOT_FACETS_KEY, facets, invalidated_ttl(getattr(settings, 'SPOT_FACETS_CACHE_TTL', DEFAULT_SPOT_FACETS_TTL)))
+    return facets
+
+
+def invalidate_spot_facets():
+    cache.delete(SPOT_FACETS_KEY)
+
+
+def spot_ids(nickname):
+    """
+    Ids of the spots called nickname, from spot_facets(). A name the cached list doesn't
+    know yet (a spot just saved in another worker) is looked up in the database instead.
+    """
+    ids = dict(spot_facets()).get(nickname)
+    if ids is None:
+        ids = list(SurfSpot.objects.filter(nickname=nickname).values_list('pk', flat=True))
+    return ids
+
+
+def filter_sessions(queryset, date_from=None, date_to=None, spot_ids=None, wave_rating=None):
+    """
+    Narrow queryset to a date range, a set of spots and a rating. Spots are matched by id,
+    which the (surf_spot, -date) index serves without joining the spot table.
+    """
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    if spot_ids is not None:
+        queryset = queryset.filter(surf_spot_id__in=spot_ids)
+    if wave_rating:
+        queryset = queryset.filter(wave_rating=wave_rating)
+    return queryset
+
+
+def session_facets(queryset, spot_ids=None, wave_rating=None):
+    """
+    Count the sessions of queryset (filtered by everything but spot and rating) per spot
+    nickname and per rating, from one GROUP BY (surf_spot, wave_rating) query. Each facet
+    ignores its own selection, so the spot counts honour the chosen rating and the rating
+    counts the chosen spot, and every option shows what picking it would return.
+    Returns {'spots': [(nickname, count)], 'ratings': [(rating, count)]}.
+    """
+    rows = queryset.order_by().values_list('surf_spot_id', 'wave_rating').annotate(n=Count('*'))
+    spot_ids = set(spot_ids) if spot_ids is not None else None
+    by_spot = Counter()
+    by_rating = Counter()
+    for spot_id, rating, n in rows:
+        if not wave_rating or str(rating) == str(wave_rating):
+            by_spot[spot_id] += n
+        if spot_ids is None or spot_id in spot_ids:
+            by_rating[rating] += n
+    return {
+        'spots': [(nickname, sum(by_spot[pk] for pk in ids)) for nickname, ids in spot_facets()],
+        'ratings': [(rating, by_rating[rating]) for rating in RATINGS],
+    }
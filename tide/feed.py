@@ -0,0 +1,118 @@
+# File: feed.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Maintains the materialized news feed timelines (FeedEntry) behind Profile.get_news_feed and batch-loads feed pages.
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .comments import thread_queryset
+from .models import FeedEntry, Image, Profile, StatusMessage
+from .pagination import DEFAULT_PER_PAGE, MergedCursorPaginator
+
+# Posts seen by more profiles than this are stored once as a broadcast entry
+# instead of being copied into every recipient's timeline.
+DEFAULT_FANOUT_LIMIT = 1000
+FEED_ORDERING = ('-timestamp', '-status_message_id')
+# How many recent posts a new profile's timeline starts with.
+DEFAULT_BACKFILL_LIMIT = 200
+BATCH_SIZE = 500
+
+
+def fanout_limit():
+    return getattr(settings, 'FEED_FANOUT_LIMIT', DEFAULT_FANOUT_LIMIT)
+
+
+def recipient_ids(status_message):
+    """Profiles whose feeds show this status message: everyone except its author."""
+    return Profile.objects.exclude(pk=status_message.profile_id).values_list('pk', flat=True)
+
+
+def fan_out(status_message):
+    """
+    Write the FeedEntry rows for a newly created status message. Returns the number
+    of rows written: one per recipient, or a single broadcast entry when there are
+    more recipients than FEED_FANOUT_LIMIT.
+    """
+    recipients = recipient_ids(status_message)
+    if recipients.count() > fanout_limit():
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(status_message=status_message, recipient=None, timestamp=status_message.timestamp)],
+            ignore_conflicts=True,
+        )
+        return 1
+
+    entries = [
+        FeedEntry(recipient_id=pk, status_message=status_message, timestamp=status_message.timestamp)
+        for pk in recipients.iterator()
+    ]
+    FeedEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return len(entries)
+
+
+def backfill_profile(profile, limit=None):
+    """
+    Seed a profile's timeline with the most recent fanned-out posts by other profiles,
+    so a new member does not start with an empty feed. Broadcast posts need no copy.
+    """
+    limit = limit or getattr(settings, 'FEED_BACKFILL_LIMIT', DEFAULT_BACKFILL_LIMIT)
+    recent = (
+        StatusMessage.objects.exclude(profile=profile)
+        .exclude(feed_entries__recipient__isnull=True)
+        .order_by('-timestamp')
+        .values_list('pk', 'timestamp')[:limit]
+    )
+    entries = [FeedEntry(recipient=profile, status_message_id=pk, timestamp=timestamp) for pk, timestamp in recent]
+    FeedEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return len(entries)
+
+
+@transaction.atomic
+def rebuild():
+    """Throw away every timeline and fan out all existing status messages again. Returns rows written."""
+    FeedEntry.objects.all().delete()
+    written = 0
+    for status_message in StatusMessage.objects.order_by('timestamp').iterator():
+        written += fan_out(status_message)
+    return written
+
+
+def news_feed_page(profile, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Return the CursorPage of profile's news feed after cursor: the status messages of a
+    page of its merged FeedEntry sources (see Profile.get_news_feed), newest first, loaded
+    with select_feed_items() in one query and annotated with feed_timestamp.
+    """
+    page = MergedCursorPaginator(profile.get_news_feed(), FEED_ORDERING, per_page).page(cursor)
+    entries = page.object_list
+    messages = select_feed_items(StatusMessage.objects.all()).in_bulk([entry.status_message_id for entry in entries])
+    page.object_list = []
+    for entry in entries:
+        if entry.status_message_id in messages:  # unless deleted since the page was read
+            messages[entry.status_message_id].feed_timestamp = entry.timestamp
+            page.object_list.append(messages[entry.status_message_id])
+    return page
+
+
+def feed_item_prefetches(images=True, comments=True):
+    """
+    The lookups that batch-load what a status message shows beyond its row, so a page
+    of them costs a fixed number of queries however many images and comments it has: each
+    message gets image_list (used by the cached card) and comment_list (its comment
+    threads in path order, see comments.thread_queryset, rendered per request) from one
+    query each. Pass the messages to comments.attach_threads() afterwards to build the trees.
+    """
+    lookups = []
+    if images:
+        lookups.append(Prefetch('images', queryset=Image.objects.order_by('pk'), to_attr='image_list'))
+    if comments:
+        lookups.append(Prefetch('comments', queryset=thread_queryset(), to_attr='comment_list'))
+    return lookups
+
+
+def select_feed_items(queryset):
+    """
+    Join in the author (with their user, for the owner check) and surf session (with its
+    spot) that every status card shows.
+    """
+    return queryset.select_related('profile__user', 'surf_session__surf_spot')
@@ -118,6 +118,25 @@ class SurfSessionForm(forms.ModelForm):
         if user:
             self.fields['surf_spot'].queryset = SurfSpot.objects.filter(user=user)  
 
+class SurfSessionImportForm(SurfSessionForm):
+    """
+    One row of an imported logbook: a surf session's fields, checked by the same rules as
+    SurfSessionForm, with its spot named by NOAA station (and optionally nickname and
+    coordinates, used when the spot has to be created).
+    """
+    station_id = forms.CharField(max_length=10)
+    nickname = forms.CharField(max_length=100, required=False)
+    latitude = forms.FloatField(required=False, min_value=-90, max_value=90)
+    longitude = forms.FloatField(required=False, min_value=-180, max_value=180)
+
+    class Meta(SurfSessionForm.Meta):
+        fields = ['date', 'duration', 'wave_rating', 'notes']
+
+class SurfSessionUploadForm(forms.Form):
+    """Upload a logbook of surf sessions to import."""
+    file = forms.FileField(label="Logbook file", help_text="CSV with a header row, or JSON Lines (one session per line).")
+    format = forms.ChoiceField(choices=[('', 'Detect from file name'), ('csv', 'CSV'), ('jsonl', 'JSON Lines')], required=False)
+
 class CommentForm(forms.ModelForm):
     """Form for creating a new comment associated with a status message."""
     class Meta:
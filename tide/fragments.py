@@ -0,0 +1,81 @@
+# File: fragments.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Caches the rendered HTML of status message cards, keyed by version, and stitches them into feed and profile pages.
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .cache import CacheStats
+from .comments import attach_threads
+from .feed import feed_item_prefetches
+from .models import Profile, StatusMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CARD_TTL = 24 * 60 * 60
+CARD_TEMPLATES = {
+    'feed': 'tide/status_card_feed.html',
+    'profile': 'tide/status_card_profile.html',
+}
+stats = CacheStats()
+
+
+def card_ttl():
+    return getattr(settings, 'STATUS_CARD_CACHE_TTL', DEFAULT_CARD_TTL)
+
+
+def card_key(variant, status_message):
+    """
+    Cache key of a rendered card. It changes whenever the status message's or its author's
+    card_version is bumped, so edits never need to find and delete old entries.
+    """
+    return (f'status-card:{variant}:{status_message.pk}:'
+            f'{status_message.card_version}:{status_message.profile.card_version}')
+
+
+def render_cards(status_messages, variant):
+    """
+    Set card_html on each status message (loaded with feed.select_feed_items()), reading
+    the rendered cards from the cache in one round trip. Only the misses get their images
+    loaded (one query) and rendered. Cards are rendered without the request, so nothing
+    viewer-specific can leak into the shared cache: comments and the owner's edit and
+    delete links are rendered per request around the card, from the comment_tree set
+    here on every message (one query).
+    """
+    keys = {status_message.pk: card_key(variant, status_message) for status_message in status_messages}
+    cached = cache.get_many(keys.values())
+    misses = [status_message for status_message in status_messages if keys[status_message.pk] not in cached]
+    stats.incr('hit', len(keys) - len(misses))
+    stats.incr('miss', len(misses))
+
+    prefetch_related_objects(list(status_messages), *feed_item_prefetches(images=False))
+    attach_threads(status_messages)
+
+    if misses:
+        prefetch_related_objects(misses, *feed_item_prefetches(comments=False))
+        rendered = {
+            keys[status_message.pk]: render_to_string(CARD_TEMPLATES[variant], {'status': status_message})
+            for status_message in misses
+        }
+        cache.set_many(rendered, card_ttl())
+        cached.update(rendered)
+
+    for status_message in status_messages:
+        status_message.card_html = mark_safe(cached[keys[status_message.pk]])
+    logger.debug("Status cards (%s): %d cached, %d rendered", variant, len(keys) - len(misses), len(misses))
+    return status_messages
+
+
+def bump_status_messages(**filters):
+    """Invalidate the cards of the status messages matching filters."""
+    StatusMessage.objects.filter(**filters).update(card_version=F('card_version') + 1)
+
+
+def bump_profile(profile_id):
+    """Invalidate the cards of every status message by this profile."""
+    Profile.objects.filter(pk=profile_id).update(card_version=F('card_version') + 1)
@@ -0,0 +1,117 @@
+# File: geocoding.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Google Geocoding lookups behind an in-process LRU and a database cache.
+
+import hashlib
+import re
+import unicodedata
+from datetime import timedelta
+
+import logging
+
+import requests
+from decouple import config
+from django.conf import settings
+from django.utils.timezone import now
+
+from . import upstream
+from .cache import CacheStats, LocalLRUCache
+from .models import GeocodeCacheEntry
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+DEFAULT_GEOCODE_TTL = 30 * 24 * 60 * 60   # places do not move
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60       # retry "not found" addresses daily
+LOCAL_TTL = 60 * 60
+
+_MISSING = object()
+_local = LocalLRUCache(maxsize=getattr(settings, 'GEOCODE_LRU_SIZE', 1024))
+stats = CacheStats()
+
+
+def normalize_address(address):
+    """
+    Reduce an address to a cache key: Unicode-normalized, case-folded, accents stripped,
+    punctuation replaced by spaces and whitespace collapsed. Very long keys are shortened
+    with a hash.
+    """
+    text = unicodedata.normalize('NFKD', address).casefold()
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[^\w\s]', ' ', text)
+    key = ' '.join(text.split())
+    if len(key) > 255:
+        key = f"{key[:214]}:{hashlib.sha1(key.encode()).hexdigest()}"
+    return key
+
+
+def geocode(address):
+    """
+    Return (latitude, longitude) for an address, or None when Google cannot find it.
+    Repeat lookups are answered from the local LRU, then from GeocodeCacheEntry.
+    If the API cannot be reached, an expired entry for the address is used instead;
+    without one, requests.exceptions.RequestException is raised.
+    """
+    key = normalize_address(address)
+    if not key:
+        return None
+
+    cached = _local.get(key, _MISSING)
+    if cached is not _MISSING:
+        stats.incr('hit')
+        return cached
+
+    entry = GeocodeCacheEntry.objects.filter(address_key=key).first()
+    if entry is not None and entry.expires_at > now():
+        stats.incr('hit')
+        stats.incr('db_hit')
+        location = entry.location
+        _local.set(key, location, LOCAL_TTL)
+        return location
+
+    stats.incr('miss')
+    try:
+        location, cacheable = fetch_location(address)
+    except requests.exceptions.RequestException as e:
+        if entry is None:
+            raise
+        stats.incr('fallback')
+        logger.warning("Geocoding failed (%s); using expired entry for %r", e, key)
+        return entry.location
+    if cacheable:
+        ttl = (getattr(settings, 'GEOCODE_CACHE_TTL', DEFAULT_GEOCODE_TTL) if location
+               else getattr(settings, 'GEOCODE_NEGATIVE_TTL', DEFAULT_NEGATIVE_TTL))
+        GeocodeCacheEntry.objects.update_or_create(
+            address_key=key,
+            defaults={
+                'latitude': location[0] if location else None,
+                'longitude': location[1] if location else None,
+                'found': location is not None,
+                'expires_at': now() + timedelta(seconds=ttl),
+            },
+        )
+        _local.set(key, location, min(ttl, LOCAL_TTL))
+    return location
+
+
+def fetch_location(address):
+    """
+    Ask the Google Geocoding API for an address. Returns (location, cacheable):
+    location is (lat, lng) or None, and cacheable is False for answers such as
+    OVER_QUERY_LIMIT that say nothing about the address itself.
+    """
+    params = {'address': address, 'key': config('GOOGLE_API_KEY')}
+    data = upstream.google_geocoding.get_json(GEOCODE_URL, params)
+
+    if data.get('status') == 'OK':
+        location = data['results'][0]['geometry']['location']
+        return (location['lat'], location['lng']), True
+    return None, data.get('status') == 'ZERO_RESULTS'
+
+
+def prune_expired():
+    """Delete expired database entries and return how many were removed."""
+    _local.clear()
+    deleted, _ = GeocodeCacheEntry.objects.filter(expires_at__lte=now()).delete()
+    return deleted
@@ -0,0 +1,210 @@
+# File: logbook.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Streams surf session logbooks in (CSV or JSON Lines, validated and bulk-written in batches) and out.
+
+import csv
+import io
+import json
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.duration import duration_string
+
+from . import facets, rollups, suggestions
+from .counters import increment
+from .forms import SurfSessionImportForm
+from .models import Profile, SearchDocument, SurfSession, SurfSpot
+from .stations import stations
+
+FORMATS = ('csv', 'jsonl')
+COLUMNS = ['date', 'duration', 'wave_rating', 'notes', 'station_id', 'nickname', 'latitude', 'longitude']
+DEFAULT_BATCH_SIZE = 500
+# Errors beyond this many are counted but not listed, so a bad file can't grow the report without bound.
+MAX_REPORTED_ERRORS = 200
+IMPORT_FIELDS = SurfSessionImportForm.base_fields
+
+
+class ImportReport:
+    """What an import did: sessions and spots created, and the rows that were rejected and why."""
+
+    def __init__(self):
+        self.created = 0
+        self.spots_created = 0
+        self.failed = 0
+        self.errors = []
+
+    def reject(self, line, messages):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, messages))
+
+    @property
+    def errors_truncated(self):
+        return self.failed > len(self.errors)
+
+
+def detect_format(name, requested=''):
+    """The logbook format: requested if given, else guessed from the file name (CSV by default)."""
+    if requested in FORMATS:
+        return requested
+    return 'jsonl' if name.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(binary_file, fmt):
+    """
+    Yield (line number, row dict) from a binary file object without reading it all into
+    memory. A line that is not a JSON object yields its error message instead of a dict.
+    """
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        if reader.fieldnames:
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = f"Not valid JSON: {e}"
+        yield line_number, row if isinstance(row, (dict, str)) else "Each line must be a JSON object."
+
+
+def validate(line_number, row, report):
+    """
+    The cleaned data of a row checked against SurfSessionImportForm's fields, or None after
+    reporting it. The fields are used directly: binding a form per row costs more than the
+    checks themselves.
+    """
+    if isinstance(row, str):
+        report.reject(line_number, [row])
+        return None
+    cleaned, problems = {}, []
+    for name, field in IMPORT_FIELDS.items():
+        value = row.get(name)
+        try:
+            cleaned[name] = field.clean('' if value is None else value)
+        except ValidationError as e:
+            problems.extend(f"{name}: {message}" for message in e.messages)
+    if problems:
+        report.reject(line_number, problems)
+        return None
+    return cleaned
+
+
+def resolve_spots(user, rows, report):
+    """
+    Map each station_id in rows (line number, cleaned data) to one of the user's spots with
+    one query, creating the missing spots in one bulk insert. New spots take their
+    coordinates from the row or the NOAA station registry; rows naming an unknown station
+    without coordinates are reported and dropped. Returns (spots by station, kept rows).
+    """
+    spots = {}
+    for spot in SurfSpot.objects.filter(user=user, station_id__in={data['station_id'] for _, data in rows}).order_by('-pk'):
+        spots[spot.station_id] = spot
+
+    new_spots, kept = {}, []
+    for line_number, data in rows:
+        station_id = data['station_id']
+        if station_id not in spots and station_id not in new_spots:
+            station = stations.get(station_id)
+            latitude = data['latitude'] if data['latitude'] is not None else getattr(station, 'lat', None)
+            longitude = data['longitude'] if data['longitude'] is not None else getattr(station, 'lng', None)
+            if latitude is None or longitude is None:
+                report.reject(line_number, [f"station_id: Unknown station {station_id}; give latitude and longitude."])
+                continue
+            new_spots[station_id] = SurfSpot(
+                user=user, station_id=station_id, nickname=data['nickname'], latitude=latitude, longitude=longitude)
+        kept.append((line_number, data))
+
+    if new_spots:
+        SurfSpot.objects.bulk_create(new_spots.values())
+        spots.update(new_spots)
+        report.spots_created += len(new_spots)
+    return spots, kept
+
+
+def write_batch(user, rows, report):
+    """
+    Insert one batch of validated rows in a transaction, then do in bulk what the model
+    signals would have done one session at a time: spot session counts, rollups and
+    search documents.
+    """
+    with transaction.atomic():
+        spots, rows = resolve_spots(user, rows, report)
+        sessions = SurfSession.objects.bulk_create([
+            SurfSession(
+                user=user, surf_spot=spots[data['station_id']], date=data['date'], duration=data['duration'],
+                wave_rating=data['wave_rating'], notes=data['notes'],
+            )
+            for _, data in rows
+        ])
+        for spot_id, count in Counter(session.surf_spot_id for session in sessions).items():
+            increment(SurfSpot, spot_id, 'session_count', count)
+        if sessions:
+            rollups.recount(user.pk, {session.surf_spot_id for session in sessions},
+                            {spot.station_id for spot in spots.values()}, {session.date for session in sessions})
+        SearchDocument.objects.bulk_create([
+            SearchDocument(kind='session', object_id=session.pk, body=session.notes.strip())
+            for session in sessions if session.notes.strip()
+        ])
+    report.created += len(sessions)
+
+
+def import_sessions(user, rows, batch_size=None):
+    """
+    Import (line number, row dict) pairs (see read_rows) as the user's surf sessions,
+    batch_size rows at a time, so memory stays flat however long the logbook is. Each
+    batch is validated and written in its own transaction; invalid rows are skipped and
+    listed in the returned ImportReport.
+    """
+    batch_size = batch_size or getattr(settings, 'SESSION_IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    report = ImportReport()
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        valid = [(line_number, data) for line_number, row in batch
+                 if (data := validate(line_number, row, report)) is not None]
+        if valid:
+            write_batch(user, valid, report)
+    if report.spots_created:
+        profile_ids = list(Profile.objects.filter(user=user).values_list('pk', flat=True))
+        transaction.on_commit(lambda: suggestions.request_refresh(profile_ids))
+        transaction.on_commit(facets.invalidate_spot_facets)
+    return report
+
+
+class Echo:
+    """A file-like object whose write() returns what was written, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(user):
+    """The user's sessions as row lists in COLUMNS order, oldest first, read with a server-side iterator."""
+    sessions = (
+        SurfSession.objects.filter(user=user)
+        .order_by('date', 'pk')
+        .values_list('date', 'duration', 'wave_rating', 'notes', 'surf_spot__station_id', 'surf_spot__nickname',
+                     'surf_spot__latitude', 'surf_spot__longitude')
+    )
+    for session_date, duration, *rest in sessions.iterator(chunk_size=2000):
+        yield [session_date.isoformat(), duration_string(duration), *rest]
+
+
+def export_sessions(user, fmt):
+    """Yield the user's logbook as CSV or JSON Lines, a line at a time, in the format import_sessions reads."""
+    if fmt == 'jsonl':
+        for row in export_rows(user):
+            yield json.dumps(dict(zip(COLUMNS, row))) + '\n'
+        return
+    writer = csv.writer(Echo())
+    yield writer.writerow(COLUMNS)
+    for row in export_rows(user):
+        yield writer.writerow(row)
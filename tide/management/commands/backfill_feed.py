@@ -0,0 +1,17 @@
+# File: backfill_feed.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that rebuilds the materialized news feed timelines from existing status messages.
+
+from django.core.management.base import BaseCommand
+
+from tide.feed import rebuild
+from tide.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = "Rebuild every profile's FeedEntry timeline from the existing status messages."
+
+    def handle(self, *args, **options):
+        written = rebuild()
+        broadcasts = FeedEntry.objects.filter(recipient__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} feed entries ({broadcasts} broadcast)"))
@@ -0,0 +1,28 @@
+# File: backfill_session_conditions.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that captures conditions snapshots for surf sessions that don't have a complete one.
+
+from django.core.management.base import BaseCommand
+
+from tide.conditions import DEFAULT_MAX_WORKERS, backfill
+
+
+class Command(BaseCommand):
+    help = ("Capture the tide, moon and wind snapshot of every surf session without one (including imported "
+            "sessions), a batch at a time, fetching each station's day from NOAA once per batch.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Sessions per batch (default SESSION_CONDITIONS_BATCH_SIZE).")
+        parser.add_argument('--limit', type=int, help="Stop after this many sessions.")
+        parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS, help="NOAA requests in flight at once.")
+        parser.add_argument('--no-retry', action='store_true', help="Skip sessions whose snapshot is incomplete.")
+
+    def handle(self, *args, **options):
+        counts = backfill(
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            max_workers=options['workers'],
+            retry=not options['no_retry'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Captured {counts['captured']} snapshots ({counts['incomplete']} incomplete, retried on the next run)"))
@@ -0,0 +1,75 @@
+# File: benchmark_charts.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command comparing server-side plotly HTML charts with the JSON chart payloads.
+
+import json
+import resource
+import time
+from datetime import datetime
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from tide.charts import chart_payload, series_trace
+from tide.series import TideSeries
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux), falling back to the peak RSS."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_series(days):
+    start = np.datetime64(datetime(2024, 11, 1), 'm')
+    times = np.arange(start, start + np.timedelta64(days, 'D'), np.timedelta64(6, 'm'))
+    hours = (times - times[0]).astype(np.int64) / 60
+    return TideSeries(times, 1.0 + 0.8 * np.sin(2 * np.pi * hours / 12.42))
+
+
+class Command(BaseCommand):
+    help = "Measure response bytes, render CPU and worker memory of plotly to_html charts vs JSON chart payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        series_by_days = {days: synthetic_series(days) for days in (1, 31)}
+
+        for days, series in series_by_days.items():
+            start = time.process_time()
+            for _ in range(repeat):
+                body = json.dumps(chart_payload([series_trace(series, 'Tide Heights')], "Tide Height Data"), separators=(',', ':'))
+            json_ms = (time.process_time() - start) * 1000 / repeat
+            self.stdout.write(f"JSON payload, {days:2d} day(s) ({len(series)} points): {len(body):9,d} bytes, {json_ms:7.2f} ms CPU")
+
+        rss_before = current_rss_mb()
+        start = time.process_time()
+        try:
+            import plotly.graph_objects as go
+            from plotly.io import to_html
+        except ImportError:
+            self.stdout.write("plotly is not installed; skipping the server-side HTML comparison.")
+            return
+        import_ms = (time.process_time() - start) * 1000
+        self.stdout.write(f"Importing plotly: {import_ms:.0f} ms CPU, +{current_rss_mb() - rss_before:.1f} MB RSS")
+
+        for days, series in series_by_days.items():
+            start = time.process_time()
+            for _ in range(repeat):
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(
+                    x=series.time_labels(), y=series.heights.tolist(),
+                    mode='lines+markers', name='Tide Heights',
+                    line=dict(shape='spline'), marker=dict(size=8),
+                ))
+                fig.update_layout(title="Tide Height Data", template="plotly_white")
+                html = to_html(fig, full_html=False)
+            html_ms = (time.process_time() - start) * 1000 / repeat
+            self.stdout.write(f"plotly to_html, {days:2d} day(s) ({len(series)} points): {len(html):9,d} bytes, {html_ms:7.2f} ms CPU")
+
+        self.stdout.write(f"Worker RSS growth from plotly import and rendering: +{current_rss_mb() - rss_before:.1f} MB")
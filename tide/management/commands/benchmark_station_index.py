@@ -0,0 +1,60 @@
+# File: benchmark_station_index.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command comparing the KD-tree station index with a linear haversine scan.
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from tide.spatial import StationIndex, haversine
+
+
+class Command(BaseCommand):
+    help = "Benchmark StationIndex against a linear haversine scan over synthetic stations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=10000)
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--k', type=int, default=5)
+        parser.add_argument('--radius-km', type=float, default=50.0)
+        parser.add_argument('--seed', type=int, default=412)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        stations = [
+            {'id': str(i), 'name': f'Station {i}', 'lat': rng.uniform(-80, 80), 'lng': rng.uniform(-180, 180)}
+            for i in range(options['stations'])
+        ]
+        queries = [(rng.uniform(-80, 80), rng.uniform(-180, 180)) for _ in range(options['queries'])]
+
+        start = time.perf_counter()
+        index = StationIndex.from_dicts(stations)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        def scan(lat, lng):
+            return min(stations, key=lambda station: haversine(lat, lng, station['lat'], station['lng']))
+
+        scan_us, scan_results = self.time_queries(queries, scan)
+        nearest_us, nearest_results = self.time_queries(queries, lambda lat, lng: index.nearest(lat, lng)[0])
+        knn_us, _ = self.time_queries(queries, lambda lat, lng: index.k_nearest(lat, lng, options['k']))
+        radius_us, _ = self.time_queries(queries, lambda lat, lng: index.within_radius(lat, lng, options['radius_km']))
+
+        mismatches = sum(a['id'] != b['id'] for a, b in zip(scan_results, nearest_results))
+
+        self.stdout.write(f"{options['stations']} stations, {options['queries']} queries")
+        self.stdout.write(f"  index build:            {build_ms:10.1f} ms")
+        self.stdout.write(f"  haversine linear scan:  {scan_us:10.1f} us/query")
+        self.stdout.write(f"  index nearest:          {nearest_us:10.1f} us/query ({scan_us / nearest_us:.0f}x faster)")
+        self.stdout.write(f"  index {options['k']}-nearest:        {knn_us:10.1f} us/query")
+        self.stdout.write(f"  index within {options['radius_km']:g} km:     {radius_us:10.1f} us/query")
+        if mismatches:
+            self.stderr.write(f"  {mismatches} nearest results differ from the linear scan")
+        else:
+            self.stdout.write(self.style.SUCCESS("  nearest results match the linear scan"))
+
+    def time_queries(self, queries, fn):
+        """Run fn over every query; return (mean microseconds per query, results)."""
+        start = time.perf_counter()
+        results = [fn(lat, lng) for lat, lng in queries]
+        return (time.perf_counter() - start) * 1e6 / len(queries), results
@@ -0,0 +1,110 @@
+# File: import_harmonics.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that fills tide/data/harmonics.json with NOAA harmonic constituents.
+
+import json
+from datetime import date
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tide.noaa import NOAA_DATAGETTER_URL
+from tide.prediction import DEFAULT_HARMONICS_FILE, REFERENCE_PREDICTIONS_FILE, clear_harmonics_cache
+
+NOAA_METADATA_URL = "https://api.tidesandcurrents.noaa.gov/mdapi/prod/webapi/stations/{station_id}/{resource}.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Import harmonic constituents and MSL/MLLW datums for NOAA stations into the local "
+        "harmonics file used for offline tide prediction. Reads '<id>_harcon.json' and "
+        "'<id>_datums.json' dumps from --from-dir, or downloads them from the NOAA metadata API. "
+        "With --reference, also records NOAA's published predictions for that day, which the "
+        "tests compare the harmonic model against."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('station_ids', nargs='+', help="NOAA station ids to import.")
+        parser.add_argument('--from-dir', help="Directory containing harcon/datums JSON dumps.")
+        parser.add_argument('--timeout', type=float, default=10.0)
+        parser.add_argument('--reference', type=date.fromisoformat, metavar='YYYY-MM-DD',
+                            help="Also record NOAA's 6-minute and high/low predictions for this day "
+                                 "('<id>_predictions.json' and '<id>_hilo.json' with --from-dir).")
+
+    def handle(self, *args, **options):
+        path = Path(getattr(settings, 'TIDE_HARMONICS_FILE', DEFAULT_HARMONICS_FILE))
+        harmonics = json.loads(path.read_text()) if path.exists() else {}
+        references = json.loads(REFERENCE_PREDICTIONS_FILE.read_text()) if REFERENCE_PREDICTIONS_FILE.exists() else {}
+
+        imported = 0
+        for station_id in options['station_ids']:
+            try:
+                harcon = self.load(station_id, 'harcon', options)
+                datums = self.load(station_id, 'datums', options)
+            except (OSError, ValueError, requests.exceptions.RequestException) as e:
+                self.stderr.write(f"{station_id}: skipped ({e})")
+                continue
+
+            constituents = {
+                c['name']: [round(c['amplitude'], 4), round(c['phase_GMT'], 2)]
+                for c in harcon.get('HarmonicConstituents', [])
+                if c.get('amplitude')
+            }
+            levels = {d['name']: d['value'] for d in datums.get('datums', [])}
+            if not constituents or 'MSL' not in levels or 'MLLW' not in levels:
+                self.stderr.write(f"{station_id}: skipped (no harmonic constituents or datums published)")
+                continue
+
+            harmonics[station_id] = {
+                'datum': 'MLLW',
+                'datum_offset': round(levels['MSL'] - levels['MLLW'], 4),
+                'constituents': constituents,
+            }
+            imported += 1
+
+            if options['reference']:
+                try:
+                    references[station_id] = self.load_reference(station_id, options)
+                except (OSError, ValueError, requests.exceptions.RequestException) as e:
+                    self.stderr.write(f"{station_id}: no reference predictions ({e})")
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(harmonics, sort_keys=True, separators=(',', ':')))
+        if options['reference']:
+            REFERENCE_PREDICTIONS_FILE.write_text(json.dumps(references, sort_keys=True, indent=1))
+        clear_harmonics_cache()
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} station(s) into {path}"))
+
+    def load(self, station_id, resource, options):
+        """Return the decoded harcon or datums payload for a station."""
+        if options['from_dir']:
+            return json.loads((Path(options['from_dir']) / f'{station_id}_{resource}.json').read_text())
+
+        url = NOAA_METADATA_URL.format(station_id=station_id, resource=resource)
+        return self.get(url, {'units': 'metric'}, options)
+
+    def load_reference(self, station_id, options):
+        """Return NOAA's published predictions for the --reference day: {'date', 'predictions', 'hilo'}."""
+        day = options['reference']
+        if options['from_dir']:
+            directory = Path(options['from_dir'])
+            predictions = json.loads((directory / f'{station_id}_predictions.json').read_text())
+            hilo = json.loads((directory / f'{station_id}_hilo.json').read_text())
+        else:
+            params = {
+                'station': station_id, 'product': 'predictions', 'datum': 'MLLW', 'time_zone': 'gmt',
+                'units': 'metric', 'format': 'json', 'application': 'we_tide',
+                'begin_date': day.strftime('%Y%m%d'), 'end_date': day.strftime('%Y%m%d'),
+            }
+            predictions = self.get(NOAA_DATAGETTER_URL, params, options)
+            hilo = self.get(NOAA_DATAGETTER_URL, {**params, 'interval': 'hilo'}, options)
+        if not predictions.get('predictions') or not hilo.get('predictions'):
+            raise ValueError(predictions.get('error') or hilo.get('error') or "no predictions published")
+        return {'date': day.isoformat(), 'predictions': predictions['predictions'], 'hilo': hilo['predictions']}
+
+    def get(self, url, params, options):
+        response = requests.get(url, params=params, timeout=options['timeout'])
+        response.raise_for_status()
+        return response.json()
@@ -0,0 +1,33 @@
+# File: import_surf_sessions.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that imports a CSV or JSON Lines logbook of surf sessions for a user.
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tide.logbook import FORMATS, detect_format, import_sessions, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import a logbook of surf sessions for a user, streaming the file and writing it in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, default='', help="Default: detected from the file name.")
+        parser.add_argument('--batch-size', type=int, help="Rows validated and written per transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user called {options['username']}")
+        with open(options['path'], 'rb') as f:
+            report = import_sessions(user, read_rows(f, detect_format(options['path'], options['format'])),
+                                     options['batch_size'])
+        for line, problems in report.errors:
+            self.stderr.write(f"line {line}: {'; '.join(problems)}")
+        if report.errors_truncated:
+            self.stderr.write(f"... and {report.failed - len(report.errors)} more rejected rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.created} sessions and {report.spots_created} new spots; rejected {report.failed} rows"))
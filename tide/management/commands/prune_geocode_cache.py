@@ -0,0 +1,26 @@
+# File: prune_geocode_cache.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that evicts expired and surplus geocoding cache entries.
+
+from django.core.management.base import BaseCommand
+
+from tide.geocoding import prune_expired
+from tide.models import GeocodeCacheEntry
+
+
+class Command(BaseCommand):
+    help = "Delete expired geocoding cache entries, and optionally keep only the newest --max-entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-entries', type=int, help="Keep at most this many (most recently created) entries.")
+
+    def handle(self, *args, **options):
+        deleted = prune_expired()
+
+        max_entries = options['max_entries']
+        if max_entries is not None:
+            keep = GeocodeCacheEntry.objects.order_by('-created_at').values_list('pk', flat=True)[:max_entries]
+            surplus, _ = GeocodeCacheEntry.objects.exclude(pk__in=list(keep)).delete()
+            deleted += surplus
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} geocoding cache entries"))
@@ -0,0 +1,16 @@
+# File: rebuild_search_index.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that rebuilds the full-text search documents from scratch.
+
+from django.core.management.base import BaseCommand
+
+from tide.search import rebuild
+
+
+class Command(BaseCommand):
+    help = ("Re-index every status message, comment, profile and surf session for search. Only needed "
+            "after bulk changes that bypass model signals; normal writes are indexed as they happen.")
+
+    def handle(self, *args, **options):
+        written = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} search documents"))
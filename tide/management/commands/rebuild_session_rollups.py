@@ -0,0 +1,18 @@
+# File: rebuild_session_rollups.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that recomputes the surf session rollup tables from scratch.
+
+from django.core.management.base import BaseCommand
+
+from tide.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = ("Recompute the monthly (user, spot) and daily (station) surf session rollups from every session. "
+            "Only needed after bulk changes that bypass model signals; normal writes update them as they happen.")
+
+    def handle(self, *args, **options):
+        written = rebuild()
+        for name, count in written.items():
+            self.stdout.write(f"{name}: {count} rows")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {sum(written.values())} rollup rows"))
@@ -0,0 +1,22 @@
+# File: reconcile_counters.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that recounts the denormalized counter columns and repairs drift.
+
+from django.core.management.base import BaseCommand
+
+from tide.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = ("Recount comments per status message, status messages and friends per profile, and sessions "
+            "per surf spot from their tables, and fix every counter that drifted.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drifted rows without fixing them.")
+
+    def handle(self, *args, **options):
+        repaired = reconcile(dry_run=options['dry_run'])
+        verb = "would repair" if options['dry_run'] else "repaired"
+        for label, count in repaired.items():
+            self.stdout.write(f"{label}: {verb} {count} rows")
+        self.stdout.write(self.style.SUCCESS(f"Done: {verb} {sum(repaired.values())} rows in total"))
@@ -0,0 +1,31 @@
+# File: refresh_friend_suggestions.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that recomputes the stored top-K friend suggestions.
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from tide.models import Profile
+from tide.suggestions import queued_profiles, refresh_profile
+
+
+class Command(BaseCommand):
+    help = ("Recompute friend suggestions for profiles queued by friendship and surf spot changes, "
+            "or for every profile with --all. Meant to run periodically (e.g. from cron).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute every profile, not just the queued ones.")
+        parser.add_argument('--limit', type=int, help="Process at most this many queued profiles.")
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.all() if options['all'] else queued_profiles(options['limit'])
+
+        started = time.monotonic()
+        count = stored = 0
+        for profile in profiles.iterator():
+            stored += refresh_profile(profile)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed suggestions for {count} profiles ({stored} stored) in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,86 @@
+# File: refresh_stations.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that rebuilds the station registry data file from a NOAA station dump.
+
+import json
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tide.stations import stations
+
+
+def parse_json_dump(text):
+    """Parse a NOAA metadata API stations.json dump: {'stations': [{'id', 'name', 'lat', 'lng'}, ...]}."""
+    payload = json.loads(text)
+    for station in payload.get('stations', payload if isinstance(payload, list) else []):
+        yield station.get('id'), station.get('name'), station.get('lat'), station.get('lng')
+
+
+def parse_xml_dump(text):
+    """
+    Parse a NOAA station XML dump. Handles both the metadata API format
+    (<Station><id/><name/><lat/><lng/></Station>) and the older ActiveStations
+    format (<station ID="" name=""><metadata><location><lat/><long/>...).
+    """
+    root = ET.fromstring(text)
+    for element in root.iter():
+        if _local_name(element.tag).lower() != 'station':
+            continue
+        children = {_local_name(child.tag).lower(): child for child in element.iter()}
+        station_id = element.get('ID') or element.get('id') or _text(children.get('id'))
+        name = element.get('name') or _text(children.get('name'))
+        lat = _text(children.get('lat'))
+        lng = _text(children.get('lng')) or _text(children.get('long'))
+        yield station_id, name, lat, lng
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _text(element):
+    return element.text.strip() if element is not None and element.text else None
+
+
+class Command(BaseCommand):
+    help = "Rebuild tide/data/noaa_stations.json from a local NOAA station XML or JSON dump."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dump', help="Path to a NOAA stations .xml or .json file.")
+        parser.add_argument('--output', help="Registry file to write (defaults to the configured registry).")
+
+    def handle(self, *args, **options):
+        dump = Path(options['dump'])
+        if not dump.exists():
+            raise CommandError(f"{dump} does not exist")
+
+        text = dump.read_text()
+        parser = parse_xml_dump if text.lstrip().startswith('<') else parse_json_dump
+        try:
+            records = list(parser(text))
+        except (ET.ParseError, ValueError) as e:
+            raise CommandError(f"Could not parse {dump}: {e}")
+
+        rows = {}
+        skipped = 0
+        for station_id, name, lat, lng in records:
+            try:
+                rows[str(station_id)] = [str(station_id), name.strip(), round(float(lat), 4), round(float(lng), 4)]
+            except (TypeError, ValueError, AttributeError):
+                skipped += 1
+        if not rows:
+            raise CommandError(f"No stations found in {dump}")
+
+        output = Path(options['output'] or stations.path)
+        tmp = output.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            f.write('{"fields": ["id", "name", "lat", "lng"], "stations": [\n')
+            f.write(',\n'.join(json.dumps(rows[key]) for key in sorted(rows)))
+            f.write('\n]}\n')
+        os.replace(tmp, output)
+        stations.reload()
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(rows)} stations to {output} ({skipped} skipped)"))
@@ -0,0 +1,63 @@
+# File: warm_caches.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Management command that keeps NOAA and weather caches warm for every saved surf spot.
+
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tide.cache import cache_is_process_local
+from tide.warming import build_plan, run_plan
+
+
+class Command(BaseCommand):
+    help = ("Pre-fetch today's and tomorrow's tides and the current weather for every distinct "
+            "SurfSpot station and grid cell. Runs forever unless --once or --dry-run is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=5 * 60, help="Seconds between passes (default 300).")
+        parser.add_argument('--jitter', type=float, default=0.2,
+                            help="Randomize each sleep by up to this fraction of --interval (default 0.2).")
+        parser.add_argument('--workers', type=int, default=4, help="Upstream requests in flight at once (default 4).")
+        parser.add_argument('--once', action='store_true', help="Run a single pass and exit.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what a pass would fetch without calling any API.")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        jitter = options['jitter']
+        # refresh anything that would go stale before the next pass could reach it
+        min_fresh = interval * (1 + jitter)
+
+        if options['dry_run']:
+            self.report(build_plan())
+            return
+        if cache_is_process_local():
+            raise CommandError(
+                f"CACHES['default'] is {settings.CACHES['default']['BACKEND']}, which lives in this process's "
+                "memory: the web workers would never see what it warms. Set REDIS_URL to share the cache."
+            )
+
+        # spread the first pass out so several workers started together do not fire in lockstep
+        if not options['once']:
+            time.sleep(random.uniform(0, interval * jitter))
+
+        while True:
+            started = time.monotonic()
+            plan = build_plan()
+            counts = run_plan(plan, max_workers=options['workers'], min_fresh=min_fresh)
+            self.stdout.write(
+                f"Warmed {plan.spots} spots in {time.monotonic() - started:.1f}s: "
+                f"{counts['fetched']} fetched, {counts['skipped']} still fresh, {counts['failed']} failed"
+            )
+            if options['once']:
+                return
+            time.sleep(max(0.0, interval * random.uniform(1 - jitter, 1 + jitter)))
+
+    def report(self, plan):
+        self.stdout.write(f"Saved spots:            {plan.spots}")
+        self.stdout.write(f"Distinct tide days:     {len(plan.tide_tasks)}")
+        self.stdout.write(f"Distinct weather cells: {len(plan.weather_tasks)}")
+        self.stdout.write(f"Upstream calls per pass: {len(plan)} (vs {plan.naive_calls} warming each spot separately, "
+                          f"{plan.naive_calls - len(plan)} saved)")
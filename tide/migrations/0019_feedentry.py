@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0018_geocodecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('recipient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='tide.profile')),
+                ('status_message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='tide.statusmessage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipient', '-timestamp', '-status_message'], name='feed_recipient_time_idx')],
+                'unique_together': {('recipient', 'status_message')},
+            },
+        ),
+    ]
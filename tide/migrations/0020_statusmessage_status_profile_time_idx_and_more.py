@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0019_feedentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='statusmessage',
+            index=models.Index(fields=['profile', '-timestamp', '-id'], name='status_profile_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surfsession',
+            index=models.Index(fields=['-date', '-id'], name='session_date_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+MAX_COMMENT_DEPTH = 32
+
+
+def comment_path_segment(pk):
+    digits = ''
+    while pk:
+        pk, remainder = divmod(pk, 36)
+        digits = '0123456789abcdefghijklmnopqrstuvwxyz'[remainder] + digits
+    return digits.rjust(7, '0')
+
+
+def fill_comment_paths(apps, schema_editor):
+    """Give existing comments their path and depth; parents always have smaller ids."""
+    Comment = apps.get_model('tide', 'Comment')
+    known = {}  # pk -> (path, depth, parent pk)
+    for comment in Comment.objects.order_by('pk').only('pk', 'parent_comment_id').iterator():
+        parent_id = comment.parent_comment_id
+        while parent_id in known and known[parent_id][1] + 1 >= MAX_COMMENT_DEPTH:
+            parent_id = known[parent_id][2]
+        parent = known.get(parent_id)
+        path = (parent[0] if parent else '') + comment_path_segment(comment.pk)
+        depth = parent[1] + 1 if parent else 0
+        known[comment.pk] = (path, depth, parent_id)
+        Comment.objects.filter(pk=comment.pk).update(path=path, depth=depth, parent_comment_id=parent_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0020_statusmessage_status_profile_time_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_comment_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['status_message', 'path'], name='comment_thread_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+def canonicalize_friendships(apps, schema_editor):
+    """
+    Store every friendship as (smaller id, larger id). Self-pairs and all but the oldest row
+    of each pair (in either orientation) are deleted first, so reordering what is left can't
+    collide with the unique (profile1, profile2) constraint.
+    """
+    Friend = apps.get_model('tide', 'Friend')
+    seen = set()
+    duplicates = []
+    for pk, profile1_id, profile2_id in Friend.objects.order_by('pk').values_list('pk', 'profile1_id', 'profile2_id'):
+        pair = (min(profile1_id, profile2_id), max(profile1_id, profile2_id))
+        if pair[0] == pair[1] or pair in seen:
+            duplicates.append(pk)
+        else:
+            seen.add(pair)
+    for start in range(0, len(duplicates), 500):
+        Friend.objects.filter(pk__in=duplicates[start:start + 500]).delete()
+    Friend.objects.filter(profile1__gt=models.F('profile2')).update(
+        profile1=models.F('profile2'), profile2=models.F('profile1'))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0021_comment_depth_comment_path_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(canonicalize_friendships, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='friend',
+            constraint=models.CheckConstraint(condition=models.Q(('profile1__lt', models.F('profile2'))), name='friend_pair_ordered'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0022_friend_friend_pair_ordered'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FriendSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('mutual_friends', models.PositiveIntegerField(default=0)),
+                ('shared_stations', models.PositiveIntegerField(default=0)),
+                ('distance_km', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FriendSuggestionRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='surfspot',
+            index=models.Index(fields=['latitude', 'longitude'], name='surfspot_location_idx'),
+        ),
+        migrations.AddField(
+            model_name='friendsuggestion',
+            name='profile',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_suggestions', to='tide.profile'),
+        ),
+        migrations.AddField(
+            model_name='friendsuggestion',
+            name='suggested',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tide.profile'),
+        ),
+        migrations.AddField(
+            model_name='friendsuggestionrefresh',
+            name='profile',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tide.profile'),
+        ),
+        migrations.AddIndex(
+            model_name='friendsuggestion',
+            index=models.Index(fields=['profile', '-score'], name='suggestion_profile_score_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='friendsuggestion',
+            unique_together={('profile', 'suggested')},
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:26
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Set the new counter columns from the existing rows."""
+    def related_count(model, field):
+        return Coalesce(Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by()
+            .values(field).annotate(n=Count('pk')).values('n'),
+            output_field=IntegerField(),
+        ), Value(0))
+
+    Profile = apps.get_model('tide', 'Profile')
+    StatusMessage = apps.get_model('tide', 'StatusMessage')
+    Comment = apps.get_model('tide', 'Comment')
+    Friend = apps.get_model('tide', 'Friend')
+    SurfSpot = apps.get_model('tide', 'SurfSpot')
+    SurfSession = apps.get_model('tide', 'SurfSession')
+    StatusMessage.objects.update(comment_count=related_count(Comment, 'status_message'))
+    Profile.objects.update(
+        status_count=related_count(StatusMessage, 'profile'),
+        friend_count=related_count(Friend, 'profile1') + related_count(Friend, 'profile2'),
+    )
+    SurfSpot.objects.update(session_count=related_count(SurfSession, 'surf_spot'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0023_friendsuggestion_friendsuggestionrefresh_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='friend_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='status_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='statusmessage',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='surfspot',
+            name='session_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:28
+
+from django.db import migrations, models
+
+# SQLite: an external-content FTS5 table over tide_searchdocument's body and kind, kept in
+# sync by triggers. If a later migration makes Django rebuild tide_searchdocument, recreate these.
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE tide_searchdocument_fts USING fts5(body, kind, content='tide_searchdocument', "
+    "content_rowid='id', tokenize='porter unicode61', prefix='2 3 4')",
+    "CREATE TRIGGER tide_searchdocument_ai AFTER INSERT ON tide_searchdocument BEGIN "
+    "INSERT INTO tide_searchdocument_fts(rowid, body, kind) VALUES (new.id, new.body, new.kind); END",
+    "CREATE TRIGGER tide_searchdocument_ad AFTER DELETE ON tide_searchdocument BEGIN "
+    "INSERT INTO tide_searchdocument_fts(tide_searchdocument_fts, rowid, body, kind) "
+    "VALUES ('delete', old.id, old.body, old.kind); END",
+    "CREATE TRIGGER tide_searchdocument_au AFTER UPDATE ON tide_searchdocument BEGIN "
+    "INSERT INTO tide_searchdocument_fts(tide_searchdocument_fts, rowid, body, kind) "
+    "VALUES ('delete', old.id, old.body, old.kind); "
+    "INSERT INTO tide_searchdocument_fts(rowid, body, kind) VALUES (new.id, new.body, new.kind); END",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS tide_searchdocument_au",
+    "DROP TRIGGER IF EXISTS tide_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS tide_searchdocument_ai",
+    "DROP TABLE IF EXISTS tide_searchdocument_fts",
+]
+# Postgres: a GIN index on the same to_tsvector() expression tide/search.py queries with.
+POSTGRES_INDEX = [
+    "CREATE INDEX tide_searchdocument_body_gin ON tide_searchdocument USING gin (to_tsvector('english', body))",
+]
+POSTGRES_DROP = ["DROP INDEX IF EXISTS tide_searchdocument_body_gin"]
+
+
+def run_for_vendor(sqlite, postgres):
+    def run(apps, schema_editor):
+        statements = {'sqlite': sqlite, 'postgresql': postgres}.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+def fill_search_documents(apps, schema_editor):
+    """Index the text that already exists (tide/search.py keeps it current from here on)."""
+    SearchDocument = apps.get_model('tide', 'SearchDocument')
+    Profile = apps.get_model('tide', 'Profile')
+    default_bio = Profile._meta.get_field('bio').default
+    sources = [
+        ('status', apps.get_model('tide', 'StatusMessage'), lambda o: o.message),
+        ('comment', apps.get_model('tide', 'Comment'), lambda o: o.comment_text),
+        ('profile', Profile, lambda o: ' '.join(filter(None, [
+            o.fname, o.lname, o.city, '' if o.bio == default_bio else o.bio]))),
+        ('session', apps.get_model('tide', 'SurfSession'), lambda o: o.notes),
+    ]
+    for kind, model, text in sources:
+        SearchDocument.objects.bulk_create([
+            SearchDocument(kind=kind, object_id=obj.pk, body=text(obj).strip())
+            for obj in model.objects.iterator() if text(obj).strip()
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0024_profile_friend_count_profile_status_count_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('status', 'Status messages'), ('comment', 'Comments'), ('profile', 'Profiles'), ('session', 'Surf sessions')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('body', models.TextField()),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(
+            run_for_vendor(SQLITE_INDEX, POSTGRES_INDEX), run_for_vendor(SQLITE_DROP, POSTGRES_DROP),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
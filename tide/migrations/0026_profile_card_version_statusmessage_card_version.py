@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0025_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='card_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='statusmessage',
+            name='card_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
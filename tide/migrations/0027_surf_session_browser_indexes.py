@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0026_profile_card_version_statusmessage_card_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='surfsession',
+            index=models.Index(fields=['surf_spot', '-date', '-id'], name='session_spot_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surfsession',
+            index=models.Index(fields=['wave_rating', '-date', '-id'], name='session_rating_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surfsession',
+            index=models.Index(fields=['date', 'surf_spot', 'wave_rating'], name='session_facet_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surfspot',
+            index=models.Index(fields=['nickname'], name='surfspot_nickname_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:43
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_rollups(apps, schema_editor):
+    """Compute both rollup tables from the existing sessions."""
+    SurfSession = apps.get_model('tide', 'SurfSession')
+    aggregates = {'session_count': Count('pk'), 'total_duration': Sum('duration')}
+    for rating in range(1, 6):
+        aggregates[f'rating_{rating}'] = Count('pk', filter=Q(wave_rating=rating))
+    grouped = {
+        'SurfSessionMonthlyRollup': SurfSession.objects.annotate(month=TruncMonth('date'))
+        .values('user_id', 'surf_spot_id', 'month'),
+        'StationDailyRollup': SurfSession.objects.values(station_id=F('surf_spot__station_id'), day=F('date')),
+    }
+    for name, rows in grouped.items():
+        model = apps.get_model('tide', name)
+        model.objects.bulk_create(
+            (model(**row) for row in rows.order_by().annotate(**aggregates).iterator()), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0027_surf_session_browser_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_count', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.DurationField(default=datetime.timedelta)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+                ('station_id', models.CharField(max_length=10)),
+                ('day', models.DateField()),
+            ],
+            options={
+                'unique_together': {('station_id', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SurfSessionMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_count', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.DurationField(default=datetime.timedelta)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+                ('month', models.DateField()),
+                ('surf_spot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tide.surfspot')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-month'], name='rollup_user_month_idx'), models.Index(fields=['surf_spot', '-month'], name='rollup_spot_month_idx')],
+                'unique_together': {('user', 'surf_spot', 'month')},
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0028_surf_session_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurfSessionConditions',
+            fields=[
+                ('surf_session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='conditions', serialize=False, to='tide.surfsession')),
+                ('observed_at', models.DateTimeField()),
+                ('tide_height', models.FloatField(blank=True, null=True)),
+                ('tide_trend', models.SmallIntegerField(blank=True, choices=[(1, 'Rising'), (-1, 'Falling')], null=True)),
+                ('high_tide', models.FloatField(blank=True, null=True)),
+                ('low_tide', models.FloatField(blank=True, null=True)),
+                ('tide_source', models.CharField(blank=True, max_length=10)),
+                ('moon_phase', models.CharField(max_length=30)),
+                ('moon_phase_index', models.FloatField()),
+                ('wind_speed', models.FloatField(blank=True, null=True)),
+                ('wind_gust', models.FloatField(blank=True, null=True)),
+                ('wind_direction', models.SmallIntegerField(blank=True, null=True)),
+                ('complete', models.BooleanField(default=True)),
+                ('captured_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'surf session conditions',
+            },
+        ),
+    ]
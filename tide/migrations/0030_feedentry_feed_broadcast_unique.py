@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+def drop_duplicate_broadcasts(apps, schema_editor):
+    """Keep the oldest broadcast entry of each status message, so the constraint can be added."""
+    FeedEntry = apps.get_model('tide', 'FeedEntry')
+    seen = set()
+    duplicates = []
+    for pk, status_message_id in FeedEntry.objects.filter(recipient__isnull=True).order_by('pk').values_list('pk', 'status_message_id'):
+        if status_message_id in seen:
+            duplicates.append(pk)
+        seen.add(status_message_id)
+    for start in range(0, len(duplicates), 500):
+        FeedEntry.objects.filter(pk__in=duplicates[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0029_surf_session_conditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_broadcasts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('recipient__isnull', True)), fields=('status_message',), name='feed_broadcast_unique'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_feed_entries(apps, schema_editor):
+    """
+    Fan out every status message that has no FeedEntry yet (everything posted before the
+    timelines existed), the way feed.fan_out does: one entry per other profile, or a single
+    broadcast entry when that would be more than FEED_FANOUT_LIMIT rows.
+    """
+    FeedEntry = apps.get_model('tide', 'FeedEntry')
+    Profile = apps.get_model('tide', 'Profile')
+    StatusMessage = apps.get_model('tide', 'StatusMessage')
+    fanout_limit = getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+    profile_ids = list(Profile.objects.order_by('pk').values_list('pk', flat=True))
+    broadcast = len(profile_ids) - 1 > fanout_limit
+
+    pending = (
+        StatusMessage.objects.filter(~models.Exists(FeedEntry.objects.filter(status_message=models.OuterRef('pk'))))
+        .order_by('timestamp', 'pk')
+        .values_list('pk', 'profile_id', 'timestamp')
+    )
+    entries = []
+    for pk, author_id, timestamp in pending.iterator():
+        if broadcast:
+            entries.append(FeedEntry(status_message_id=pk, recipient_id=None, timestamp=timestamp))
+        else:
+            entries.extend(
+                FeedEntry(status_message_id=pk, recipient_id=recipient_id, timestamp=timestamp)
+                for recipient_id in profile_ids if recipient_id != author_id
+            )
+        if len(entries) >= 500:
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tide', '0030_feedentry_feed_broadcast_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_feed_entries, migrations.RunPython.noop),
+    ]
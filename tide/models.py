@@ -2,17 +2,39 @@
 # Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
 # Description: This file contains the models for the We Tide application.
 
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.urls import reverse
+
+from .cache import invalidated_ttl
 # forms.py
 
 
+class CounterFieldsMixin:
+    """
+    For models with columns that are only changed by F() updates (the counters in
+    tide/counters.py and card versions in tide/fragments.py): saving an existing row
+    writes every other field, so a stale instance can't overwrite concurrent increments.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
 ##############################################################################################
 ######################################## USER MODELS #########################################
 ##############################################################################################
 
-class Profile(models.Model):
+class Profile(CounterFieldsMixin, models.Model):
     """
     Model to encapsulate the idea of a Profile associated with a User.
     """
@@ -24,6 +46,12 @@ class Profile(models.Model):
     email = models.EmailField()              
     image = models.ImageField(upload_to='profile_images/', blank=True, null=True)  
     bio = models.TextField(default="This is where you can add a bio or description about the user.", blank=True)
+    # counters maintained by tide/counters.py, so pages can show them without counting rows
+    friend_count = models.PositiveIntegerField(default=0, editable=False)
+    status_count = models.PositiveIntegerField(default=0, editable=False)
+    card_version = models.PositiveIntegerField(default=0, editable=False)  # see tide/fragments.py
+
+    counter_fields = ('friend_count', 'status_count', 'card_version')
 
 
     def __str__(self):
@@ -36,64 +64,162 @@ class Profile(models.Model):
         """Add another profile as a friend if no duplicate relationship exists."""
         if self == other:
             return
-
-        existing_friendship = Friend.objects.filter(
-            models.Q(profile1=self, profile2=other) | models.Q(profile1=other, profile2=self)
-        ).exists()
-
-        if not existing_friendship:
-            Friend.objects.create(profile1=self, profile2=other)
+        Friend.objects.get_or_create(**Friend.objects.canonical_pair(self, other))
 
     def remove_friend(self, other):
         """Remove a friend relationship if it exists."""
-        Friend.objects.filter(
-            models.Q(profile1=self, profile2=other) | models.Q(profile1=other, profile2=self)
-        ).delete()
+        Friend.objects.filter(**Friend.objects.canonical_pair(self, other)).delete()
 
+    def friend_ids(self):
+        """Return the (cached) frozenset of this profile's friends' ids."""
+        return Friend.objects.friend_ids(self)
+
+    def is_friend(self, other):
+        """True if this profile and other are friends."""
+        return Friend.objects.are_friends(self, other)
 
     def get_friends(self):
         """Retrieve all friends of this profile."""
-        friends = Friend.objects.filter(models.Q(profile1=self) | models.Q(profile2=self))
-        return [f.profile2 if f.profile1 == self else f.profile1 for f in friends]
-
-    def get_friend_suggestions(self):
-        """Get friend suggestions for this profile."""
-        friends = self.get_friends()
-        all_profiles = Profile.objects.exclude(pk=self.pk)
-        suggested_friends = all_profiles.exclude(pk__in=[friend.pk for friend in friends])
-        return suggested_friends
+        return Profile.objects.filter(pk__in=self.friend_ids())
+
+    def get_friend_suggestions(self, limit=None):
+        """
+        Get this profile's precomputed friend suggestions, best first (see tide/suggestions.py).
+        Each suggested Profile carries score, mutual_friends, shared_stations and distance_km.
+        """
+        rows = (
+            FriendSuggestion.objects.filter(profile=self)
+            .exclude(suggested_id__in=self.friend_ids())
+            .select_related('suggested')
+            .order_by('-score', 'suggested_id')
+        )
+        suggestions = []
+        for row in rows[:limit] if limit else rows:
+            suggestion = row.suggested
+            suggestion.score = row.score
+            suggestion.mutual_friends = row.mutual_friends
+            suggestion.shared_stations = row.shared_stations
+            suggestion.distance_km = row.distance_km
+            suggestions.append(suggestion)
+        return suggestions
     
     def get_news_feed(self):
-        """Retrieve status messages for the current profile's friends and non-friends, excluding the current profile's own posts."""
-        
-        friends = self.get_friends()
-        
-        return StatusMessage.objects.filter(
-            models.Q(profile__in=friends) | 
-            models.Q(profile__in=Profile.objects.exclude(pk=self.pk))
-        ).exclude(profile=self).order_by('-timestamp')
+        """
+        Retrieve the sources of this profile's news feed from the materialized FeedEntry
+        timeline: its own entries, and the broadcast entries written for posts that were
+        too widely seen to fan out (see tide/feed.py), less its own posts. Each is read in
+        (timestamp, status message) order straight off feed_recipient_time_idx, so
+        feed.news_feed_page() merges them a page at a time rather than sorting either.
+        """
+        return [
+            FeedEntry.objects.filter(recipient=self),
+            FeedEntry.objects.filter(recipient__isnull=True).exclude(status_message__profile=self),
+        ]
 
 
     def get_status_messages(self):
-        return StatusMessage.objects.filter(profile=self).order_by('-timestamp')
+        return StatusMessage.objects.filter(profile=self).order_by('-timestamp', '-pk')
 
     def get_surf_sessions(self):
         return SurfSession.objects.filter(profile=self).order_by('-date')
     
+class FriendManager(models.Manager):
+    """Friendship lookups backed by a cached set of friend ids per profile."""
+
+    cache_ttl = 24 * 60 * 60
+
+    @staticmethod
+    def canonical_pair(a, b):
+        """Return {'profile1_id', 'profile2_id'} for two profiles (or ids), smaller id first."""
+        a, b = getattr(a, 'pk', a), getattr(b, 'pk', b)
+        return {'profile1_id': min(a, b), 'profile2_id': max(a, b)}
+
+    @staticmethod
+    def cache_key(profile_id):
+        return f'friends:{profile_id}'
+
+    def friend_ids(self, profile):
+        """
+        Return the frozenset of ids of profile's friends, cached until a friendship changes
+        (and, with a process-local cache, for seconds at most: see cache.invalidated_ttl).
+        """
+        profile_id = getattr(profile, 'pk', profile)
+        key = self.cache_key(profile_id)
+        ids = cache.get(key)
+        if ids is None:
+            ids = frozenset(
+                self.filter(profile1_id=profile_id).values_list('profile2_id', flat=True).union(
+                    self.filter(profile2_id=profile_id).values_list('profile1_id', flat=True)
+                )
+            )
+            cache.set(key, ids, invalidated_ttl(self.cache_ttl))
+        return ids
+
+    def are_friends(self, a, b):
+        """True if profiles (or ids) a and b are friends."""
+        return getattr(b, 'pk', b) in self.friend_ids(a)
+
+    def invalidate(self, *profile_ids):
+        """Forget the cached friend sets of these profiles."""
+        cache.delete_many([self.cache_key(profile_id) for profile_id in profile_ids])
+
+
 class Friend(models.Model):
-    """Model to represent a friendship relationship between two profiles."""
+    """
+    Model to represent a friendship relationship between two profiles. Each friendship
+    is stored once, as the ordered pair profile1 < profile2 (see FriendManager.canonical_pair).
+    """
     profile1 = models.ForeignKey(Profile, related_name="profile1_friends", on_delete=models.CASCADE)
     profile2 = models.ForeignKey(Profile, related_name="profile2_friends", on_delete=models.CASCADE)
 
+    objects = FriendManager()
+
     class Meta:
         unique_together = ('profile1', 'profile2')
+        constraints = [
+            models.CheckConstraint(condition=models.Q(profile1__lt=models.F('profile2')), name='friend_pair_ordered'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.profile1_id > self.profile2_id:
+            self.profile1_id, self.profile2_id = self.profile2_id, self.profile1_id
+        super().save(*args, **kwargs)
+
+
+class FriendSuggestion(models.Model):
+    """A precomputed, ranked "people you may know" entry for one profile."""
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='friend_suggestions')
+    suggested = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    mutual_friends = models.PositiveIntegerField(default=0)
+    shared_stations = models.PositiveIntegerField(default=0)
+    distance_km = models.FloatField(null=True, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('profile', 'suggested')
+        indexes = [
+            models.Index(fields=['profile', '-score'], name='suggestion_profile_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.suggested_id} for {self.profile_id} ({self.score:.2f})"
+
+
+class FriendSuggestionRefresh(models.Model):
+    """A profile whose friend suggestions are out of date and queued for recomputation."""
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='+')
+    requested_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Refresh suggestions for {self.profile_id}"
 
 ##############################################################################################
 ######################################## SURF MODELS #########################################
 ##############################################################################################
 
 
-class SurfSpot(models.Model):
+class SurfSpot(CounterFieldsMixin, models.Model):
     """Model representing a surf spot with associated user and location details."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='surf_spots')
     station_id = models.CharField(max_length=10)
@@ -101,12 +227,19 @@ class SurfSpot(models.Model):
     latitude = models.FloatField()
     longitude = models.FloatField()
     created_at = models.DateTimeField(auto_now_add=True)
+    session_count = models.PositiveIntegerField(default=0, editable=False)  # see tide/counters.py
+
+    counter_fields = ('session_count',)
 
     def __str__(self):
         return f"{self.nickname or self.station_id}"
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='surfspot_location_idx'),
+            models.Index(fields=['nickname'], name='surfspot_nickname_idx'),
+        ]
 class SurfSession(models.Model):
     """Model to represent a surf session for a user."""
     
@@ -117,6 +250,17 @@ class SurfSession(models.Model):
     wave_rating = models.IntegerField(choices=[(i, str(i)) for i in range(1, 6)])
     notes = models.TextField(blank=True, max_length=100)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='session_date_idx'),
+            # the public session browser (see tide/facets.py): a spot or rating filter
+            # reads its sessions newest first, and the facet counts over a date range are
+            # answered from the index alone
+            models.Index(fields=['surf_spot', '-date', '-id'], name='session_spot_date_idx'),
+            models.Index(fields=['wave_rating', '-date', '-id'], name='session_rating_date_idx'),
+            models.Index(fields=['date', 'surf_spot', 'wave_rating'], name='session_facet_idx'),
+        ]
+
     def __str__(self):
         return f"Session at {self.surf_spot} on {self.date}, Rating: {self.wave_rating}"
     
@@ -124,16 +268,114 @@ class SurfSession(models.Model):
         return reverse('surf_sessions') 
 
 
+class SessionRollup(models.Model):
+    """
+    Session totals for one group of surf sessions, maintained by tide/rollups.py: how many,
+    how long altogether, and how many got each wave rating.
+    """
+    session_count = models.PositiveIntegerField(default=0)
+    total_duration = models.DurationField(default=timedelta)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def histogram(self):
+        """[(rating, sessions)] for ratings 1 to 5."""
+        return [(rating, getattr(self, f'rating_{rating}')) for rating in range(1, 6)]
+
+    @property
+    def mean_rating(self):
+        if not self.session_count:
+            return None
+        return sum(rating * count for rating, count in self.histogram) / self.session_count
+
+
+class SurfSessionMonthlyRollup(SessionRollup):
+    """A user's sessions at one of their spots in one month (month is its first day)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    surf_spot = models.ForeignKey(SurfSpot, on_delete=models.CASCADE, related_name='+')
+    month = models.DateField()
+
+    class Meta:
+        unique_together = ('user', 'surf_spot', 'month')
+        indexes = [
+            models.Index(fields=['user', '-month'], name='rollup_user_month_idx'),
+            models.Index(fields=['surf_spot', '-month'], name='rollup_spot_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} at {self.surf_spot_id} in {self.month:%Y-%m}: {self.session_count} sessions"
+
+
+class StationDailyRollup(SessionRollup):
+    """Everyone's sessions at spots on one NOAA station on one day."""
+    station_id = models.CharField(max_length=10)
+    day = models.DateField()
+
+    class Meta:
+        unique_together = ('station_id', 'day')
+
+    def __str__(self):
+        return f"{self.station_id} on {self.day}: {self.session_count} sessions"
+
+
+class SurfSessionConditions(models.Model):
+    """
+    The tide, moon and wind conditions of a surf session, captured by tide/conditions.py when
+    the session is saved so they can be analysed without calling NOAA or OpenWeather again.
+    Tide heights are meters above MLLW at observed_at; wind (mph, degrees) is only known for
+    sessions captured on the day they happened. complete is False when an upstream call failed, so
+    backfill_session_conditions tries again.
+    """
+    TREND_CHOICES = [(1, 'Rising'), (-1, 'Falling')]
+
+    surf_session = models.OneToOneField(SurfSession, on_delete=models.CASCADE, primary_key=True, related_name='conditions')
+    observed_at = models.DateTimeField()
+    tide_height = models.FloatField(null=True, blank=True)
+    tide_trend = models.SmallIntegerField(choices=TREND_CHOICES, null=True, blank=True)
+    high_tide = models.FloatField(null=True, blank=True)
+    low_tide = models.FloatField(null=True, blank=True)
+    tide_source = models.CharField(max_length=10, blank=True)
+    moon_phase = models.CharField(max_length=30)
+    moon_phase_index = models.FloatField()
+    wind_speed = models.FloatField(null=True, blank=True)
+    wind_gust = models.FloatField(null=True, blank=True)
+    wind_direction = models.SmallIntegerField(null=True, blank=True)
+    complete = models.BooleanField(default=True)
+    captured_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'surf session conditions'
+
+    def __str__(self):
+        return f"Conditions of session {self.surf_session_id} at {self.observed_at}"
+
+
 ##############################################################################################
 #####################################$# SOCIAL MODELS ########################################
 ##############################################################################################
 
-class StatusMessage(models.Model):
+class StatusMessage(CounterFieldsMixin, models.Model):
     """Model to store status messages, which are text updates from users."""
     timestamp = models.DateTimeField(auto_now_add=True)
     message = models.TextField()
     profile = models.ForeignKey('Profile', on_delete=models.CASCADE, related_name='status_messages')
     surf_session = models.OneToOneField(SurfSession, on_delete=models.SET_NULL, null=True, blank=True)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)  # see tide/counters.py
+    card_version = models.PositiveIntegerField(default=0, editable=False)  # see tide/fragments.py
+
+    counter_fields = ('comment_count', 'card_version')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', '-timestamp', '-id'], name='status_profile_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.timestamp} - {self.message[:20]}..."
@@ -155,19 +397,150 @@ class Image(models.Model):
     def __str__(self):
         return f"Image {self.id} for StatusMessage {self.status_message.id}"
     
+# Comment paths are the base-36 ids of a comment's ancestors and itself, each padded to
+# COMMENT_PATH_WIDTH characters, so sorting by path lists a thread depth-first.
+COMMENT_PATH_WIDTH = 7
+COMMENT_PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+COMMENT_PATH_END = '~'  # sorts after every digit, so [path, path + '~') is a subtree
+MAX_COMMENT_DEPTH = 32  # replies below this depth are attached to the deepest allowed comment
+
+
+def comment_path_segment(pk):
+    """Encode a comment id as a fixed-width base-36 path segment."""
+    digits = ''
+    while pk:
+        pk, remainder = divmod(pk, 36)
+        digits = COMMENT_PATH_DIGITS[remainder] + digits
+    return digits.rjust(COMMENT_PATH_WIDTH, '0')
+
+
 class Comment(models.Model): 
     '''
-    A comment on a status message or post
+    A comment on a status message or post. Replies keep a materialized path and depth
+    so whole threads can be read in one query ordered by path.
     '''
     status_message = models.ForeignKey('StatusMessage', on_delete=models.CASCADE, related_name='comments')
     parent_comment = models.ForeignKey('self', on_delete=models.CASCADE, related_name='replies', null=True, blank=True)
     profile = models.ForeignKey('Profile', on_delete=models.CASCADE, related_name='comments')
     comment_text = models.TextField()
+    path = models.CharField(max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status_message', 'path'], name='comment_thread_idx'),
+        ]
 
     def __str__(self):
-        return f"Comment {self.id} on StatusMessage {self.status_message.id}"
+        return f"Comment {self.id} on StatusMessage {self.status_message_id}"
+
+    def save(self, *args, **kwargs):
+        """Fill in path and depth when the comment is first saved."""
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        parent = self.parent_comment
+        while parent is not None and parent.depth + 1 >= MAX_COMMENT_DEPTH:
+            parent = parent.parent_comment
+        self.parent_comment = parent
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            prefix = parent.path if parent is not None else ''
+            self.path = prefix + comment_path_segment(self.pk)
+            self.depth = parent.depth + 1 if parent is not None else 0
+            Comment.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+
+    def get_descendants(self):
+        """All replies below this comment, at any depth, in thread order."""
+        return Comment.objects.filter(
+            status_message_id=self.status_message_id,
+            path__gt=self.path,
+            path__lt=self.path + COMMENT_PATH_END,
+        ).order_by('path')
+
+    def delete(self, *args, **kwargs):
+        """Delete this comment and its whole subtree with one range delete."""
+        if not self.path:
+            return super().delete(*args, **kwargs)
+        return Comment.objects.filter(
+            status_message_id=self.status_message_id,
+            path__gte=self.path,
+            path__lt=self.path + COMMENT_PATH_END,
+        ).delete()
+
+
+class FeedEntry(models.Model):
+    """
+    A status message placed in a profile's news feed when it was posted (fan-out on write).
+    Entries with no recipient are broadcasts, read by every profile (fan-out on read).
+    """
+    recipient = models.ForeignKey('Profile', on_delete=models.CASCADE, related_name='feed_entries', null=True, blank=True)
+    status_message = models.ForeignKey('StatusMessage', on_delete=models.CASCADE, related_name='feed_entries')
+    timestamp = models.DateTimeField()  # copied from the status message so feeds are read from one index
+
+    class Meta:
+        unique_together = ('recipient', 'status_message')
+        constraints = [
+            # unique_together can't see duplicate broadcasts: their NULL recipients never compare equal
+            models.UniqueConstraint(fields=['status_message'], condition=models.Q(recipient__isnull=True),
+                                    name='feed_broadcast_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['recipient', '-timestamp', '-status_message'], name='feed_recipient_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"StatusMessage {self.status_message_id} for {self.recipient_id or 'everyone'}"
 
 
 
     
 
+
+class SearchDocument(models.Model):
+    """
+    The searchable text of one status message, comment, profile or surf session. The
+    full-text index over body lives outside the ORM (see tide/search.py): an FTS5 table
+    kept in sync by triggers on SQLite, a GIN expression index on Postgres.
+    """
+    KINDS = [
+        ('status', 'Status messages'),
+        ('comment', 'Comments'),
+        ('profile', 'Profiles'),
+        ('session', 'Surf sessions'),
+    ]
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.PositiveIntegerField()
+    body = models.TextField()
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+##############################################################################################
+######################################## CACHE MODELS ########################################
+##############################################################################################
+
+class GeocodeCacheEntry(models.Model):
+    """
+    Cached Google Geocoding result for a normalized address. Addresses Google could not
+    find are stored too (found=False) so repeats do not spend API quota.
+    """
+    address_key = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    found = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    @property
+    def location(self):
+        """(latitude, longitude), or None for addresses Google could not find."""
+        return (self.latitude, self.longitude) if self.found else None
+
+    def __str__(self):
+        return f"{self.address_key} -> {self.location or 'not found'}"
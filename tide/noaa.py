@@ -0,0 +1,141 @@
+# File: noaa.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Client for the NOAA CO-OPS datagetter API, with a shared response cache.
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+
+from . import upstream
+from .cache import StaleWhileRevalidateCache
+from .series import TideSeries
+
+logger = logging.getLogger(__name__)
+
+NOAA_DATAGETTER_URL = "https://api.tidesandcurrents.noaa.gov/api/prod/datagetter"
+
+# Observed water levels update every six minutes; predictions only change when NOAA
+# re-publishes a station's harmonics, so they can be kept much longer.
+DEFAULT_CACHE_TTLS = {
+    'water_level': 6 * 60,
+    'hourly_height': 60 * 60,
+    'high_low': 60 * 60,
+    'predictions': 24 * 60 * 60,
+}
+DEFAULT_CACHE_TTL = 10 * 60
+
+# Longest date range (in days) the datagetter accepts in one request for each product.
+MAX_RANGE_DAYS = {
+    'water_level': 31,
+    'predictions': 31,
+    'hourly_height': 365,
+    'high_low': 365,
+}
+DEFAULT_MAX_RANGE_DAYS = 31
+
+noaa_cache = StaleWhileRevalidateCache(
+    'noaa',
+    stale_ttl=getattr(settings, 'NOAA_CACHE_STALE_TTL', 60 * 60),
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'NOAA_MAX_WORKERS', 8),
+    thread_name_prefix='noaa',
+)
+
+
+def get_cache_ttl(product):
+    """Return the cache TTL in seconds for a NOAA product."""
+    ttls = {**DEFAULT_CACHE_TTLS, **getattr(settings, 'NOAA_CACHE_TTLS', {})}
+    return ttls.get(product, DEFAULT_CACHE_TTL)
+
+
+def fetch_tide_data(station_id, begin_date, end_date, product='water_level', datum='MLLW', units='metric'):
+    """
+    Request a product from the NOAA datagetter and return the decoded JSON payload.
+    Dates are 'YYYYMMDD' strings. Raises requests.exceptions.RequestException on failure,
+    including upstream.UpstreamUnavailable while NOAA's circuit is open.
+    """
+    params = {
+        "begin_date": begin_date,
+        "end_date": end_date,
+        "station": station_id,
+        "product": product,
+        "datum": datum,
+        "time_zone": "gmt",
+        "units": units,
+        "application": "we_tide",
+        "format": "json",
+    }
+    return upstream.noaa.get_json(NOAA_DATAGETTER_URL, params)
+
+
+def get_tide_data(station_id, begin_date, end_date, product='water_level', datum='MLLW', units='metric'):
+    """
+    Cached version of fetch_tide_data(). Responses are keyed by
+    (station, product, datum, date range, units) and kept for the product's TTL.
+    """
+    key = (station_id, product, datum, begin_date, end_date, units)
+    return noaa_cache.get(
+        key,
+        lambda: fetch_tide_data(station_id, begin_date, end_date, product, datum, units),
+        ttl=get_cache_ttl(product),
+    )
+
+
+def warm_tide_data(station_id, begin_date, end_date, product='water_level', datum='MLLW', units='metric', min_fresh=0):
+    """
+    Pre-fetch the entry get_tide_data() would read unless it is still fresh for
+    min_fresh seconds. Returns True when NOAA was called.
+    """
+    key = (station_id, product, datum, begin_date, end_date, units)
+    return noaa_cache.warm(
+        key,
+        lambda: fetch_tide_data(station_id, begin_date, end_date, product, datum, units),
+        ttl=get_cache_ttl(product),
+        min_fresh=min_fresh,
+    )
+
+
+def split_date_range(begin, end, product='water_level'):
+    """Split the inclusive date range [begin, end] into chunks NOAA accepts for product."""
+    span = timedelta(days=MAX_RANGE_DAYS.get(product, DEFAULT_MAX_RANGE_DAYS))
+    chunks = []
+    start = begin
+    while start <= end:
+        stop = min(start + span - timedelta(days=1), end)
+        chunks.append((start, stop))
+        start = stop + timedelta(days=1)
+    return chunks
+
+
+def get_tide_series(station_ids, begin, end, product='water_level', datum='MLLW', units='metric'):
+    """
+    Fetch product for every station over the inclusive date range [begin, end] and return
+    {station_id: TideSeries}. The range is split along NOAA's limits and all chunks for all
+    stations are requested concurrently over the shared session. Chunks that fail are
+    logged and left out, so a station may come back with a partial or empty series.
+    """
+    tasks = {}
+    for station_id in dict.fromkeys(station_ids):
+        for chunk_begin, chunk_end in split_date_range(begin, end, product):
+            future = _executor.submit(
+                get_tide_data, station_id,
+                chunk_begin.strftime('%Y%m%d'), chunk_end.strftime('%Y%m%d'),
+                product, datum, units,
+            )
+            tasks.setdefault(station_id, []).append(future)
+
+    series = {}
+    for station_id, futures in tasks.items():
+        parts = []
+        for future in futures:
+            try:
+                parts.append(TideSeries.from_noaa(future.result(), station_id))
+            except requests.exceptions.RequestException as e:
+                logger.warning("NOAA request for station %s failed: %s", station_id, e)
+        series[station_id] = TideSeries.concat(parts, station_id)
+    return series
@@ -0,0 +1,163 @@
+# File: pagination.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Keyset (cursor) pagination over ordered querysets, with signed opaque cursor tokens.
+
+from datetime import date, datetime
+
+from django.core import signing
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_PER_PAGE = 20
+
+
+class CursorPage:
+    """One page of results plus the token that continues after its last item."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.next_query = ''
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Pages through a queryset by the values of its ordering fields instead of OFFSET,
+    so every page is an index range scan that starts right after the previous page.
+
+    ordering lists attribute names with an optional '-' for descending order, e.g.
+    ('-timestamp', '-pk'); the last one must be unique so ties are broken. Each name
+    must be a field or annotation on the queryset's model. Cursors are the ordering
+    values of a page's last item, signed so they cannot be tampered with.
+    """
+
+    salt = 'tide.pagination'
+
+    def __init__(self, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        """
+        Return the CursorPage after cursor, or the first page when cursor is empty.
+        Raises Http404 for a cursor that was not issued by this paginator.
+        """
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode(cursor)))
+
+        # fetch one extra row to learn whether there is a next page without COUNT(*)
+        items = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(items) > self.per_page:
+            items = items[:self.per_page]
+            next_cursor = self.encode(items[-1])
+        return CursorPage(items, next_cursor)
+
+    def encode(self, obj):
+        values = [self._dump(getattr(obj, name)) for name, _ in self.ordering]
+        return signing.dumps(values, salt=self.salt, compress=True)
+
+    def decode(self, cursor):
+        try:
+            values = signing.loads(cursor, salt=self.salt)
+        except signing.BadSignature:
+            raise Http404("Invalid page cursor.")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise Http404("Invalid page cursor.")
+        return [self._load(value) for value in values]
+
+    def _after(self, values):
+        """
+        Build the row-value comparison "(a, b, c) > cursor" as
+        a >= x AND (a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)),
+        with > flipped to < for descending fields. The leading a >= x lets the
+        database start an index range scan at the cursor.
+        """
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering, values):
+            lookup = f"{name}__{'lt' if descending else 'gt'}"
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        name, descending = self.ordering[0]
+        return Q(**{f"{name}__{'lte' if descending else 'gte'}": values[0]}) & condition
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, datetime):
+            return {'dt': value.isoformat()}
+        if isinstance(value, date):
+            return {'d': value.isoformat()}
+        return value
+
+    @staticmethod
+    def _load(value):
+        if isinstance(value, dict) and 'dt' in value:
+            return parse_datetime(value['dt'])
+        if isinstance(value, dict) and 'd' in value:
+            return parse_date(value['d'])
+        return value
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """
+    Pages through several querysets as if they were one, all in the same ordering. Each
+    is read on its own, as an index range scan after the cursor with LIMIT, and the
+    pages are merged; an OR of the sources would have to sort them all together instead.
+    """
+
+    def __init__(self, querysets, ordering, per_page=DEFAULT_PER_PAGE):
+        super().__init__(querysets[0], ordering, per_page)
+        self.querysets = [queryset.order_by(*ordering) for queryset in querysets]
+
+    def page(self, cursor=None):
+        after = self._after(self.decode(cursor)) if cursor else None
+        items = []
+        for queryset in self.querysets:
+            if after is not None:
+                queryset = queryset.filter(after)
+            items.extend(queryset[:self.per_page + 1])
+        # stable sorts from the last ordering field to the first give the combined order
+        for name, descending in reversed(self.ordering):
+            items.sort(key=lambda item: getattr(item, name), reverse=descending)
+
+        next_cursor = None
+        if len(items) > self.per_page:
+            items = items[:self.per_page]
+            next_cursor = self.encode(items[-1])
+        return CursorPage(items, next_cursor)
+
+
+def paginate(request, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+    """
+    Return the CursorPage of queryset selected by the ?cursor= in the request. Its
+    next_query is the request's query string pointing at the following page.
+    """
+    page = CursorPaginator(queryset, ordering, per_page).page(request.GET.get('cursor'))
+    return link_next_page(request, page)
+
+
+def link_next_page(request, page):
+    """Set page.next_query to the request's query string pointing at the page after it."""
+    if page.has_next:
+        params = request.GET.copy()
+        params.pop('partial', None)
+        params['cursor'] = page.next_cursor
+        page.next_query = params.urlencode()
+    return page
@@ -0,0 +1,211 @@
+# File: prediction.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Offline harmonic tide prediction from a station's published harmonic constituents.
+
+import json
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .series import TideSeries
+
+DEFAULT_HARMONICS_FILE = Path(__file__).resolve().parent / 'data' / 'harmonics.json'
+# NOAA's own predictions for one day per imported station, recorded by import_harmonics
+# --reference, which the tests hold the harmonic model to.
+REFERENCE_PREDICTIONS_FILE = Path(__file__).resolve().parent / 'data' / 'harmonics_reference.json'
+
+# Days between the Unix epoch and J2000.0 (2000-01-01 12:00 UT).
+J2000_UNIX_DAYS = 10957.5
+
+# Doodson numbers for (tau, s, h, p, N', p1), a phase offset in degrees and the
+# constituent whose nodal correction applies. Names follow NOAA's harcon listing.
+CONSTITUENTS = {
+    'M2': ((2, 0, 0, 0, 0, 0), 0, 'M2'),
+    'S2': ((2, 2, -2, 0, 0, 0), 0, None),
+    'N2': ((2, -1, 0, 1, 0, 0), 0, 'M2'),
+    'K1': ((1, 1, 0, 0, 0, 0), 90, 'K1'),
+    'M4': ((4, 0, 0, 0, 0, 0), 0, 'M4'),
+    'O1': ((1, -1, 0, 0, 0, 0), -90, 'O1'),
+    'M6': ((6, 0, 0, 0, 0, 0), 0, 'M6'),
+    'MK3': ((3, 1, 0, 0, 0, 0), 90, 'MK3'),
+    'S4': ((4, 4, -4, 0, 0, 0), 0, None),
+    'MN4': ((4, -1, 0, 1, 0, 0), 0, 'M4'),
+    'NU2': ((2, -1, 2, -1, 0, 0), 0, 'M2'),
+    'S6': ((6, 6, -6, 0, 0, 0), 0, None),
+    'MU2': ((2, -2, 2, 0, 0, 0), 0, 'M2'),
+    '2N2': ((2, -2, 0, 2, 0, 0), 0, 'M2'),
+    'OO1': ((1, 3, 0, 0, 0, 0), 90, 'OO1'),
+    'LAM2': ((2, 1, -2, 1, 0, 0), 180, 'M2'),
+    'S1': ((1, 1, -1, 0, 0, 0), 0, None),
+    'M1': ((1, 0, 0, 0, 0, 0), 0, 'O1'),
+    'J1': ((1, 2, 0, -1, 0, 0), 90, 'J1'),
+    'MM': ((0, 1, 0, -1, 0, 0), 0, 'MM'),
+    'SSA': ((0, 0, 2, 0, 0, 0), 0, None),
+    'SA': ((0, 0, 1, 0, 0, 0), 0, None),
+    'MSF': ((0, 2, -2, 0, 0, 0), 0, 'M2'),
+    'MF': ((0, 2, 0, 0, 0, 0), 0, 'MF'),
+    'RHO': ((1, -3, 2, 1, 0, 0), -90, 'O1'),
+    'Q1': ((1, -2, 0, 1, 0, 0), -90, 'O1'),
+    'T2': ((2, 2, -3, 0, 0, 1), 0, None),
+    'R2': ((2, 2, -1, 0, 0, -1), 180, None),
+    '2Q1': ((1, -3, 0, 2, 0, 0), -90, 'O1'),
+    'P1': ((1, 1, -2, 0, 0, 0), -90, None),
+    '2SM2': ((2, 4, -4, 0, 0, 0), 0, 'M2'),
+    'M3': ((3, 0, 0, 0, 0, 0), 180, 'M3'),
+    'L2': ((2, 1, 0, -1, 0, 0), 180, 'M2'),
+    '2MK3': ((3, -1, 0, 0, 0, 0), -90, '2MK3'),
+    'K2': ((2, 2, 0, 0, 0, 0), 0, 'K2'),
+    'M8': ((8, 0, 0, 0, 0, 0), 0, 'M8'),
+    'MS4': ((4, 2, -2, 0, 0, 0), 0, 'M2'),
+}
+
+
+def astronomical_arguments(times):
+    """
+    Return a (6, n) array of the Doodson arguments (tau, s, h, p, N', p1) in degrees
+    for an array of numpy datetime64 values in UTC.
+    """
+    days = times.astype('datetime64[s]').astype(np.float64) / 86400.0 - J2000_UNIX_DAYS
+    centuries = days / 36525.0
+
+    s = 218.3164 + 481267.8812 * centuries   # mean longitude of the moon
+    h = 280.4661 + 36000.7698 * centuries    # mean longitude of the sun
+    p = 83.3535 + 4069.0137 * centuries      # longitude of lunar perigee
+    n = 125.0445 - 1934.1363 * centuries     # longitude of the moon's ascending node
+    p1 = 282.9384 + 1.7195 * centuries       # longitude of solar perigee
+    tau = 360.0 * (days + 0.5) + h - s       # mean lunar time
+
+    return np.vstack([tau, s, h, p, -n, p1])
+
+
+def node_factors(node_longitude):
+    """
+    Return {group: (f, u)} nodal amplitude factors and phase corrections (degrees)
+    for the lunar node longitude N in degrees.
+    """
+    n = np.radians(node_longitude)
+    m2 = (1.0004 - 0.0373 * np.cos(n) + 0.0002 * np.cos(2 * n), -2.14 * np.sin(n))
+    o1 = (1.0089 + 0.1871 * np.cos(n) - 0.0147 * np.cos(2 * n),
+          10.80 * np.sin(n) - 1.34 * np.sin(2 * n) + 0.19 * np.sin(3 * n))
+    k1 = (1.0060 + 0.1150 * np.cos(n) - 0.0088 * np.cos(2 * n),
+          -8.86 * np.sin(n) + 0.68 * np.sin(2 * n) - 0.07 * np.sin(3 * n))
+    k2 = (1.0241 + 0.2863 * np.cos(n) + 0.0083 * np.cos(2 * n),
+          -17.74 * np.sin(n) + 0.68 * np.sin(2 * n) - 0.04 * np.sin(3 * n))
+    j1 = (1.1029 + 0.1676 * np.cos(n) - 0.0170 * np.cos(2 * n),
+          -12.94 * np.sin(n) + 1.34 * np.sin(2 * n) - 0.19 * np.sin(3 * n))
+    oo1 = (1.1027 + 0.6504 * np.cos(n) + 0.0317 * np.cos(2 * n),
+           -36.68 * np.sin(n) + 4.02 * np.sin(2 * n) - 0.57 * np.sin(3 * n))
+    mf = (1.0429 + 0.4135 * np.cos(n) - 0.004 * np.cos(2 * n),
+          -23.74 * np.sin(n) + 2.68 * np.sin(2 * n) - 0.38 * np.sin(3 * n))
+    mm = (1.0 - 0.1300 * np.cos(n), 0.0)
+
+    return {
+        None: (1.0, 0.0),
+        'M2': m2,
+        'O1': o1,
+        'K1': k1,
+        'K2': k2,
+        'J1': j1,
+        'OO1': oo1,
+        'MF': mf,
+        'MM': mm,
+        'M3': (m2[0] ** 1.5, 1.5 * m2[1]),
+        'M4': (m2[0] ** 2, 2 * m2[1]),
+        'M6': (m2[0] ** 3, 3 * m2[1]),
+        'M8': (m2[0] ** 4, 4 * m2[1]),
+        'MK3': (m2[0] * k1[0], m2[1] + k1[1]),
+        '2MK3': (m2[0] ** 2 * k1[0], 2 * m2[1] - k1[1]),
+    }
+
+
+class HarmonicModel:
+    """
+    Tide model for one station: h(t) = Z0 + sum(f * A * cos(V(t) + u - kappa)),
+    where A and kappa are the constituent amplitudes and Greenwich phases.
+    """
+
+    def __init__(self, station_id, datum_offset, constituents):
+        self.station_id = station_id
+        self.datum_offset = datum_offset
+
+        known = [(name, amp, phase) for name, (amp, phase) in constituents.items() if name in CONSTITUENTS]
+        self.names = [name for name, _, _ in known]
+        self.amplitudes = np.array([amp for _, amp, _ in known], dtype=np.float64)
+        self.phases = np.array([phase for _, _, phase in known], dtype=np.float64)
+        self.doodson = np.array([CONSTITUENTS[name][0] for name in self.names], dtype=np.float64).reshape(-1, 6)
+        self.offsets = np.array([CONSTITUENTS[name][1] for name in self.names], dtype=np.float64)
+        self.groups = [CONSTITUENTS[name][2] for name in self.names]
+
+    def predict(self, times):
+        """Return predicted heights (station units, relative to the stored datum) for datetime64 times."""
+        times = np.asarray(times, dtype='datetime64[s]')
+        if not len(times):
+            return np.empty(0)
+
+        # Nodal corrections vary over 18.6 years, so one value for the whole range is enough.
+        midpoint = times[:1] + (times[-1:] - times[:1]) // 2
+        factors = node_factors(-astronomical_arguments(midpoint)[4, 0])
+        f = np.array([factors[group][0] for group in self.groups], dtype=np.float64)
+        u = np.array([factors[group][1] for group in self.groups], dtype=np.float64)
+
+        equilibrium = self.doodson @ astronomical_arguments(times)
+        angles = np.radians(equilibrium + (self.offsets + u - self.phases)[:, None])
+        return self.datum_offset + (f * self.amplitudes) @ np.cos(angles)
+
+    def predict_range(self, begin, end, interval_minutes=6):
+        """Return (times, heights) on a fixed grid from begin (inclusive) to end (exclusive)."""
+        times = np.arange(
+            np.datetime64(begin, 'm'), np.datetime64(end, 'm'),
+            np.timedelta64(interval_minutes, 'm'),
+        )
+        return times, self.predict(times)
+
+    def predict_series(self, begin, end, interval_minutes=6):
+        """Return predictions from begin (inclusive) to end (exclusive) as a TideSeries."""
+        times, heights = self.predict_range(begin, end, interval_minutes)
+        return TideSeries(times, heights, self.station_id)
+
+    def predict_records(self, begin, end, interval_minutes=6):
+        """Return predictions in the NOAA datagetter record shape: [{'t': 'YYYY-MM-DD HH:MM', 'v': '1.234'}]."""
+        times, heights = self.predict_range(begin, end, interval_minutes)
+        stamps = np.datetime_as_string(times, unit='m')
+        return [
+            {'t': stamp.replace('T', ' '), 'v': f'{height:.3f}'}
+            for stamp, height in zip(stamps, heights)
+        ]
+
+
+@lru_cache(maxsize=1)
+def load_harmonics():
+    """Load the raw harmonics file: {station_id: {'datum_offset': float, 'constituents': {name: [amp, phase]}}}."""
+    path = Path(getattr(settings, 'TIDE_HARMONICS_FILE', DEFAULT_HARMONICS_FILE))
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_harmonic_model(station_id):
+    """Return the HarmonicModel for a station, or None if we have no constituents for it."""
+    station = load_harmonics().get(str(station_id))
+    if not station or not station.get('constituents'):
+        return None
+    return HarmonicModel(str(station_id), station.get('datum_offset', 0.0), station['constituents'])
+
+
+def clear_harmonics_cache():
+    """Forget loaded harmonics so the next lookup re-reads the data file."""
+    load_harmonics.cache_clear()
+    get_harmonic_model.cache_clear()
+
+
+def predict_day(station_id, day):
+    """Return a TideSeries of 6-minute predictions for one calendar day (UTC), or None without a model."""
+    model = get_harmonic_model(station_id)
+    if model is None:
+        return None
+    return model.predict_series(day, day + timedelta(days=1))
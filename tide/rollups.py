@@ -0,0 +1,162 @@
+# File: rollups.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Surf session rollups per (user, spot, month) and per (station, day), kept current on every write and rebuilt in bulk for reports.
+
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import StationDailyRollup, SurfSession, SurfSessionMonthlyRollup
+
+TOTAL_FIELDS = ('session_count', 'total_duration') + tuple(f'rating_{rating}' for rating in range(1, 6))
+DEFAULT_REPORT_MONTHS = 12
+DEFAULT_REPORT_DAYS = 30
+BATCH_SIZE = 500
+
+# What one session adds to its rollups; an edit takes the old one away and adds the new one.
+Contribution = namedtuple('Contribution', 'user_id surf_spot_id station_id date duration wave_rating')
+
+
+def contribution(session):
+    """The Contribution of a loaded session; use stored_contribution() for one just saved."""
+    return Contribution(session.user_id, session.surf_spot_id, session.surf_spot.station_id,
+                        session.date, session.duration, session.wave_rating)
+
+
+def stored_contribution(pk):
+    """The Contribution of a session as it is in the database, or None if it isn't."""
+    row = SurfSession.objects.filter(pk=pk).values_list(
+        'user_id', 'surf_spot_id', 'surf_spot__station_id', 'date', 'duration', 'wave_rating').first()
+    return Contribution(*row) if row else None
+
+
+def session_totals(contribution):
+    return {'session_count': 1, 'total_duration': contribution.duration, f'rating_{contribution.wave_rating}': 1}
+
+
+def rollup_keys(contribution):
+    """(rollup model, lookup of the row the contribution counts in) for each rollup table."""
+    return [
+        (SurfSessionMonthlyRollup, {
+            'user_id': contribution.user_id,
+            'surf_spot_id': contribution.surf_spot_id,
+            'month': contribution.date.replace(day=1),
+        }),
+        (StationDailyRollup, {'station_id': contribution.station_id, 'day': contribution.date}),
+    ]
+
+
+def add_totals(model, key, totals, sign=1):
+    """
+    Add (sign=1) or subtract (sign=-1) totals from the rollup row at key with one F() UPDATE,
+    creating the row first when adding. A row whose last session is subtracted is deleted.
+    """
+    if sign > 0:
+        model.objects.bulk_create([model(**key)], ignore_conflicts=True)
+    model.objects.filter(**key).update(**{
+        field: F(field) + (value if sign > 0 else -value) for field, value in totals.items()
+    })
+    if sign < 0:
+        model.objects.filter(**key, session_count=0).delete()
+
+
+def apply(contribution, sign=1):
+    """Count a session into (sign=1) or out of (sign=-1) its rollup rows."""
+    if contribution is None:
+        return
+    for model, key in rollup_keys(contribution):
+        add_totals(model, key, session_totals(contribution), sign)
+
+
+def total_aggregates():
+    """Aggregates computing TOTAL_FIELDS over a SurfSession queryset."""
+    aggregates = {'session_count': Count('pk'), 'total_duration': Sum('duration')}
+    for rating in range(1, 6):
+        aggregates[f'rating_{rating}'] = Count('pk', filter=Q(wave_rating=rating))
+    return aggregates
+
+
+def move_spot_station(surf_spot_id, old_station_id, new_station_id):
+    """Move a spot's sessions from one station's daily rollups to another's (after the spot's station_id changed)."""
+    days = SurfSession.objects.filter(surf_spot_id=surf_spot_id).order_by().values('date').annotate(**total_aggregates())
+    for row in days:
+        totals = {field: row[field] for field in TOTAL_FIELDS}
+        add_totals(StationDailyRollup, {'station_id': old_station_id, 'day': row['date']}, totals, -1)
+        add_totals(StationDailyRollup, {'station_id': new_station_id, 'day': row['date']}, totals, 1)
+
+
+def monthly_rows(sessions):
+    return sessions.annotate(month=TruncMonth('date')).values('user_id', 'surf_spot_id', 'month')
+
+
+def daily_rows(sessions):
+    return sessions.values(station_id=F('surf_spot__station_id'), day=F('date'))
+
+
+def write_rows(model, rows):
+    """Insert the rollup rows of grouped sessions (see monthly_rows and daily_rows). Returns rows written."""
+    rows = rows.order_by().annotate(**total_aggregates())
+    return len(model.objects.bulk_create((model(**row) for row in rows.iterator()), batch_size=BATCH_SIZE))
+
+
+@transaction.atomic
+def rebuild():
+    """
+    Throw away both rollup tables and recompute them from SurfSession with one GROUP BY
+    each. Returns {model name: rows written}.
+    """
+    SurfSessionMonthlyRollup.objects.all().delete()
+    StationDailyRollup.objects.all().delete()
+    return {
+        SurfSessionMonthlyRollup.__name__: write_rows(SurfSessionMonthlyRollup, monthly_rows(SurfSession.objects.all())),
+        StationDailyRollup.__name__: write_rows(StationDailyRollup, daily_rows(SurfSession.objects.all())),
+    }
+
+
+@transaction.atomic
+def recount(user_id, surf_spot_ids, station_ids, days):
+    """
+    Recompute from SurfSession the rollup rows that sessions bulk-inserted for user_id at
+    these spots and stations on these days can have changed, with a delete and a GROUP BY
+    insert per table instead of an update per row.
+    """
+    months = {day.replace(day=1) for day in days}
+    user_sessions = SurfSession.objects.filter(
+        user_id=user_id, surf_spot_id__in=surf_spot_ids, date__gte=min(months))
+    SurfSessionMonthlyRollup.objects.filter(user_id=user_id, surf_spot_id__in=surf_spot_ids, month__in=months).delete()
+    write_rows(SurfSessionMonthlyRollup, monthly_rows(user_sessions).filter(month__in=months))
+    StationDailyRollup.objects.filter(station_id__in=station_ids, day__in=days).delete()
+    write_rows(StationDailyRollup, daily_rows(SurfSession.objects.filter(surf_spot__station_id__in=station_ids, date__in=days)))
+
+
+def trend(queryset, period):
+    """
+    Sum the rollup rows of queryset per period ('month' or 'day'), newest first, as unsaved
+    rollup instances (so histogram and mean_rating work on them).
+    """
+    rows = queryset.order_by().values(period).annotate(**{f'sum_{field}': Sum(field) for field in TOTAL_FIELDS})
+    return [
+        queryset.model(**{period: row[period]}, **{field: row[f'sum_{field}'] for field in TOTAL_FIELDS})
+        for row in rows.order_by(f'-{period}')
+    ]
+
+
+def monthly_trend(months=None, **filters):
+    """A user's (user=...) or a spot's (surf_spot=...) sessions per month over the last months months."""
+    months = months or getattr(settings, 'SESSION_REPORT_MONTHS', DEFAULT_REPORT_MONTHS)
+    today = timezone.localdate()
+    year, month = divmod(today.year * 12 + today.month - months, 12)
+    start = date(year, month + 1, 1)
+    return trend(SurfSessionMonthlyRollup.objects.filter(month__gte=start, **filters), 'month')
+
+
+def daily_trend(station_id, days=None):
+    """Everyone's sessions at a station per day over the last days days."""
+    days = days or getattr(settings, 'SESSION_REPORT_DAYS', DEFAULT_REPORT_DAYS)
+    start = timezone.localdate() - timedelta(days=days - 1)
+    return trend(StationDailyRollup.objects.filter(station_id=station_id, day__gte=start), 'day')
@@ -0,0 +1,190 @@
+# File: search.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Full-text search over status messages, comments, profiles and surf sessions (SQLite FTS5 or Postgres tsvector).
+
+import re
+from collections import defaultdict
+
+from django.core import signing
+from django.db import connection, transaction
+from django.http import Http404
+
+from .models import Comment, Profile, SearchDocument, StatusMessage, SurfSession
+from .pagination import CursorPage
+
+RESULTS_PER_PAGE = 20
+MAX_QUERY_TERMS = 8
+BATCH_SIZE = 500
+FTS_TABLE = 'tide_searchdocument_fts'  # created by migration 0025 on SQLite
+POSTGRES_CONFIG = 'english'  # must match the expression of the GIN index in migration 0025
+CURSOR_SALT = 'tide.search'
+
+SEARCHED_MODELS = {
+    StatusMessage: 'status',
+    Comment: 'comment',
+    Profile: 'profile',
+    SurfSession: 'session',
+}
+
+
+def document_text(instance):
+    """The text a model instance is found by."""
+    if isinstance(instance, StatusMessage):
+        return instance.message
+    if isinstance(instance, Comment):
+        return instance.comment_text
+    if isinstance(instance, Profile):
+        bio = '' if instance.bio == Profile._meta.get_field('bio').default else instance.bio
+        return ' '.join(filter(None, [instance.fname, instance.lname, instance.city, bio]))
+    return instance.notes
+
+
+def index(instance):
+    """Create, update or (when it has no text left) remove instance's search document."""
+    kind, body = SEARCHED_MODELS[type(instance)], document_text(instance).strip()
+    if not body:
+        return unindex(instance)
+    SearchDocument.objects.update_or_create(kind=kind, object_id=instance.pk, defaults={'body': body})
+
+
+def unindex(instance):
+    SearchDocument.objects.filter(kind=SEARCHED_MODELS[type(instance)], object_id=instance.pk).delete()
+
+
+@transaction.atomic
+def rebuild():
+    """Throw away every search document and index all searchable rows again. Returns documents written."""
+    SearchDocument.objects.all().delete()
+    written = 0
+    for model, kind in SEARCHED_MODELS.items():
+        batch = []
+        for instance in model.objects.order_by('pk').iterator():
+            body = document_text(instance).strip()
+            if body:
+                batch.append(SearchDocument(kind=kind, object_id=instance.pk, body=body))
+            if len(batch) >= BATCH_SIZE:
+                written += len(SearchDocument.objects.bulk_create(batch))
+                batch = []
+        written += len(SearchDocument.objects.bulk_create(batch))
+    return written
+
+
+def query_terms(query):
+    """Split free text into at most MAX_QUERY_TERMS lowercase words, dropping search syntax."""
+    return re.findall(r'\w+', query.lower())[:MAX_QUERY_TERMS]
+
+
+def _ranked_sql(terms, kinds):
+    """
+    SQL and params selecting (id, kind, object_id, score) for every document of the given
+    kinds matching every term, where a higher score is a better match, or None when the
+    database has no full-text index. All matches are ranked, so an old document that
+    matches well still comes first.
+    """
+    if connection.vendor == 'sqlite':
+        # Quoted terms can't be read as FTS5 operators; the last one also matches as a prefix.
+        match = 'body : (' + ' '.join(f'"{term}"' for term in terms) + '*)'
+        if kinds:
+            match += ' AND kind : (' + ' OR '.join(f'"{kind}"' for kind in kinds) + ')'
+        # FTS5's rank column: bm25 computed by the index itself, with the kind column unweighted
+        sql = (f"SELECT d.id, d.kind, d.object_id, -{FTS_TABLE}.rank AS score "
+               f"FROM {FTS_TABLE} JOIN tide_searchdocument d ON d.id = {FTS_TABLE}.rowid "
+               f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rank MATCH 'bm25(1.0, 0.0)'")
+        return sql, [match]
+
+    if connection.vendor == 'postgresql':
+        kind_clause, kind_params = '', []
+        if kinds:
+            kind_clause = f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+            kind_params = list(kinds)
+        # the @@ is answered by the GIN index; ts_rank then scores only the rows it found
+        vector = f"to_tsvector('{POSTGRES_CONFIG}', d.body)"
+        sql = (f"SELECT d.id, d.kind, d.object_id, ts_rank({vector}, q)::float8 AS score "
+               f"FROM tide_searchdocument d, plainto_tsquery('{POSTGRES_CONFIG}', %s) q "
+               f"WHERE {vector} @@ q{kind_clause}")
+        return sql, [' '.join(terms), *kind_params]
+    return None
+
+
+def _fallback_rows(terms, kinds, after, limit):
+    """Unindexed substring search for other databases, newest documents first, all scored 0."""
+    documents = SearchDocument.objects.all()
+    for term in terms:
+        documents = documents.filter(body__icontains=term)
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+    if after:
+        documents = documents.filter(pk__gt=after[1])
+    return [(pk, kind, object_id, 0.0) for pk, kind, object_id in
+            documents.order_by('pk').values_list('pk', 'kind', 'object_id')[:limit]]
+
+
+def ranked_rows(terms, kinds=None, after=None, limit=RESULTS_PER_PAGE):
+    """
+    Up to limit (id, kind, object_id, score) rows for documents matching every term, best
+    first and ties by id, continuing after the (score, id) of a previous page's last row.
+    """
+    ranked = _ranked_sql(terms, kinds)
+    if ranked is None:
+        return _fallback_rows(terms, kinds, after, limit)
+
+    sql, params = ranked
+    sql = f"SELECT id, kind, object_id, score FROM ({sql}) ranked"
+    if after:
+        sql += " WHERE score < %s OR (score = %s AND id > %s)"
+        params += [after[0], after[0], after[1]]
+    sql += " ORDER BY score DESC, id LIMIT %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+def load_results(rows):
+    """
+    Turn (id, kind, object_id, score) rows into their model instances, one query per kind.
+    Each instance carries search_kind and search_score; rows whose object is gone are skipped.
+    """
+    querysets = {
+        'status': StatusMessage.objects.select_related('profile'),
+        'comment': Comment.objects.select_related('profile', 'status_message__profile'),
+        'profile': Profile.objects.all(),
+        'session': SurfSession.objects.select_related('surf_spot', 'user__profile'),
+    }
+    ids = defaultdict(list)
+    for _, kind, object_id, _ in rows:
+        ids[kind].append(object_id)
+    objects = {kind: querysets[kind].in_bulk(object_ids) for kind, object_ids in ids.items()}
+
+    results = []
+    for _, kind, object_id, score in rows:
+        instance = objects[kind].get(object_id)
+        if instance is not None:
+            instance.search_kind = kind
+            instance.search_score = score
+            results.append(instance)
+    return results
+
+
+def search(query, kinds=None, cursor=None, per_page=RESULTS_PER_PAGE):
+    """
+    Return the CursorPage of results for query after cursor. Raises Http404 for a cursor
+    that was not issued by a previous page.
+    """
+    terms = query_terms(query)
+    kinds = [kind for kind in kinds or [] if kind in dict(SearchDocument.KINDS)]
+    if not terms:
+        return CursorPage([], None)
+
+    after = None
+    if cursor:
+        try:
+            after = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            raise Http404("Invalid page cursor.")
+
+    rows = ranked_rows(terms, kinds, after, per_page + 1)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = signing.dumps([rows[-1][3], rows[-1][0]], salt=CURSOR_SALT)
+    return CursorPage(load_results(rows), next_cursor)
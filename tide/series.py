@@ -0,0 +1,163 @@
+# File: series.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Columnar tide height series with vectorized extremes, trends and optimal surfing windows.
+
+from typing import NamedTuple
+
+import numpy as np
+
+# Tide heights (meters above MLLW) that make for good surfing; predetermined from my research.
+OPTIMAL_TIDE_RANGE = (0.6, 1.4)
+
+RISING = 1
+FALLING = -1
+
+
+class TidePoint(NamedTuple):
+    """One sample of a series. Exposes t and v like a NOAA record so templates can use either."""
+    time: object
+    height: float
+
+    @property
+    def t(self):
+        return self.time.strftime('%H:%M')
+
+    @property
+    def v(self):
+        return f'{self.height:.3f}'
+
+
+class TideWindow(NamedTuple):
+    """A contiguous stretch of samples inside the optimal tide range."""
+    start: object
+    end: object
+    trend: str
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def minutes(self):
+        return int(self.duration.total_seconds() // 60)
+
+
+class TideSeries:
+    """
+    Tide heights for one station as two parallel NumPy arrays: times (datetime64[m], UTC,
+    ascending) and heights (float64). NOAA payloads are parsed once, up front.
+    """
+
+    def __init__(self, times, heights, station_id=None):
+        self.times = np.asarray(times, dtype='datetime64[m]')
+        self.heights = np.asarray(heights, dtype=np.float64)
+        self.station_id = station_id
+
+    @classmethod
+    def from_noaa(cls, payload, station_id=None):
+        """Build a series from a NOAA datagetter JSON payload, skipping samples without a value."""
+        # observed products return 'data', the predictions product returns 'predictions'
+        records = payload.get('data') or payload.get('predictions') or []
+        records = [r for r in records if r.get('v') and r['v'].strip()]
+        times = np.array([r['t'] for r in records], dtype='datetime64[m]')
+        heights = np.array([r['v'] for r in records], dtype=np.float64)
+        return cls(times, heights, station_id)
+
+    @classmethod
+    def concat(cls, parts, station_id=None):
+        """Merge several series into one, sorted by time with duplicate timestamps dropped."""
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls([], [], station_id)
+        times = np.concatenate([part.times for part in parts])
+        heights = np.concatenate([part.heights for part in parts])
+        times, first = np.unique(times, return_index=True)
+        return cls(times, heights[first], station_id)
+
+    def __len__(self):
+        return len(self.times)
+
+    def shift(self, delta):
+        """Return a copy with every timestamp moved by a timedelta."""
+        minutes = int(delta.total_seconds() // 60)
+        return TideSeries(self.times + np.timedelta64(minutes, 'm'), self.heights, self.station_id)
+
+    def datetimes(self, indices=None):
+        """Return the timestamps (optionally only at indices) as Python datetimes."""
+        times = self.times if indices is None else self.times[indices]
+        return times.astype(object).tolist()
+
+    def point(self, index):
+        return TidePoint(self.times[index].astype(object), float(self.heights[index]))
+
+    def max_point(self):
+        return self.point(int(np.argmax(self.heights))) if len(self) else None
+
+    def min_point(self):
+        return self.point(int(np.argmin(self.heights))) if len(self) else None
+
+    def trend(self):
+        """Return an int8 array: RISING (1) or FALLING (-1) for every sample."""
+        if len(self) < 2:
+            return np.full(len(self), RISING, dtype=np.int8)
+        slope = np.gradient(self.heights)
+        return np.where(slope >= 0, RISING, FALLING).astype(np.int8)
+
+    def extremes(self):
+        """
+        Return (high_indices, low_indices) of the local maxima and minima. Flat runs
+        take the sign of the last non-flat step, so a plateau counts once.
+        """
+        if len(self) < 3:
+            return np.array([], dtype=int), np.array([], dtype=int)
+        step = np.sign(np.diff(self.heights))
+        moving = np.nonzero(step)[0]
+        if not len(moving):
+            return np.array([], dtype=int), np.array([], dtype=int)
+        # carry the previous direction through flat steps; leading flats take the first direction
+        carry = np.zeros(len(step), dtype=int)
+        carry[moving] = moving
+        carry = np.maximum.accumulate(carry)
+        carry[:moving[0]] = moving[0]
+        turn = np.diff(step[carry])
+        highs = np.nonzero(turn < 0)[0] + 1
+        lows = np.nonzero(turn > 0)[0] + 1
+        return highs, lows
+
+    def high_low_tides(self):
+        """Return (high_tides, low_tides) as lists of TidePoint."""
+        highs, lows = self.extremes()
+        return [self.point(i) for i in highs], [self.point(i) for i in lows]
+
+    def optimal_windows(self, low=OPTIMAL_TIDE_RANGE[0], high=OPTIMAL_TIDE_RANGE[1]):
+        """Return a TideWindow for every contiguous run of samples with low <= height <= high."""
+        if not len(self):
+            return []
+        inside = (self.heights >= low) & (self.heights <= high)
+        edges = np.diff(np.concatenate([[0], inside.astype(np.int8), [0]]))
+        starts = np.nonzero(edges == 1)[0]
+        ends = np.nonzero(edges == -1)[0] - 1
+
+        trend = self.trend()
+        middles = (starts + ends) // 2
+        start_times = self.datetimes(starts)
+        end_times = self.datetimes(ends)
+        return [
+            TideWindow(start, end, 'rising' if trend[middle] == RISING else 'falling')
+            for start, end, middle in zip(start_times, end_times, middles)
+        ]
+
+    def spans_multiple_days(self):
+        return len(self) > 0 and self.times[0].astype('datetime64[D]') != self.times[-1].astype('datetime64[D]')
+
+    def time_labels(self):
+        """Chart labels: 'HH:MM' for a single day, 'YYYY-MM-DD HH:MM' across several days."""
+        labels = np.datetime_as_string(self.times, unit='m')
+        if self.spans_multiple_days():
+            return [label.replace('T', ' ') for label in labels]
+        return [label[11:] for label in labels]
+
+    def to_records(self):
+        """Return the series in the NOAA record shape used by the templates: [{'t': 'HH:MM', 'v': '1.234'}]."""
+        return [{'t': t, 'v': f'{v:.3f}'} for t, v in zip(self.time_labels(), self.heights.tolist())]
+
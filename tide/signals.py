@@ -0,0 +1,253 @@
+# File: signals.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Signal handlers that keep feeds, friend sets, suggestions, counters, rollups, search and status cards up to date, capture session conditions and publish live events.
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import conditions, events, facets, feed, fragments, rollups, search, suggestions
+from .counters import increment
+from .models import Comment, Friend, Image, Profile, StatusMessage, SurfSession, SurfSpot
+
+
+@receiver(post_save, sender=StatusMessage, dispatch_uid='tide.fan_out_status_message')
+def fan_out_status_message(sender, instance, created, raw=False, **kwargs):
+    """Copy a new status message into its recipients' timelines once the post is committed."""
+    if created and not raw:
+        transaction.on_commit(lambda: feed.fan_out(instance))
+
+
+@receiver(post_save, sender=Profile, dispatch_uid='tide.backfill_new_profile')
+def backfill_new_profile(sender, instance, created, raw=False, **kwargs):
+    """Give a new profile a timeline of recent posts and queue its first friend suggestions."""
+    if created and not raw:
+        transaction.on_commit(lambda: feed.backfill_profile(instance))
+        transaction.on_commit(lambda: suggestions.request_refresh([instance.pk]))
+
+
+@receiver(post_save, sender=Friend, dispatch_uid='tide.friendship_saved')
+@receiver(post_delete, sender=Friend, dispatch_uid='tide.friendship_deleted')
+def friendship_changed(sender, instance, **kwargs):
+    """
+    Once the change is committed, drop both profiles' cached friend sets and queue
+    everyone whose friend suggestions it affects.
+    """
+    profile_ids = (instance.profile1_id, instance.profile2_id)
+
+    def after_commit():
+        Friend.objects.invalidate(*profile_ids)
+        suggestions.request_refresh(suggestions.affected_by_friendship(*profile_ids))
+
+    transaction.on_commit(after_commit)
+
+
+@receiver(post_save, sender=SurfSpot, dispatch_uid='tide.surf_spot_saved')
+@receiver(post_delete, sender=SurfSpot, dispatch_uid='tide.surf_spot_deleted')
+def surf_spot_changed(sender, instance, raw=False, **kwargs):
+    """
+    Queue the spot owner's friend suggestions, which depend on their saved stations, and
+    drop the cached spot list of the public session browser.
+    """
+    if raw:
+        return
+    profile_ids = list(Profile.objects.filter(user_id=instance.user_id).values_list('pk', flat=True))
+    transaction.on_commit(lambda: suggestions.request_refresh(profile_ids))
+    transaction.on_commit(facets.invalidate_spot_facets)
+
+
+# Counter columns (see tide/counters.py) move by one on every create and delete. They are
+# updated in the writer's transaction rather than on commit, so a rolled back write leaves
+# them untouched; reconcile_counters repairs whatever bulk operations bypass.
+
+@receiver(post_save, sender=Comment, dispatch_uid='tide.count_comment_saved')
+@receiver(post_delete, sender=Comment, dispatch_uid='tide.count_comment_deleted')
+def count_comment(sender, instance, created=False, raw=False, **kwargs):
+    if raw or (kwargs['signal'] is post_save and not created):
+        return
+    increment(StatusMessage, instance.status_message_id, 'comment_count', 1 if created else -1)
+
+
+@receiver(post_save, sender=StatusMessage, dispatch_uid='tide.count_status_message_saved')
+@receiver(post_delete, sender=StatusMessage, dispatch_uid='tide.count_status_message_deleted')
+def count_status_message(sender, instance, created=False, raw=False, **kwargs):
+    if raw or (kwargs['signal'] is post_save and not created):
+        return
+    increment(Profile, instance.profile_id, 'status_count', 1 if created else -1)
+
+
+@receiver(post_save, sender=Friend, dispatch_uid='tide.count_friend_saved')
+@receiver(post_delete, sender=Friend, dispatch_uid='tide.count_friend_deleted')
+def count_friend(sender, instance, created=False, raw=False, **kwargs):
+    if raw or (kwargs['signal'] is post_save and not created):
+        return
+    for profile_id in (instance.profile1_id, instance.profile2_id):
+        increment(Profile, profile_id, 'friend_count', 1 if created else -1)
+
+
+@receiver(pre_save, sender=SurfSession, dispatch_uid='tide.remember_session_spot')
+def remember_session_spot(sender, instance, raw=False, **kwargs):
+    """
+    Note what an edited session was counted as (its spot for session_count, and its rollup
+    contribution), in case the edit moves it.
+    """
+    if not raw and not instance._state.adding:
+        instance._rolled_up = rollups.stored_contribution(instance.pk)
+        instance._counted_spot_id = instance._rolled_up.surf_spot_id if instance._rolled_up else None
+
+
+@receiver(post_save, sender=SurfSession, dispatch_uid='tide.count_surf_session_saved')
+@receiver(post_delete, sender=SurfSession, dispatch_uid='tide.count_surf_session_deleted')
+def count_surf_session(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if kwargs['signal'] is post_delete:
+        increment(SurfSpot, instance.surf_spot_id, 'session_count', -1)
+    elif created:
+        increment(SurfSpot, instance.surf_spot_id, 'session_count', 1)
+    elif getattr(instance, '_counted_spot_id', instance.surf_spot_id) != instance.surf_spot_id:
+        increment(SurfSpot, instance._counted_spot_id, 'session_count', -1)
+        increment(SurfSpot, instance.surf_spot_id, 'session_count', 1)
+
+
+# Session rollups (see tide/rollups.py) are maintained the same way, in the writer's
+# transaction; rebuild_session_rollups recomputes them from scratch.
+
+@receiver(post_save, sender=SurfSession, dispatch_uid='tide.roll_up_surf_session_saved')
+@receiver(post_delete, sender=SurfSession, dispatch_uid='tide.roll_up_surf_session_deleted')
+def roll_up_surf_session(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if kwargs['signal'] is post_delete:
+        rollups.apply(rollups.contribution(instance), -1)
+        return
+    new = rollups.stored_contribution(instance.pk)
+    old = None if created else getattr(instance, '_rolled_up', None)
+    if old != new:
+        rollups.apply(old, -1)
+        rollups.apply(new, 1)
+
+
+@receiver(post_save, sender=SurfSession, dispatch_uid='tide.capture_session_conditions')
+def capture_session_conditions(sender, instance, created, raw=False, **kwargs):
+    """Snapshot the conditions of a new session, or of one moved to another spot or day, after commit."""
+    if raw:
+        return
+    old = getattr(instance, '_rolled_up', None)
+    if created or old is None or (old.surf_spot_id, old.date) != (instance.surf_spot_id, instance.date):
+        conditions.capture_later(instance.pk)
+
+
+@receiver(pre_save, sender=SurfSpot, dispatch_uid='tide.remember_spot_station')
+def remember_spot_station(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._rolled_up_station_id = (
+            SurfSpot.objects.filter(pk=instance.pk).values_list('station_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=SurfSpot, dispatch_uid='tide.roll_up_spot_station')
+def roll_up_spot_station(sender, instance, created, raw=False, **kwargs):
+    """A spot moved to another station takes its sessions' daily rollups along."""
+    old_station_id = getattr(instance, '_rolled_up_station_id', None)
+    if not created and not raw and old_station_id not in (None, instance.station_id):
+        rollups.move_spot_station(instance.pk, old_station_id, instance.station_id)
+
+
+@receiver(post_save, sender=StatusMessage, dispatch_uid='tide.index_status_message')
+@receiver(post_save, sender=Comment, dispatch_uid='tide.index_comment')
+@receiver(post_save, sender=Profile, dispatch_uid='tide.index_profile')
+@receiver(post_save, sender=SurfSession, dispatch_uid='tide.index_surf_session')
+def index_for_search(sender, instance, raw=False, **kwargs):
+    """Keep the instance's search document in step with its text, in the same transaction."""
+    if not raw:
+        search.index(instance)
+
+
+@receiver(post_delete, sender=StatusMessage, dispatch_uid='tide.unindex_status_message')
+@receiver(post_delete, sender=Comment, dispatch_uid='tide.unindex_comment')
+@receiver(post_delete, sender=Profile, dispatch_uid='tide.unindex_profile')
+@receiver(post_delete, sender=SurfSession, dispatch_uid='tide.unindex_surf_session')
+def unindex_for_search(sender, instance, **kwargs):
+    search.unindex(instance)
+
+
+# Cached status cards (see tide/fragments.py) are keyed by card_version, so bumping it
+# in the writer's transaction is all it takes to stop serving the old HTML.
+
+@receiver(post_save, sender=StatusMessage, dispatch_uid='tide.bump_card_status_message')
+def bump_card_for_status_message(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        fragments.bump_status_messages(pk=instance.pk)
+
+
+@receiver(post_save, sender=Image, dispatch_uid='tide.bump_card_image_saved')
+@receiver(post_delete, sender=Image, dispatch_uid='tide.bump_card_image_deleted')
+@receiver(post_save, sender=Comment, dispatch_uid='tide.bump_card_comment_saved')
+@receiver(post_delete, sender=Comment, dispatch_uid='tide.bump_card_comment_deleted')
+def bump_card_for_attachment(sender, instance, raw=False, **kwargs):
+    """Images and comments are part of their status message's card."""
+    if not raw:
+        fragments.bump_status_messages(pk=instance.status_message_id)
+
+
+@receiver(post_save, sender=SurfSession, dispatch_uid='tide.bump_card_surf_session')
+def bump_card_for_surf_session(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        fragments.bump_status_messages(surf_session=instance)
+
+
+@receiver(post_save, sender=SurfSpot, dispatch_uid='tide.bump_card_surf_spot')
+def bump_card_for_surf_spot(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        fragments.bump_status_messages(surf_session__surf_spot=instance)
+
+
+@receiver(post_save, sender=Profile, dispatch_uid='tide.bump_card_profile')
+def bump_card_for_profile(sender, instance, created, raw=False, **kwargs):
+    """Feed cards show the author's name and picture."""
+    if not created and not raw:
+        fragments.bump_profile(instance.pk)
+
+
+# Live updates (see tide/events.py) go out after commit, so a client that fetches the
+# changed card right away finds it.
+
+def publish_status_change(status_message_id, make_event):
+    """After commit, publish make_event(author_id) on the feed and the status author's profile channel."""
+    def publish():
+        author_id = StatusMessage.objects.filter(pk=status_message_id).values_list('profile_id', flat=True).first()
+        if author_id is not None:
+            events.publish([events.FEED_CHANNEL, events.profile_channel(author_id)], make_event(author_id))
+    transaction.on_commit(publish)
+
+
+@receiver(post_save, sender=StatusMessage, dispatch_uid='tide.publish_status_saved')
+@receiver(post_delete, sender=StatusMessage, dispatch_uid='tide.publish_status_deleted')
+def publish_status(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if kwargs['signal'] is post_delete:
+        event_type = 'status_deleted'
+    else:
+        event_type = 'status' if created else 'status_changed'
+    event = events.status_event(instance.pk, instance.profile_id, event_type)
+    channels = [events.FEED_CHANNEL, events.profile_channel(instance.profile_id)]
+    transaction.on_commit(lambda: events.publish(channels, event))
+
+
+@receiver(post_save, sender=Comment, dispatch_uid='tide.publish_comment_saved')
+@receiver(post_delete, sender=Comment, dispatch_uid='tide.publish_comment_deleted')
+def publish_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        publish_status_change(instance.status_message_id, lambda author_id: events.comment_event(instance, author_id))
+
+
+@receiver(post_save, sender=Image, dispatch_uid='tide.publish_image_saved')
+@receiver(post_delete, sender=Image, dispatch_uid='tide.publish_image_deleted')
+def publish_image(sender, instance, raw=False, **kwargs):
+    if not raw:
+        status_message_id = instance.status_message_id
+        publish_status_change(
+            status_message_id, lambda author_id: events.status_event(status_message_id, author_id, 'status_changed'),
+        )
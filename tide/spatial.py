@@ -0,0 +1,159 @@
+# File: spatial.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Great-circle helpers and a KD-tree index for nearest NOAA station lookups.
+
+import heapq
+from math import radians, sin, cos, sqrt, atan2, asin
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Calculate the great-circle distance between two points on the Earth."""
+    R = EARTH_RADIUS_KM  # earth's radius in km!
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return R * c
+
+
+def to_unit_vectors(lats, lngs):
+    """Convert latitudes/longitudes in degrees to an (n, 3) array of points on the unit sphere."""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lng = np.radians(np.asarray(lngs, dtype=np.float64))
+    return np.column_stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)])
+
+
+def chord_to_km(chord):
+    """Convert a straight-line distance between unit vectors to a great-circle distance in km."""
+    return 2 * EARTH_RADIUS_KM * asin(min(chord / 2, 1.0))
+
+
+def km_to_chord(km):
+    """Convert a great-circle distance in km to a straight-line distance between unit vectors."""
+    return 2 * sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class KDTree:
+    """
+    A static KD-tree over 3D points. Points are reordered so every leaf is a contiguous
+    slice, which lets leaves be scanned with one NumPy expression.
+    """
+
+    def __init__(self, points, leaf_size=16):
+        points = np.asarray(points, dtype=np.float64)
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(points))
+        self._points = points
+        # Each node is (start, end, split_dim, split_value, left, right); split_dim is -1 for leaves.
+        self.nodes = []
+        if len(points):
+            self._build(0, len(points))
+        self.points = points[self.order]
+        del self._points
+
+    def __len__(self):
+        return len(self.order)
+
+    def _build(self, start, end):
+        node_id = len(self.nodes)
+        self.nodes.append(None)
+        if end - start <= self.leaf_size:
+            self.nodes[node_id] = (start, end, -1, 0.0, -1, -1)
+            return node_id
+
+        idx = self.order[start:end]
+        pts = self._points[idx]
+        dim = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+        mid = (end - start) // 2
+        self.order[start:end] = idx[np.argpartition(pts[:, dim], mid)]
+        split = float(self._points[self.order[start + mid], dim])
+
+        left = self._build(start, start + mid)
+        right = self._build(start + mid, end)
+        self.nodes[node_id] = (start, end, dim, split, left, right)
+        return node_id
+
+    def query(self, point, k=1):
+        """Return up to k (chord_distance, index) pairs nearest to point, closest first."""
+        if not self.nodes or k < 1:
+            return []
+        point = np.asarray(point, dtype=np.float64)
+        heap = []  # max-heap of (-squared distance, index)
+        self._knn(0, point, k, heap)
+        return [(sqrt(-d), i) for d, i in sorted(heap, reverse=True)]
+
+    def _knn(self, node_id, point, k, heap):
+        start, end, dim, split, left, right = self.nodes[node_id]
+        if dim < 0:
+            d2 = ((self.points[start:end] - point) ** 2).sum(axis=1)
+            for d, i in zip(d2.tolist(), self.order[start:end].tolist()):
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d, i))
+                elif d < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d, i))
+            return
+
+        diff = point[dim] - split
+        near, far = (left, right) if diff < 0 else (right, left)
+        self._knn(near, point, k, heap)
+        if len(heap) < k or diff * diff < -heap[0][0]:
+            self._knn(far, point, k, heap)
+
+    def query_radius(self, point, radius):
+        """Return (chord_distance, index) pairs within radius of point, closest first."""
+        if not self.nodes:
+            return []
+        point = np.asarray(point, dtype=np.float64)
+        found = []
+        stack = [0]
+        r2 = radius * radius
+        while stack:
+            start, end, dim, split, left, right = self.nodes[stack.pop()]
+            if dim < 0:
+                d2 = ((self.points[start:end] - point) ** 2).sum(axis=1)
+                hits = np.nonzero(d2 <= r2)[0]
+                found.extend(zip(np.sqrt(d2[hits]).tolist(), self.order[start + hits].tolist()))
+                continue
+            diff = point[dim] - split
+            if diff - radius <= 0:
+                stack.append(left)
+            if diff + radius >= 0:
+                stack.append(right)
+        return sorted(found)
+
+
+class StationIndex:
+    """
+    Spatial index over NOAA stations answering nearest, k-nearest and radius queries.
+    Stations are anything with lat/lng; results are (station, distance_km) pairs.
+    """
+
+    def __init__(self, stations, lats, lngs):
+        self.stations = stations
+        self.tree = KDTree(to_unit_vectors(lats, lngs))
+
+    @classmethod
+    def from_dicts(cls, stations):
+        """Build an index from a list of {'lat': ..., 'lng': ...} dicts."""
+        return cls(stations, [s['lat'] for s in stations], [s['lng'] for s in stations])
+
+    def _results(self, matches):
+        return [(self.stations[i], chord_to_km(chord)) for chord, i in matches]
+
+    def k_nearest(self, lat, lng, k):
+        """Return the k closest stations to (lat, lng), closest first."""
+        return self._results(self.tree.query(to_unit_vectors([lat], [lng])[0], k))
+
+    def nearest(self, lat, lng):
+        """Return (station, distance_km) for the closest station, or None for an empty index."""
+        results = self.k_nearest(lat, lng, 1)
+        return results[0] if results else None
+
+    def within_radius(self, lat, lng, radius_km):
+        """Return every station within radius_km of (lat, lng), closest first."""
+        point = to_unit_vectors([lat], [lng])[0]
+        return self._results(self.tree.query_radius(point, km_to_chord(radius_km)))
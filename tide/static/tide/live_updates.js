@@ -0,0 +1,69 @@
+// File: live_updates.js
+// Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+// Description: Keeps a feed or profile page current from its server-sent event stream.
+//
+// Usage: <div data-live-updates="/events/feed/" data-card-url="/status/0/card/" data-variant="feed"
+// data-skip-profile="3">. Events only carry ids: new statuses are fetched from the card URL
+// and prepended, items whose status got a comment or edit are fetched again and replaced,
+// and deleted ones are removed. Statuses by data-skip-profile are ignored (your own posts
+// are not in your feed). Without EventSource the page simply stays as it was rendered.
+
+(function () {
+    if (!window.EventSource) {
+        return;
+    }
+    document.querySelectorAll('[data-live-updates]').forEach(function (container) {
+        const source = new EventSource(container.dataset.liveUpdates);
+        const variant = container.dataset.variant || 'feed';
+
+        function find(id) {
+            return container.querySelector('[data-status-id="' + id + '"]');
+        }
+
+        function fetchCard(id) {
+            const url = container.dataset.cardUrl.replace('/0/', '/' + id + '/') + '?variant=' + variant;
+            return fetch(url, {headers: {'X-Requested-With': 'XMLHttpRequest'}}).then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.text();
+            });
+        }
+
+        function replace(id) {
+            const item = find(id);
+            if (item) {
+                fetchCard(id).then(function (html) {
+                    item.outerHTML = html;
+                }).catch(function () {});
+            }
+        }
+
+        source.addEventListener('status', function (event) {
+            const data = JSON.parse(event.data);
+            if (String(data.profile_id) === container.dataset.skipProfile || find(data.id)) {
+                return;
+            }
+            fetchCard(data.id).then(function (html) {
+                container.insertAdjacentHTML('afterbegin', html);
+            }).catch(function () {});
+        });
+        source.addEventListener('status_changed', function (event) {
+            replace(JSON.parse(event.data).id);
+        });
+        source.addEventListener('comment', function (event) {
+            replace(JSON.parse(event.data).status_id);
+        });
+        source.addEventListener('status_deleted', function (event) {
+            const item = find(JSON.parse(event.data).id);
+            if (item) {
+                item.remove();
+            }
+        });
+        source.addEventListener('reset', function () {
+            // we missed events; start over from a fresh page
+            source.close();
+            window.location.reload();
+        });
+    });
+})();
@@ -0,0 +1,36 @@
+// File: load_more.js
+// Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+// Description: Appends the next page of a cursor-paginated list in place when "Load more" is clicked.
+//
+// Usage: <div data-load-more><a class="load-more" href="?cursor=...">Load more</a></div>. The
+// page is requested with partial=1 and its HTML replaces the data-load-more element. Without
+// JavaScript the link still works as a plain link to the next page.
+
+(function () {
+    document.addEventListener('click', function (event) {
+        const link = event.target.closest('a.load-more');
+        if (!link) {
+            return;
+        }
+        event.preventDefault();
+        const container = link.closest('[data-load-more]') || link;
+        const url = new URL(link.href, window.location.href);
+        url.searchParams.set('partial', '1');
+
+        link.textContent = 'Loading...';
+        fetch(url, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.text();
+            })
+            .then(function (html) {
+                container.insertAdjacentHTML('beforebegin', html);
+                container.remove();
+            })
+            .catch(function () {
+                window.location.href = link.href;
+            });
+    });
+})();
@@ -0,0 +1,50 @@
+// File: tide_chart.js
+// Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+// Description: Draws tide charts from the compact JSON served by the chart endpoints.
+//
+// Usage: <div class="tide-chart" data-chart-url="..."></div>. Each trace arrives as
+// {name, t0, m, y}: a start time, minute offsets from it and heights in meters.
+
+(function () {
+    function toLabels(trace) {
+        if (!trace.t0) {
+            return [];
+        }
+        const start = Date.parse(trace.t0 + ':00Z');
+        // keep the axis in GMT by handing plotly plain 'YYYY-MM-DD HH:MM' strings
+        return trace.m.map(function (offset) {
+            return new Date(start + offset * 60000).toISOString().slice(0, 16).replace('T', ' ');
+        });
+    }
+
+    function drawChart(element) {
+        fetch(element.dataset.chartUrl, {headers: {'Accept': 'application/json'}})
+            .then(function (response) { return response.json(); })
+            .then(function (chart) {
+                const traces = chart.traces.map(function (trace) {
+                    return {
+                        x: toLabels(trace),
+                        y: trace.y,
+                        name: trace.name,
+                        mode: chart.traces.length > 1 ? 'lines' : 'lines+markers',
+                        line: {shape: 'spline'},
+                        marker: {size: 8},
+                    };
+                });
+                Plotly.newPlot(element, traces, {
+                    title: chart.title,
+                    xaxis: {title: chart.xaxis_title, gridcolor: '#ebf0f8', zerolinecolor: '#ebf0f8'},
+                    yaxis: {title: chart.yaxis_title, gridcolor: '#ebf0f8', zerolinecolor: '#ebf0f8'},
+                    paper_bgcolor: '#ffffff',
+                    plot_bgcolor: '#ffffff',
+                }, {responsive: true});
+            })
+            .catch(function () {
+                element.textContent = 'The tide chart could not be loaded.';
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('.tide-chart').forEach(drawChart);
+    });
+})();
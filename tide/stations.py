@@ -0,0 +1,106 @@
+# File: stations.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Lazily loaded registry of NOAA tide stations backed by tide/data/noaa_stations.json.
+
+import json
+import threading
+from array import array
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_STATIONS_FILE = Path(__file__).resolve().parent / 'data' / 'noaa_stations.json'
+
+
+class Station:
+    """A single NOAA station record."""
+    __slots__ = ('id', 'name', 'lat', 'lng')
+
+    def __init__(self, id, name, lat, lng):
+        self.id = id
+        self.name = name
+        self.lat = lat
+        self.lng = lng
+
+    def __repr__(self):
+        return f"Station({self.id!r}, {self.name!r}, {self.lat}, {self.lng})"
+
+    def __str__(self):
+        return f"{self.name} ({self.id})"
+
+
+class StationRegistry:
+    """
+    NOAA stations stored as parallel columns (ids, names, lats, lngs) and loaded from
+    the data file on first use. Station records are created on demand.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._index = None
+
+    @property
+    def path(self):
+        return Path(self._path or getattr(settings, 'NOAA_STATIONS_FILE', DEFAULT_STATIONS_FILE))
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            with open(self.path) as f:
+                payload = json.load(f)
+            columns = list(zip(*payload['stations'])) or [(), (), (), ()]
+            fields = {name: i for i, name in enumerate(payload.get('fields', ['id', 'name', 'lat', 'lng']))}
+
+            self.ids = [str(v) for v in columns[fields['id']]]
+            self.names = list(columns[fields['name']])
+            self.lats = array('d', columns[fields['lat']])
+            self.lngs = array('d', columns[fields['lng']])
+            self._positions = {station_id: i for i, station_id in enumerate(self.ids)}
+            self._index = None
+            self._loaded = True
+
+    def reload(self):
+        """Drop the loaded data so the next access re-reads the data file."""
+        with self._lock:
+            self._loaded = False
+            self._index = None
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self.ids)
+
+    def __getitem__(self, position):
+        """Return the Station at a position in the registry."""
+        self._ensure_loaded()
+        return Station(self.ids[position], self.names[position], self.lats[position], self.lngs[position])
+
+    def __iter__(self):
+        self._ensure_loaded()
+        return (self[i] for i in range(len(self.ids)))
+
+    def __contains__(self, station_id):
+        self._ensure_loaded()
+        return str(station_id) in self._positions
+
+    def get(self, station_id):
+        """Return the Station with this id, or None."""
+        self._ensure_loaded()
+        position = self._positions.get(str(station_id))
+        return None if position is None else self[position]
+
+    @property
+    def index(self):
+        """A StationIndex over every station, built on first use."""
+        self._ensure_loaded()
+        if self._index is None:
+            from .spatial import StationIndex
+            self._index = StationIndex(self, self.lats, self.lngs)
+        return self._index
+
+
+stations = StationRegistry()
@@ -0,0 +1,181 @@
+# File: suggestions.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Ranks friend suggestions by mutual friends, shared NOAA stations and proximity, and stores the top K per profile.
+
+from collections import Counter
+from math import cos, radians
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Q
+
+from .models import Friend, FriendSuggestion, FriendSuggestionRefresh, Profile, SurfSpot
+from .spatial import haversine
+
+DEFAULT_TOP_K = 20
+
+# Every candidate source is capped, so scoring one profile reads a bounded number of rows
+# however large the network or the spot table grows.
+MAX_FRIENDS_SCANNED = 200
+MAX_FRIEND_OF_FRIEND_EDGES = 5000
+MAX_CANDIDATES_PER_SOURCE = 500
+
+NEARBY_KM = 50
+KM_PER_DEGREE_LAT = 111.0
+
+# Score = sum of weight * signal. Mutual friends dominate; a shared station counts about
+# as much as one mutual friend; proximity decays from 1 at 0 km to 0.5 at PROXIMITY_HALF_KM.
+WEIGHTS = {
+    'mutual_friends': 1.0,
+    'shared_stations': 0.8,
+    'proximity': 0.5,
+    'same_city': 0.3,
+}
+PROXIMITY_HALF_KM = 10
+
+
+def top_k():
+    return getattr(settings, 'FRIEND_SUGGESTIONS_TOP_K', DEFAULT_TOP_K)
+
+
+def spot_centroid(spots):
+    """Average (lat, lng) of (station_id, lat, lng) rows, or None without spots."""
+    if not spots:
+        return None
+    return sum(s[1] for s in spots) / len(spots), sum(s[2] for s in spots) / len(spots)
+
+
+def mutual_friend_counts(profile_id, friend_ids):
+    """Count, for each friend-of-a-friend, how many of friend_ids they are friends with."""
+    scanned = list(friend_ids)[:MAX_FRIENDS_SCANNED]
+    if not scanned:
+        return Counter()
+    edges = Friend.objects.filter(Q(profile1_id__in=scanned) | Q(profile2_id__in=scanned)).values_list(
+        'profile1_id', 'profile2_id')[:MAX_FRIEND_OF_FRIEND_EDGES]
+    scanned = set(scanned)
+    counts = Counter()
+    for a, b in edges:
+        if a in scanned:
+            counts[b] += 1
+        if b in scanned:
+            counts[a] += 1
+    counts.pop(profile_id, None)
+    return counts
+
+
+def shared_station_counts(profile, stations):
+    """Count, for each other profile with spots at any of these stations, how many stations they share."""
+    if not stations:
+        return Counter()
+    rows = (
+        SurfSpot.objects.filter(station_id__in=stations)
+        .exclude(user_id=profile.user_id)
+        .values_list('user__profile', 'station_id')
+        .distinct()[:MAX_CANDIDATES_PER_SOURCE]
+    )
+    return Counter(profile_id for profile_id, _ in rows if profile_id is not None)
+
+
+def nearby_profile_ids(profile, centroid):
+    """Profiles with a saved spot inside a NEARBY_KM box around centroid."""
+    if centroid is None:
+        return set()
+    lat, lng = centroid
+    dlat = NEARBY_KM / KM_PER_DEGREE_LAT
+    dlng = dlat / max(0.01, cos(radians(lat)))
+    return set(
+        SurfSpot.objects.filter(
+            latitude__range=(lat - dlat, lat + dlat),
+            longitude__range=(lng - dlng, lng + dlng),
+        ).exclude(user_id=profile.user_id).values_list('user__profile', flat=True)[:MAX_CANDIDATES_PER_SOURCE]
+    ) - {None}
+
+
+def rank_candidates(profile):
+    """
+    Score every candidate from the bounded sources above and return the top K as
+    dicts with suggested_id, score, mutual_friends, shared_stations and distance_km.
+    """
+    friend_ids = Friend.objects.friend_ids(profile)
+    spots = list(SurfSpot.objects.filter(user_id=profile.user_id).values_list('station_id', 'latitude', 'longitude'))
+    centroid = spot_centroid(spots)
+
+    mutual = mutual_friend_counts(profile.pk, friend_ids)
+    shared = shared_station_counts(profile, {s[0] for s in spots})
+    same_city = set()
+    if profile.city.strip():
+        same_city = set(
+            Profile.objects.filter(city__iexact=profile.city.strip())
+            .exclude(pk=profile.pk)
+            .values_list('pk', flat=True)[:MAX_CANDIDATES_PER_SOURCE]
+        )
+
+    candidates = (set(mutual) | set(shared) | same_city | nearby_profile_ids(profile, centroid))
+    candidates -= friend_ids | {profile.pk}
+    if not candidates:
+        return []
+
+    centroids = {}
+    if centroid is not None:
+        centroids = {
+            row['user__profile']: (row['lat'], row['lng'])
+            for row in SurfSpot.objects.filter(user__profile__in=candidates)
+            .values('user__profile').annotate(lat=Avg('latitude'), lng=Avg('longitude'))
+        }
+
+    ranked = []
+    for candidate in candidates:
+        distance = None
+        if candidate in centroids:
+            distance = haversine(centroid[0], centroid[1], *centroids[candidate])
+        score = (
+            WEIGHTS['mutual_friends'] * mutual[candidate]
+            + WEIGHTS['shared_stations'] * shared[candidate]
+            + WEIGHTS['proximity'] * (PROXIMITY_HALF_KM / (PROXIMITY_HALF_KM + distance) if distance is not None else 0)
+            + WEIGHTS['same_city'] * (candidate in same_city)
+        )
+        ranked.append({
+            'suggested_id': candidate,
+            'score': round(score, 4),
+            'mutual_friends': mutual[candidate],
+            'shared_stations': shared[candidate],
+            'distance_km': round(distance, 1) if distance is not None else None,
+        })
+    ranked.sort(key=lambda row: (-row['score'], row['suggested_id']))
+    return ranked[:top_k()]
+
+
+@transaction.atomic
+def refresh_profile(profile):
+    """Recompute and store one profile's suggestions; returns the number stored."""
+    ranked = rank_candidates(profile)
+    FriendSuggestion.objects.filter(profile=profile).delete()
+    FriendSuggestion.objects.bulk_create([FriendSuggestion(profile=profile, **row) for row in ranked])
+    FriendSuggestionRefresh.objects.filter(profile=profile).delete()
+    return len(ranked)
+
+
+def affected_by_friendship(*profile_ids):
+    """
+    Profiles whose suggestions change when these profiles befriend or unfriend: themselves
+    and (up to MAX_FRIENDS_SCANNED of) their friends, whose mutual-friend counts move.
+    """
+    affected = set(profile_ids)
+    for profile_id in profile_ids:
+        affected.update(list(Friend.objects.friend_ids(profile_id))[:MAX_FRIENDS_SCANNED])
+    return affected
+
+
+def request_refresh(profile_ids):
+    """Queue profiles for the next refresh_friend_suggestions run, skipping deleted ones."""
+    existing = Profile.objects.filter(pk__in=set(profile_ids)).values_list('pk', flat=True)
+    FriendSuggestionRefresh.objects.bulk_create(
+        [FriendSuggestionRefresh(profile_id=pk) for pk in existing],
+        ignore_conflicts=True,
+    )
+
+
+def queued_profiles(limit=None):
+    """Profiles waiting for a refresh, oldest request first."""
+    queued = FriendSuggestionRefresh.objects.order_by('requested_at').values_list('profile_id', flat=True)
+    return Profile.objects.filter(pk__in=list(queued[:limit] if limit else queued))
@@ -1,3 +1,1179 @@
-from django.test import TestCase
+# File: tests.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Tests for the We Tide application.
 
-# Create your tests here.
+import asyncio
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import addModuleCleanup, skipUnless
+from unittest.mock import Mock, patch
+
+import numpy as np
+import requests
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.http import Http404
+from asgiref.sync import sync_to_async
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import events, geocoding
+from .cache import CacheStats, SingleFlight, StaleWhileRevalidateCache
+from .comments import load_thread
+from .conditions import backfill
+from .counters import reconcile
+from .feed import FEED_ORDERING, fan_out, news_feed_page
+from .geocoding import geocode, prune_expired
+from .noaa import get_tide_series, split_date_range
+from .pagination import CursorPaginator, MergedCursorPaginator
+from .prediction import (REFERENCE_PREDICTIONS_FILE, HarmonicModel, astronomical_arguments, get_harmonic_model,
+                         node_factors)
+from .rollups import rebuild as rebuild_rollups
+from .search import ranked_rows, search
+from .series import FALLING, RISING, TideSeries
+from .spatial import StationIndex, haversine
+from .stations import DEFAULT_STATIONS_FILE, StationRegistry
+from .models import (Comment, FeedEntry, Friend, FriendSuggestionRefresh, GeocodeCacheEntry, Image, Profile, SearchDocument,
+                     StationDailyRollup, StatusMessage, SurfSession, SurfSessionConditions, SurfSessionMonthlyRollup, SurfSpot)
+from .suggestions import queued_profiles, refresh_profile
+from .weather import cell_center, get_weather, grid_cell
+from .upstream import CircuitBreaker, UpstreamClient, UpstreamUnavailable
+from .warming import build_plan
+
+
+def setUpModule():
+    """
+    Keep every test off the network and in its own thread: conditions are captured in the
+    committing thread from empty upstream payloads (tests that need data patch their own),
+    and any other upstream call fails fast as if its circuit were open.
+    """
+    synchronous = override_settings(SESSION_CONDITIONS_ASYNC=False)
+    synchronous.enable()
+    addModuleCleanup(synchronous.disable)
+    for patcher in [
+        patch('tide.conditions.get_tide_data', return_value={'data': []}),
+        patch('tide.conditions.get_weather', return_value={}),
+        patch.object(UpstreamClient, 'get_json', side_effect=UpstreamUnavailable("no network in tests")),
+    ]:
+        patcher.start()
+        addModuleCleanup(patcher.stop)
+
+
+def create_profile(username):
+    user = User.objects.create_user(username=username, password='password')
+    return Profile.objects.create(user=user, fname=username, lname='Surfer', city='Boston', email=f'{username}@example.com')
+
+
+class StaleWhileRevalidateCacheTests(SimpleTestCase):
+    """Expired entries are served while one refresh runs, and concurrent misses share one fetch."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_entry_is_served_while_one_refresh_runs(self):
+        swr = StaleWhileRevalidateCache('test-swr', stale_ttl=60)
+        swr.set(['tide'], 'old', ttl=10)
+        fetch = Mock(return_value='new')
+        with patch('tide.cache.time', **{'time.return_value': time.time() + 30}), \
+                patch('tide.cache.threading.Thread') as thread:
+            self.assertEqual([swr.get(['tide'], fetch, ttl=10) for _ in range(3)], ['old'] * 3)
+            self.assertEqual(thread.call_count, 1)  # the refresh lock turned the other two away
+            fetch.assert_not_called()
+            thread.call_args.kwargs['target']()
+        fetch.assert_called_once_with()
+        self.assertEqual(swr.get(['tide'], fetch, ttl=10), 'new')
+        self.assertEqual(swr.stats.snapshot()['stale'], 3)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        flight = SingleFlight(CacheStats())
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do('key', fetch))) for _ in range(4)]
+        for follower in followers:
+            follower.start()
+        deadline = time.monotonic() + 5
+        while flight.stats.snapshot().get('coalesced', 0) < 4 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+
+
+class HarmonicPredictionTests(SimpleTestCase):
+    """The offline harmonic model's astronomy, phase convention and datum, checked against outside references."""
+
+    @staticmethod
+    def arguments(moment):
+        return astronomical_arguments(np.array([moment], dtype='datetime64[s]'))[:, 0] % 360
+
+    def assertAnglesAlmostEqual(self, first, second, delta):
+        self.assertLessEqual(abs((first - second + 180) % 360 - 180), delta)
+
+    def test_doodson_arguments_match_meeus(self):
+        # Meeus, Astronomical Algorithms, example 47.a (1992-04-12 0h): L' = 134.290182,
+        # D = 113.842304, M = 97.643514, M' = 5.150833, F = 219.889721
+        tau, s, h, p, node, p1 = self.arguments('1992-04-12T00:00')
+        self.assertAnglesAlmostEqual(s, 134.290182, 0.01)
+        self.assertAnglesAlmostEqual(h, 134.290182 - 113.842304, 0.01)
+        self.assertAnglesAlmostEqual(p, 134.290182 - 5.150833, 0.01)
+        self.assertAnglesAlmostEqual(-node, 134.290182 - 219.889721, 0.01)
+        self.assertAnglesAlmostEqual(p1, 134.290182 - 113.842304 - 97.643514, 0.01)
+        self.assertAnglesAlmostEqual(tau, h - s, 0.01)  # mean lunar time is h - s at 0h UT
+
+    def test_node_factors_follow_the_lunar_standstills(self):
+        # the ascending node passed the equinox (N = 0) in mid 2006, and was opposite it in late 2015
+        major = node_factors(-self.arguments('2006-06-01T00:00')[4])
+        minor = node_factors(-self.arguments('2015-10-01T00:00')[4])
+        self.assertAlmostEqual(major['M2'][0], 0.963, places=3)
+        self.assertAlmostEqual(major['K1'][0], 1.112, places=3)
+        self.assertAlmostEqual(major['O1'][0], 1.181, places=3)
+        self.assertAlmostEqual(minor['M2'][0], 1.038, places=3)
+        self.assertAlmostEqual(minor['O1'][0], 0.807, places=3)
+
+    def test_phase_gmt_and_datum_offset(self):
+        # S2 is the mean sun's semidiurnal tide: a Greenwich phase of 90 degrees puts its highs 3 hours after 0h and 12h UT
+        model = HarmonicModel('test', 1.5, {'S2': [1.0, 90.0]})
+        series = model.predict_series(np.datetime64('2024-11-01T00:00'), np.datetime64('2024-11-02T00:00'), 1)
+        highs, lows = series.extremes()
+        self.assertEqual(series.datetimes(highs), [datetime(2024, 11, 1, 3), datetime(2024, 11, 1, 15)])
+        self.assertEqual(series.datetimes(lows), [datetime(2024, 11, 1, 9), datetime(2024, 11, 1, 21)])
+        self.assertAlmostEqual(series.heights.mean(), 1.5)
+        self.assertAlmostEqual(series.heights.max(), 2.5)
+
+    def test_matches_noaa_published_predictions(self):
+        if not REFERENCE_PREDICTIONS_FILE.exists():
+            self.skipTest("no reference predictions recorded (import_harmonics --reference)")
+        for station_id, reference in json.loads(REFERENCE_PREDICTIONS_FILE.read_text()).items():
+            with self.subTest(station=station_id):
+                model = get_harmonic_model(station_id)
+                self.assertIsNotNone(model)
+                times = np.array([r['t'].replace(' ', 'T') for r in reference['predictions']], dtype='datetime64[m]')
+                published = np.array([float(r['v']) for r in reference['predictions']])
+                self.assertLess(np.abs(model.predict(times) - published).max(), 0.03)
+
+                day = np.datetime64(reference['date'], 'm')
+                series = model.predict_series(day - np.timedelta64(3, 'h'), day + np.timedelta64(27, 'h'), 1)
+                highs, lows = series.extremes()
+                for tide in reference['hilo']:
+                    extremes = highs if tide['type'] == 'H' else lows
+                    at = np.datetime64(tide['t'].replace(' ', 'T'), 'm')
+                    nearest = extremes[np.argmin(np.abs(series.times[extremes] - at))]
+                    self.assertLessEqual(abs(series.times[nearest] - at), np.timedelta64(6, 'm'))
+                    self.assertLess(abs(series.heights[nearest] - float(tide['v'])), 0.03)
+
+
+class StationIndexTests(SimpleTestCase):
+    """KD-tree lookups agree with a linear haversine scan over every station."""
+
+    def test_nearest_match_linear_scan(self):
+        rng = np.random.default_rng(3)
+        stations = [{'id': str(i), 'lat': lat, 'lng': lng}
+                    for i, (lat, lng) in enumerate(zip(rng.uniform(-80, 80, 500), rng.uniform(-180, 180, 500)))]
+        index = StationIndex.from_dicts(stations)
+        for lat, lng in zip(rng.uniform(-80, 80, 25), rng.uniform(-180, 180, 25)):
+            scan = sorted((haversine(lat, lng, s['lat'], s['lng']), s['id']) for s in stations)
+            nearest = index.k_nearest(lat, lng, 5)
+            self.assertEqual([station['id'] for station, _ in nearest], [station_id for _, station_id in scan[:5]])
+            for (_, distance), (expected, _) in zip(nearest, scan):
+                self.assertAlmostEqual(distance, expected, places=6)
+            self.assertEqual(
+                {station['id'] for station, _ in index.within_radius(lat, lng, 1500)},
+                {station_id for distance, station_id in scan if distance <= 1500},
+            )
+
+
+class StationRegistryTests(SimpleTestCase):
+    """The shipped station file loads into the registry, and stations are found by id."""
+
+    def test_load_and_look_up(self):
+        registry = StationRegistry(DEFAULT_STATIONS_FILE)
+        payload = json.loads(DEFAULT_STATIONS_FILE.read_text())
+        self.assertEqual(len(registry), len(payload['stations']))
+
+        boston = registry.get('8443970')
+        self.assertEqual((boston.id, boston.name, boston.lat, boston.lng), ('8443970', 'Boston', 42.3539, -71.0503))
+        self.assertEqual(str(boston), 'Boston (8443970)')
+        self.assertEqual(registry.get(8443970).name, 'Boston')
+        self.assertIn('8443970', registry)
+        self.assertIsNone(registry.get('0000000'))
+        self.assertNotIn('0000000', registry)
+        self.assertEqual(registry[0].id, registry.ids[0])
+
+        station, distance = registry.index.nearest(42.35, -71.05)
+        self.assertEqual(station.id, '8443970')
+        self.assertLess(distance, 1)
+
+
+class TideSeriesTests(SimpleTestCase):
+    """Extremes and optimal windows found on a synthetic semidiurnal tide."""
+
+    def setUp(self):
+        times = np.arange(np.datetime64('2024-11-01T00:00'), np.datetime64('2024-11-02T00:00'), np.timedelta64(6, 'm'))
+        hours = (times - times[0]).astype(np.float64) / 60
+        self.series = TideSeries(times, 1.0 + np.sin(2 * np.pi * hours / 12), '8443970')
+
+    def test_extremes(self):
+        highs, lows = self.series.high_low_tides()
+        self.assertEqual([point.t for point in highs], ['03:00', '15:00'])
+        self.assertEqual([point.t for point in lows], ['09:00', '21:00'])
+        self.assertAlmostEqual(highs[0].height, 2.0)
+        self.assertAlmostEqual(lows[0].height, 0.0)
+        self.assertEqual(list(self.series.trend()[[0, 40, 100]]), [RISING, FALLING, RISING])
+
+    def test_optimal_windows(self):
+        # 1 + sin stays within 0.6..1.4 for 47 minutes either side of each mid-tide crossing
+        windows = self.series.optimal_windows(0.6, 1.4)
+        self.assertEqual(
+            [(window.start.strftime('%H:%M'), window.end.strftime('%H:%M'), window.trend) for window in windows],
+            [('00:00', '00:42', 'rising'), ('05:18', '06:42', 'falling'), ('11:18', '12:42', 'rising'),
+             ('17:18', '18:42', 'falling'), ('23:18', '23:54', 'rising')],
+        )
+        self.assertEqual(windows[1].minutes, 84)
+
+
+class TideDataPageTests(SimpleTestCase):
+    """The tide page says when a day is approximated, and its links keep the chosen data source."""
+
+    def setUp(self):
+        cache.clear()
+        times = np.arange(np.datetime64('2024-11-01T00:00'), np.datetime64('2024-11-04T00:00'), np.timedelta64(6, 'm'))
+        hours = (times - times[0]).astype(np.float64) / 60
+        self.payload = {'data': [
+            {'t': str(t).replace('T', ' '), 'v': f'{1.0 + np.sin(2 * np.pi * h / 12):.3f}'} for t, h in zip(times, hours)
+        ]}
+
+    @patch('tide.views.predict_day', return_value=None)
+    def test_shifted_approximation_is_shown(self, _):
+        url = reverse('tide_data', args=['8443970'])
+        tomorrow = (datetime.today() + timedelta(days=1)).strftime('%Y-%m-%d')
+        with patch('tide.views.get_tide_data', return_value=self.payload):
+            response = self.client.get(url, {'date': tomorrow, 'source': 'noaa'})
+            self.assertEqual(response.context['data_source'], 'shifted')
+            self.assertContains(response, 'tide-approximation')
+            self.assertContains(response, f'?page=2&date={tomorrow}&source=noaa')
+            self.assertContains(response, '<input type="hidden" name="source" value="noaa">', html=True)
+
+            response = self.client.get(url, {'source': 'noaa'})
+            self.assertEqual(response.context['data_source'], 'noaa')
+            self.assertNotContains(response, 'tide-approximation')
+
+
+class TideSeriesFetchTests(SimpleTestCase):
+    """Long ranges are split along NOAA's per-request limit and the chunks merged back in order."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_chunk_boundaries(self):
+        jan1, mar3 = date(2024, 1, 1), date(2024, 3, 3)
+        self.assertEqual(split_date_range(jan1, mar3), [
+            (date(2024, 1, 1), date(2024, 1, 31)),
+            (date(2024, 2, 1), date(2024, 3, 2)),
+            (date(2024, 3, 3), date(2024, 3, 3)),
+        ])
+        self.assertEqual(split_date_range(jan1, date(2024, 1, 31)), [(jan1, date(2024, 1, 31))])
+        self.assertEqual(split_date_range(jan1, jan1), [(jan1, jan1)])
+        self.assertEqual(split_date_range(jan1, date(2024, 12, 30), 'hourly_height'), [(jan1, date(2024, 12, 30))])
+        self.assertEqual(split_date_range(jan1, date(2023, 12, 31)), [])
+
+    def test_chunks_are_merged_in_order_without_duplicates(self):
+        def get_json(url, params):
+            # each chunk also returns the first sample of the next one, as NOAA does at midnight
+            begin = datetime.strptime(params['begin_date'], '%Y%m%d')
+            end = datetime.strptime(params['end_date'], '%Y%m%d') + timedelta(days=1)
+            return {'data': [
+                {'t': begin.strftime('%Y-%m-%d %H:%M'), 'v': str(begin.day)},
+                {'t': begin.strftime('%Y-%m-%d 12:00'), 'v': ' '},
+                {'t': end.strftime('%Y-%m-%d %H:%M'), 'v': str(end.day)},
+            ]}
+
+        with patch('tide.upstream.noaa.get_json', side_effect=get_json) as client:
+            series = get_tide_series(['8443970', '8443970'], date(2024, 1, 1), date(2024, 3, 3))
+        self.assertEqual(client.call_count, 3)
+        self.assertEqual(sorted(call.args[1]['begin_date'] for call in client.call_args_list), ['20240101', '20240201', '20240303'])
+        self.assertEqual(list(series), ['8443970'])
+        self.assertEqual(
+            [str(t) for t in series['8443970'].times],
+            ['2024-01-01T00:00', '2024-02-01T00:00', '2024-03-03T00:00', '2024-03-04T00:00'],
+        )
+        self.assertEqual(list(series['8443970'].heights), [1.0, 1.0, 3.0, 4.0])
+
+
+class TideChartTests(SimpleTestCase):
+    """The chart JSON carries a content ETag, and a repeated request that sends it back gets 304."""
+
+    def test_repeated_request_is_not_modified(self):
+        payload = {'data': [{'t': '2024-11-01 00:00', 'v': '1.0'}, {'t': '2024-11-01 00:06', 'v': '1.1'}]}
+        url = reverse('tide_chart', args=['8443970'])
+        with patch('tide.views.get_tide_data', return_value=payload):
+            first = self.client.get(url, {'source': 'noaa'})
+            chart = json.loads(first.content)
+            self.assertEqual(chart['traces'][0]['y'], [1.0, 1.1])
+            self.assertEqual(chart['traces'][0]['name'], 'NOAA Tide Heights')
+
+            second = self.client.get(url, {'source': 'noaa'}, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(second.status_code, 304)
+            self.assertEqual(second['ETag'], first['ETag'])
+            self.assertEqual(second.content, b'')
+
+            payload['data'][1]['v'] = '1.2'
+            changed = self.client.get(url, {'source': 'noaa'}, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed['ETag'], first['ETag'])
+
+
+@override_settings(WEATHER_GRID_RESOLUTION=0.05)
+class WeatherGridTests(SimpleTestCase):
+    """Coordinates are bucketed into grid cells, and every coordinate in a cell shares one upstream call."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cells_share_one_call(self):
+        self.assertEqual(grid_cell(42.351, -71.049), (847, -1421))
+        self.assertEqual(grid_cell(42.36, -71.06), (847, -1421))
+        self.assertEqual(grid_cell(42.38, -71.06), (848, -1421))
+        self.assertEqual(cell_center((847, -1421)), (42.35, -71.05))
+
+        with patch('tide.weather.fetch_weather', return_value={'wind': {'speed': 9}}) as fetch:
+            self.assertEqual(get_weather(42.351, -71.049), {'wind': {'speed': 9}})
+            self.assertEqual(get_weather(42.36, -71.06), {'wind': {'speed': 9}})
+            fetch.assert_called_once_with(42.35, -71.05, 'imperial')
+            get_weather(42.38, -71.06)
+            self.assertEqual(fetch.call_count, 2)
+
+
+@patch('tide.geocoding.config', return_value='test-key')
+class GeocodingTests(TestCase):
+    """Addresses are cached per normalized key, including "not found" answers, and expired entries cover outages."""
+
+    def setUp(self):
+        prune_expired()  # also empties the in-process LRU
+        GeocodeCacheEntry.objects.all().delete()
+
+    def forget_local(self):
+        """Drop the in-process LRU so the next lookup reads GeocodeCacheEntry."""
+        geocoding._local.clear()
+
+    def test_equivalent_addresses_share_one_entry(self, _):
+        answer = {'status': 'OK', 'results': [{'geometry': {'location': {'lat': 42.42, 'lng': -70.92}}}]}
+        with patch('tide.geocoding.upstream.google_geocoding.get_json', return_value=answer) as get_json:
+            self.assertEqual(geocode('1 Café St., Nahant, MA'), (42.42, -70.92))
+            self.forget_local()
+            self.assertEqual(geocode('  1 cafe st nahant   ma'), (42.42, -70.92))
+            self.assertEqual(geocode('1 CAFÉ ST; NAHANT, MA!'), (42.42, -70.92))
+        get_json.assert_called_once()
+        self.assertEqual(list(GeocodeCacheEntry.objects.values_list('address_key', flat=True)), ['1 cafe st nahant ma'])
+
+    def test_zero_results_are_cached(self, _):
+        with patch('tide.geocoding.upstream.google_geocoding.get_json', return_value={'status': 'ZERO_RESULTS'}) as get_json:
+            self.assertIsNone(geocode('Nowhere Beach'))
+            self.forget_local()
+            self.assertIsNone(geocode('Nowhere Beach'))
+        get_json.assert_called_once()
+        self.assertFalse(GeocodeCacheEntry.objects.get().found)
+
+    def test_expired_entry_is_used_when_the_api_fails(self, _):
+        GeocodeCacheEntry.objects.create(
+            address_key='nahant ma', latitude=42.42, longitude=-70.92, expires_at=timezone.now() - timedelta(days=1))
+        with patch('tide.geocoding.upstream.google_geocoding.get_json', side_effect=requests.exceptions.Timeout) as get_json:
+            with self.assertLogs('tide.geocoding', 'WARNING'):
+                self.assertEqual(geocode('Nahant, MA'), (42.42, -70.92))
+            get_json.assert_called_once()
+            with self.assertRaises(requests.exceptions.RequestException):
+                geocode('Lynn, MA')
+
+    def test_prune_expired_deletes_only_expired_entries(self, _):
+        for key, expires_in in [('expired', -1), ('just expired', 0), ('fresh', 1)]:
+            GeocodeCacheEntry.objects.create(address_key=key, found=False, expires_at=timezone.now() + timedelta(days=expires_in))
+        self.assertEqual(prune_expired(), 2)
+        self.assertEqual(list(GeocodeCacheEntry.objects.values_list('address_key', flat=True)), ['fresh'])
+
+
+class WarmPlanTests(TestCase):
+    """The warming plan asks for each (station, day) and weather cell once, and a dry run calls nothing."""
+
+    def setUp(self):
+        a, b = create_profile('a'), create_profile('b')
+        for user, station_id, lat, lng in [
+            (a.user, '8443970', 42.351, -71.049),
+            (b.user, '8443970', 42.36, -71.06),    # same station and weather cell as the first
+            (b.user, '8443970', 42.351, -71.049),  # the first spot saved twice
+            (a.user, '8440452', 42.42, -70.92),
+        ]:
+            SurfSpot.objects.create(user=user, station_id=station_id, latitude=lat, longitude=lng)
+
+    @patch('tide.warming.get_harmonic_model', side_effect=lambda station_id: object() if station_id == '8440452' else None)
+    def test_duplicate_stations_and_cells_collapse(self, _):
+        plan = build_plan(today=datetime(2024, 11, 1))
+        self.assertEqual(plan.spots, 4)
+        self.assertEqual(plan.tide_tasks, [
+            ('8440452', '20241101'),  # tomorrow comes from its harmonic model
+            ('8443970', '20241101'),
+            ('8443970', '20241102'),
+        ])
+        self.assertEqual(plan.weather_tasks, sorted({grid_cell(42.35, -71.05), grid_cell(42.42, -70.92)}))
+        self.assertEqual((len(plan), plan.naive_calls), (5, 12))
+
+    def test_dry_run_makes_no_upstream_calls(self):
+        out = StringIO()
+        with patch.object(UpstreamClient, 'get_json') as get_json, \
+                patch('tide.warming.warm_tide_data') as warm_tide, patch('tide.warming.warm_weather') as warm_cell:
+            call_command('warm_caches', '--dry-run', stdout=out)
+        get_json.assert_not_called()
+        warm_tide.assert_not_called()
+        warm_cell.assert_not_called()
+        self.assertIn('Saved spots:            4', out.getvalue())
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """Repeated provider failures open the circuit; one probe after the reset timeout closes it again."""
+
+    @patch('tide.upstream.time')
+    def test_closed_open_half_open_closed(self, clock):
+        clock.monotonic.return_value = 1000.0
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        clock.monotonic.return_value = 1031.0
+        self.assertTrue(breaker.allow())  # the probe
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()  # a failed probe re-opens at once
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        clock.monotonic.return_value = 1062.0
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    @override_settings(UPSTREAM_BREAKER={'failure_threshold': 2, 'reset_timeout': 30})
+    def test_open_circuit_fails_fast(self):
+        client = UpstreamClient('test')
+        client._session = Mock(**{'get.side_effect': requests.exceptions.ConnectionError})
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                client._request('https://example.com', {})
+        with self.assertRaises(UpstreamUnavailable):
+            client._request('https://example.com', {})
+        self.assertEqual(client._session.get.call_count, 2)
+
+    @override_settings(UPSTREAM_BREAKER={'failure_threshold': 2, 'reset_timeout': 30})
+    def test_undecodable_success_counts_as_failure(self):
+        maintenance = requests.Response()
+        maintenance.status_code = 200
+        maintenance._content = b'<html>Down for maintenance</html>'
+        client = UpstreamClient('test')
+        client._session = Mock(**{'get.return_value': maintenance})
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.JSONDecodeError):
+                client._request('https://example.com', {})
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(client.stats.snapshot()['failure'], 2)
+        with self.assertRaises(UpstreamUnavailable):
+            client._request('https://example.com', {})
+
+
+class CursorPaginatorTests(TestCase):
+    """Keyset pages neither skip nor repeat rows, even on tied timestamps or when rows arrive between pages."""
+
+    def setUp(self):
+        self.author = create_profile('author')
+        self.noon = timezone.make_aware(datetime(2024, 11, 1, 12))
+
+    def post(self, message, timestamp):
+        status = StatusMessage.objects.create(profile=self.author, message=message)
+        StatusMessage.objects.filter(pk=status.pk).update(timestamp=timestamp)
+        return status.pk
+
+    def pages(self, paginator, cursor=None):
+        while True:
+            page = paginator.page(cursor)
+            yield [status.pk for status in page]
+            if not page.has_next:
+                return
+            cursor = page.next_cursor
+
+    def test_ties_and_inserts_between_pages(self):
+        tied = [self.post(f'tied {i}', self.noon) for i in range(7)]
+        older = self.post('older', self.noon - timedelta(hours=1))
+        paginator = CursorPaginator(StatusMessage.objects.all(), ('-timestamp', '-pk'), per_page=3)
+
+        pages = list(self.pages(paginator))
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual(sum(pages, []), sorted(tied, reverse=True) + [older])
+
+        first = paginator.page()
+        self.post('newer', self.noon + timedelta(hours=1))  # lands before the cursor: not repeated
+        late_tie = self.post('late tie', self.noon)  # highest pk of the tie, so also before the cursor
+        oldest = self.post('oldest', self.noon - timedelta(hours=2))  # after the cursor: still reached
+        rest = sum(self.pages(paginator, first.next_cursor), [])
+        self.assertEqual([status.pk for status in first] + rest, sorted(tied, reverse=True) + [older, oldest])
+        self.assertNotIn(late_tie, rest)
+
+        with self.assertRaises(Http404):
+            paginator.page('tampered')
+
+
+class NewsFeedQueryCountTests(TestCase):
+    """Rendering a feed page must cost the same number of queries however much is on it."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader = create_profile('reader')
+            self.authors = [create_profile(f'author{i}') for i in range(3)]
+        self.client.login(username='reader', password='password')
+
+    def add_posts(self, count):
+        start = StatusMessage.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(start, start + count):
+                author = self.authors[i % len(self.authors)]
+                spot = SurfSpot.objects.create(user=author.user, station_id='8443970', latitude=42.35, longitude=-71.05)
+                session = SurfSession.objects.create(
+                    surf_spot=spot, user=author.user, date=date(2024, 11, 1) + timedelta(days=i),
+                    duration=timedelta(hours=1), wave_rating=3,
+                )
+                status = StatusMessage.objects.create(profile=author, message=f'post {i}', surf_session=session)
+                Image.objects.create(status_message=status, image_file=f'images/{i}.jpg')
+                Image.objects.create(status_message=status, image_file=f'images/{i}b.jpg')
+                parent = Comment.objects.create(status_message=status, profile=self.reader, comment_text='nice')
+                reply = Comment.objects.create(status_message=status, profile=author, comment_text='thanks', parent_comment=parent)
+                Comment.objects.create(status_message=status, profile=self.reader, comment_text='welcome', parent_comment=reply)
+
+    def expire_cards(self):
+        """Make every status card a cache miss, so the page renders them all from the database."""
+        StatusMessage.objects.update(card_version=F('card_version') + 1)
+
+    def count_queries(self, url):
+        self.client.get(url)  # warm per-profile caches such as the friend id sets
+        self.expire_cards()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_news_feed_query_count_is_constant(self):
+        url = reverse('news_feed', args=[self.reader.pk])
+        self.add_posts(1)
+        baseline, _ = self.count_queries(url)
+
+        self.add_posts(9)
+        self.expire_cards()
+        with self.assertNumQueries(baseline):
+            response = self.client.get(url)
+        self.assertContains(response, 'post 9')
+        self.assertContains(response, 'images/9b.jpg')
+
+    def test_profile_statuses_query_count_is_constant(self):
+        url = reverse('show_profile', args=[self.authors[0].pk])
+        self.add_posts(1)
+        baseline, _ = self.count_queries(url)
+
+        self.add_posts(9)
+        self.expire_cards()
+        with self.assertNumQueries(baseline):
+            response = self.client.get(url)
+        self.assertContains(response, 'post 9')
+
+    def test_cached_cards_skip_images(self):
+        url = reverse('news_feed', args=[self.reader.pk])
+        self.add_posts(3)
+        cold, _ = self.count_queries(url)
+        with self.assertNumQueries(cold - 1):  # no image query; comments are rendered per request
+            self.client.get(url)
+
+        status = StatusMessage.objects.get(message='post 1')
+        Comment.objects.create(status_message=status, profile=self.reader, comment_text='still firing')
+        self.assertContains(self.client.get(url), 'still firing')
+
+        self.authors[1].fname = 'Renamed'
+        self.authors[1].save()
+        self.assertContains(self.client.get(url), 'Renamed Surfer')
+
+
+class OwnerControlsTests(TestCase):
+    """Edit and delete links are rendered, and the views answer, only for the owner, even from a cached card."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner = create_profile('owner')
+            self.visitor = create_profile('visitor')
+            self.status = StatusMessage.objects.create(profile=self.owner, message='mine')
+            self.comment = Comment.objects.create(status_message=self.status, profile=self.owner, comment_text='also mine')
+        self.owner_links = [
+            reverse('update_status_message', args=[self.status.pk]),
+            reverse('delete_status_message', args=[self.status.pk]),
+            reverse('delete_comment', args=[self.comment.pk]),
+        ]
+
+    def test_links_are_only_rendered_for_the_owner(self):
+        url = reverse('show_profile', args=[self.owner.pk])
+        self.client.login(username='owner', password='password')
+        response = self.client.get(url)  # caches the card
+        for link in self.owner_links:
+            self.assertContains(response, link)
+
+        self.client.login(username='visitor', password='password')
+        response = self.client.get(url)
+        self.assertContains(response, 'also mine')
+        for link in self.owner_links:
+            self.assertNotContains(response, link)
+
+    def test_views_refuse_other_users(self):
+        self.client.login(username='visitor', password='password')
+        for link in self.owner_links:
+            self.assertEqual(self.client.get(link).status_code, 404)
+            self.assertEqual(self.client.post(link, {'message': 'not yours'}).status_code, 404)
+        self.assertEqual(StatusMessage.objects.get(pk=self.status.pk).message, 'mine')
+        self.assertTrue(Comment.objects.filter(pk=self.comment.pk).exists())
+
+
+class NewsFeedTimelineTests(TestCase):
+    """The news feed merges a profile's own timeline with the broadcasts, each read in index order."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader = create_profile('reader')
+            self.authors = [create_profile(f'author{i}') for i in range(2)]
+
+    def post(self, author, message):
+        with self.captureOnCommitCallbacks(execute=True):
+            return StatusMessage.objects.create(profile=author, message=message)
+
+    def test_fan_out_writes_one_entry_per_recipient_up_to_the_limit(self):
+        fanned_out = self.post(self.authors[0], 'fanned out')
+        self.assertEqual(
+            sorted(FeedEntry.objects.filter(status_message=fanned_out).values_list('recipient', flat=True)),
+            sorted([self.reader.pk, self.authors[1].pk]),
+        )
+        with override_settings(FEED_FANOUT_LIMIT=2):
+            at_limit = self.post(self.authors[0], 'at the limit')
+        self.assertEqual(FeedEntry.objects.filter(status_message=at_limit, recipient__isnull=False).count(), 2)
+        with override_settings(FEED_FANOUT_LIMIT=1):
+            broadcast = self.post(self.authors[0], 'over the limit')
+        self.assertEqual(list(FeedEntry.objects.filter(status_message=broadcast).values_list('recipient', 'timestamp')),
+                         [(None, broadcast.timestamp)])
+
+    def test_pages_merge_fanned_out_and_broadcast_posts(self):
+        fanned_out = self.post(self.authors[0], 'fanned out')
+        with override_settings(FEED_FANOUT_LIMIT=1):
+            broadcast = self.post(self.authors[1], 'broadcast')
+            own = self.post(self.reader, 'own broadcast')
+            self.assertEqual(FeedEntry.objects.filter(recipient__isnull=True).count(), 2)
+            fan_out(broadcast)  # a repeated broadcast is not stored twice
+        self.assertEqual(FeedEntry.objects.filter(recipient__isnull=True).count(), 2)
+
+        first = news_feed_page(self.reader, per_page=1)
+        second = news_feed_page(self.reader, first.next_cursor, per_page=1)
+        self.assertEqual(list(first) + list(second), [broadcast, fanned_out])
+        self.assertFalse(second.has_next)
+        self.assertEqual(second.object_list[0].feed_timestamp, fanned_out.timestamp)
+        self.assertIn(own, news_feed_page(self.authors[0]).object_list)
+
+    @skipUnless(connection.vendor == 'sqlite', "reads SQLite's query plan")
+    def test_sources_are_read_without_sorting(self):
+        paginator = MergedCursorPaginator(self.reader.get_news_feed(), FEED_ORDERING)
+        after = paginator._after([timezone.now(), 1])
+        for queryset in paginator.querysets:
+            for plan in [queryset[:21].explain(), queryset.filter(after)[:21].explain()]:
+                self.assertIn('feed_recipient_time_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+class CommentThreadTests(TestCase):
+    """Comment threads are stored as materialized paths and read back as trees."""
+
+    def setUp(self):
+        self.profile = create_profile('commenter')
+        self.status = StatusMessage.objects.create(profile=self.profile, message='thread')
+
+    def reply(self, parent, text):
+        return Comment.objects.create(status_message=self.status, profile=self.profile, comment_text=text, parent_comment=parent)
+
+    def test_thread_loads_in_one_query(self):
+        first = self.reply(None, 'first')
+        chain = [first]
+        for i in range(5):
+            chain.append(self.reply(chain[-1], f'reply {i}'))
+        second = self.reply(None, 'second')
+        self.reply(first, 'sibling')
+
+        with self.assertNumQueries(1):
+            roots = load_thread(self.status, max_depth=3)
+
+        self.assertEqual([c.pk for c in roots], [first.pk, second.pk])
+        self.assertEqual([c.comment_text for c in roots[0].thread_replies], ['reply 0', 'sibling'])
+        deepest = roots[0].thread_replies[0].thread_replies[0]
+        self.assertEqual((deepest.comment_text, deepest.depth), ('reply 1', 2))
+        self.assertTrue(deepest.more_replies)
+        self.assertFalse(roots[1].more_replies)
+
+        response = self.client.get(reverse('comment_replies', args=[deepest.pk]))
+        self.assertContains(response, 'reply 4')
+        self.assertNotContains(response, 'sibling')
+
+    def test_delete_removes_subtree(self):
+        first = self.reply(None, 'first')
+        self.reply(self.reply(first, 'child'), 'grandchild')
+        other = self.reply(None, 'other')
+
+        first.delete()
+        self.assertEqual(list(Comment.objects.all()), [other])
+
+
+class FriendshipTests(TestCase):
+    """Friendships are stored once per pair and read from a cached set of friend ids."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pairs_are_canonical_and_cache_is_invalidated(self):
+        a, b, c = create_profile('a'), create_profile('b'), create_profile('c')
+        self.assertEqual(c.friend_ids(), frozenset())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            c.add_friend(a)
+            a.add_friend(c)
+        self.assertEqual(list(Friend.objects.values_list('profile1', 'profile2')), [(a.pk, c.pk)])
+
+        self.assertEqual(c.friend_ids(), frozenset({a.pk}))
+        with self.assertNumQueries(0):
+            self.assertTrue(c.is_friend(a))
+            self.assertFalse(c.is_friend(b))
+        self.assertEqual(a.friend_ids(), frozenset({c.pk}))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            a.remove_friend(c)
+        self.assertFalse(c.is_friend(a))
+
+    def test_friend_sets_expire_quickly_in_a_process_local_cache(self):
+        # Other workers never see the invalidation, so they must not keep the set for a day.
+        a = create_profile('a')
+        with patch('tide.models.cache') as mock_cache, override_settings(PROCESS_LOCAL_CACHE_TTL=30):
+            mock_cache.get.return_value = None
+            a.friend_ids()
+            self.assertEqual(mock_cache.set.call_args.args[2], 30)
+            redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+            with override_settings(CACHES=redis):
+                a.friend_ids()
+            self.assertEqual(mock_cache.set.call_args.args[2], Friend.objects.cache_ttl)
+
+
+class FriendPairMigrationTests(TransactionTestCase):
+    """Migration 0022 canonicalizes friendships stored in both orientations without breaking uniqueness."""
+
+    before = [('tide', '0021_comment_depth_comment_path_and_more')]
+    after = [('tide', '0022_friend_friend_pair_ordered')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_both_orientations_collapse_to_one_row(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        old_user, old_profile, old_friend = (apps.get_model(*name) for name in
+                                             [('auth', 'User'), ('tide', 'Profile'), ('tide', 'Friend')])
+        profiles = [
+            old_profile.objects.create(user=old_user.objects.create(username=f'm{i}'), fname='m', lname='m', city='c', email='m@example.com')
+            for i in range(3)
+        ]
+        a, b, c = (profile.pk for profile in profiles)
+        for pair in [(c, a), (a, c), (b, b), (b, a), (c, b)]:
+            old_friend.objects.create(profile1_id=pair[0], profile2_id=pair[1])
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.after)
+
+        pairs = executor.loader.project_state(self.after).apps.get_model('tide', 'Friend').objects.values_list('profile1', 'profile2')
+        self.assertEqual(sorted(pairs), [(a, b), (a, c), (b, c)])
+
+
+class FeedBackfillMigrationTests(TransactionTestCase):
+    """Migration 0031 gives status messages posted before the timelines existed their feed entries."""
+
+    before = [('tide', '0030_feedentry_feed_broadcast_unique')]
+    after = [('tide', '0031_backfill_feed_entries')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate_posts(self):
+        """Create three profiles and posts at the old state, migrate, and return (profile ids, message ids, entries)."""
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        old_user, old_profile, old_status, old_entry = (apps.get_model(*name) for name in
+                                                        [('auth', 'User'), ('tide', 'Profile'), ('tide', 'StatusMessage'), ('tide', 'FeedEntry')])
+        profiles = [
+            old_profile.objects.create(user=old_user.objects.create(username=f'm{i}'), fname='m', lname='m', city='c', email='m@example.com')
+            for i in range(3)
+        ]
+        messages = [old_status.objects.create(profile=profile, message=f'old {i}') for i, profile in enumerate(profiles[:2])]
+        fanned_out = old_status.objects.create(profile=profiles[2], message='already fanned out')
+        old_entry.objects.create(recipient=profiles[0], status_message=fanned_out, timestamp=fanned_out.timestamp)
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.after)
+        entries = executor.loader.project_state(self.after).apps.get_model('tide', 'FeedEntry').objects
+        return [profile.pk for profile in profiles], [message.pk for message in messages + [fanned_out]], entries
+
+    def test_old_posts_are_fanned_out_to_every_other_profile(self):
+        (a, b, c), (from_a, from_b, from_c), entries = self.migrate_posts()
+        self.assertEqual(
+            sorted(entries.values_list('status_message', 'recipient')),
+            sorted([(from_a, b), (from_a, c), (from_b, a), (from_b, c), (from_c, a)]),
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_old_posts_past_the_fanout_limit_become_broadcasts(self):
+        (a, b, c), (from_a, from_b, from_c), entries = self.migrate_posts()
+        self.assertEqual(
+            sorted(entries.values_list('status_message', 'recipient'), key=str),
+            sorted([(from_a, None), (from_b, None), (from_c, a)], key=str),
+        )
+
+
+class FriendSuggestionTests(TestCase):
+    """Suggestions are ranked from mutual friends and shared stations, and refreshed from a queue."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_ranking_and_refresh_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            a, b, c, d = (create_profile(name) for name in 'abcd')
+            SurfSpot.objects.create(user=a.user, station_id='8443970', latitude=42.35, longitude=-71.05)
+            SurfSpot.objects.create(user=d.user, station_id='8443970', latitude=42.36, longitude=-71.04)
+            a.add_friend(b)
+            b.add_friend(c)
+        self.assertEqual(set(queued_profiles()), {a, b, c, d})
+
+        refresh_profile(a)
+        self.assertNotIn(a.pk, FriendSuggestionRefresh.objects.values_list('profile_id', flat=True))
+        ranked = {p.pk: p for p in a.get_friend_suggestions()}
+        self.assertEqual(set(ranked), {c.pk, d.pk})
+        self.assertEqual(ranked[c.pk].mutual_friends, 1)
+        self.assertEqual(ranked[d.pk].shared_stations, 1)
+        self.assertLess(ranked[d.pk].distance_km, 5)
+
+        # a stored suggestion disappears as soon as the two become friends
+        with self.captureOnCommitCallbacks(execute=True):
+            a.add_friend(c)
+        self.assertEqual([p.pk for p in a.get_friend_suggestions()], [d.pk])
+        self.assertIn(a.pk, FriendSuggestionRefresh.objects.values_list('profile_id', flat=True))
+
+
+class CounterTests(TestCase):
+    """Counter columns follow creates, deletes and moves, and reconcile() repairs drift."""
+
+    def test_counters_follow_writes(self):
+        a, b = create_profile('a'), create_profile('b')
+        spot1 = SurfSpot.objects.create(user=a.user, station_id='8443970', latitude=42.35, longitude=-71.05)
+        spot2 = SurfSpot.objects.create(user=a.user, station_id='8447930', latitude=41.52, longitude=-70.67)
+        session = SurfSession.objects.create(
+            surf_spot=spot1, user=a.user, date=date(2024, 11, 1), duration=timedelta(hours=1), wave_rating=3)
+        post = StatusMessage.objects.create(profile=a, message='Glassy', surf_session=session)
+        top = Comment.objects.create(status_message=post, profile=b, comment_text='Nice')
+        Comment.objects.create(status_message=post, profile=a, comment_text='Thanks', parent_comment=top)
+        a.add_friend(b)
+        a.add_friend(b)
+
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(Profile.objects.get(pk=a.pk).status_count, 1)
+        self.assertEqual([p.friend_count for p in Profile.objects.order_by('pk')], [1, 1])
+
+        session.surf_spot = spot2
+        session.save()
+        self.assertEqual([s.session_count for s in SurfSpot.objects.order_by('pk')], [0, 1])
+
+        top.delete()
+        a.remove_friend(b)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+        self.assertEqual([p.friend_count for p in Profile.objects.order_by('pk')], [0, 0])
+
+        Profile.objects.filter(pk=a.pk).update(status_count=7)
+        self.assertEqual(reconcile(dry_run=True)['profile status messages'], 1)
+        self.assertEqual(reconcile()['profile status messages'], 1)
+        self.assertEqual(Profile.objects.get(pk=a.pk).status_count, 1)
+        self.assertFalse(any(reconcile().values()))
+
+
+class SurfSessionBrowserTests(TestCase):
+    """The public session browser filters by spot nickname and counts each facet without its own filter."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_facet_counts(self):
+        a, b = create_profile('a'), create_profile('b')
+        nahant_a = SurfSpot.objects.create(user=a.user, station_id='8443970', nickname='Nahant', latitude=42.42, longitude=-70.92)
+        nahant_b = SurfSpot.objects.create(user=b.user, station_id='8443970', nickname='Nahant', latitude=42.42, longitude=-70.92)
+        lynn = SurfSpot.objects.create(user=a.user, station_id='8443970', nickname='Lynn', latitude=42.46, longitude=-70.94)
+        for spot, rating in [(nahant_a, 4), (nahant_b, 4), (nahant_b, 2), (lynn, 4)]:
+            SurfSession.objects.create(
+                surf_spot=spot, user=spot.user, date=date(2024, 11, 1), duration=timedelta(hours=1), wave_rating=rating)
+
+        with self.assertNumQueries(3):  # spot list, facet counts, first page
+            response = self.client.get(reverse('surf_sessions_public'), {'surf_spot': 'Nahant', 'wave_rating': 4})
+            self.assertEqual(len(response.context['surf_sessions']), 2)
+        facets = response.context['facets']
+        self.assertEqual(facets['spots'], [('Lynn', 1), ('Nahant', 2)])
+        self.assertEqual(dict(facets['ratings']), {1: 0, 2: 1, 3: 0, 4: 2, 5: 0})
+
+        lynn.nickname = 'Lynn Beach'
+        with self.captureOnCommitCallbacks(execute=True):
+            lynn.save()
+        response = self.client.get(reverse('surf_sessions_public'))
+        self.assertEqual(response.context['facets']['spots'], [('Lynn Beach', 1), ('Nahant', 3)])
+
+    def test_spot_missing_from_the_cached_list_is_still_filtered(self):
+        # A spot saved in another worker doesn't invalidate this worker's in-memory list.
+        a = create_profile('a')
+        self.client.get(reverse('surf_sessions_public'))
+        [swampscott] = SurfSpot.objects.bulk_create([SurfSpot(
+            user=a.user, station_id='8443970', nickname='Swampscott', latitude=42.47, longitude=-70.91)])
+        SurfSession.objects.create(
+            surf_spot=swampscott, user=a.user, date=date(2024, 11, 1), duration=timedelta(hours=1), wave_rating=3)
+        response = self.client.get(reverse('surf_sessions_public'), {'surf_spot': 'Swampscott'})
+        self.assertEqual(len(response.context['surf_sessions']), 1)
+
+
+class SessionRollupTests(TestCase):
+    """Rollups follow session creates, edits and deletes, and match a rebuild from scratch."""
+
+    def rollup_rows(self):
+        return (
+            sorted(SurfSessionMonthlyRollup.objects.values_list(
+                'user_id', 'surf_spot_id', 'month', 'session_count', 'total_duration', 'rating_2', 'rating_4')),
+            sorted(StationDailyRollup.objects.values_list('station_id', 'day', 'session_count', 'total_duration')),
+        )
+
+    def test_rollups_follow_writes(self):
+        a = create_profile('a')
+        boston = SurfSpot.objects.create(user=a.user, station_id='8443970', nickname='Boston', latitude=42.35, longitude=-71.05)
+        woods_hole = SurfSpot.objects.create(user=a.user, station_id='8447930', latitude=41.52, longitude=-70.67)
+        today = timezone.localdate()
+        first = SurfSession.objects.create(surf_spot=boston, user=a.user, date=today, duration=timedelta(hours=1), wave_rating=4)
+        SurfSession.objects.create(surf_spot=boston, user=a.user, date=today, duration=timedelta(minutes=30), wave_rating=2)
+        moved = SurfSession.objects.create(
+            surf_spot=boston, user=a.user, date=today, duration=timedelta(minutes=45), wave_rating=4)
+        moved.surf_spot = woods_hole
+        moved.save()
+        first.delete()
+
+        rollup = SurfSessionMonthlyRollup.objects.get(surf_spot=boston)
+        self.assertEqual((rollup.session_count, rollup.total_duration, rollup.mean_rating), (1, timedelta(minutes=30), 2))
+        self.assertEqual(StationDailyRollup.objects.get(station_id='8447930').session_count, 1)
+        incremental = self.rollup_rows()
+        rebuild_rollups()
+        self.assertEqual(self.rollup_rows(), incremental)
+
+        self.client.login(username='a', password='password')
+        response = self.client.get(reverse('surf_session_report'), {'spot': woods_hole.pk})
+        self.assertEqual([row.session_count for row in response.context['user_months']], [2])
+        self.assertEqual(response.context['user_months'][0].total_duration, timedelta(minutes=75))
+        self.assertEqual([row.histogram[3] for row in response.context['station_days']], [(4, 1)])
+
+
+class LogbookTests(TestCase):
+    """Logbooks import in batches with a per-row error report and export in the same format."""
+
+    def test_import_and_export(self):
+        a = create_profile('a')
+        boston = SurfSpot.objects.create(user=a.user, station_id='8443970', nickname='Boston', latitude=42.35, longitude=-71.05)
+        logbook = (
+            "Date,Duration,Wave_Rating,Notes,Station_ID,Nickname,Latitude,Longitude\n"
+            "2024-11-01,1:30:00,4,Glassy barrels,8443970,,,\n"
+            "2024-11-02,0:45:00,9,,8443970,,,\n"
+            "2024-11-03,1:00:00,3,,XYZ,,,\n"
+            "2024-11-04,2:00:00,5,,9999999,Secret,41.5,-70.6\n"
+            "2024-11-05,0:30:00,2,,9999999,,,\n"
+        )
+        self.client.login(username='a', password='password')
+        upload = SimpleUploadedFile('logbook.csv', logbook.encode())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('import_surf_sessions'), {'file': upload})
+        report = response.context['report']
+        self.assertEqual((report.created, report.spots_created, report.failed), (3, 1, 2))
+        self.assertEqual([line for line, _ in report.errors], [3, 4])
+
+        secret = SurfSpot.objects.get(station_id='9999999')
+        self.assertEqual((secret.nickname, secret.session_count), ('Secret', 2))
+        self.assertEqual(SurfSpot.objects.get(pk=boston.pk).session_count, 1)
+        self.assertEqual(StationDailyRollup.objects.get(station_id='8443970').total_duration, timedelta(minutes=90))
+        self.assertEqual([s.pk for s in search('barrels')], [SurfSession.objects.get(surf_spot=boston).pk])
+
+        response = self.client.get(reverse('export_surf_sessions'))
+        exported = b''.join(response.streaming_content).decode()
+        self.assertEqual(exported.splitlines()[1], '2024-11-01,01:30:00,4,Glassy barrels,8443970,Boston,42.35,-71.05')
+        response = self.client.get(reverse('export_surf_sessions'), {'format': 'jsonl'})
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+
+
+class SessionConditionsTests(TestCase):
+    """New sessions get a conditions snapshot after commit, and backfill fills and retries the rest."""
+
+    tide_payload = {'data': [
+        {'t': '2024-11-01 00:00', 'v': '0.2'}, {'t': '2024-11-01 12:00', 'v': '1.1'},
+        {'t': '2024-11-01 12:06', 'v': '1.3'}, {'t': '2024-11-01 18:00', 'v': '0.4'},
+    ]}
+
+    def test_snapshots(self):
+        a = create_profile('a')
+        spot = SurfSpot.objects.create(user=a.user, station_id='8443970', latitude=42.35, longitude=-71.05)
+        weather = {'wind': {'speed': 12.5, 'deg': 270, 'gust': 20.1}}
+        with patch('tide.conditions.get_tide_data', return_value=self.tide_payload) as tide, \
+                patch('tide.conditions.get_weather', return_value=weather):
+            with self.captureOnCommitCallbacks(execute=True):
+                today = SurfSession.objects.create(
+                    surf_spot=spot, user=a.user, date=timezone.localdate(), duration=timedelta(hours=1), wave_rating=5)
+            with self.captureOnCommitCallbacks(execute=True):
+                past = SurfSession.objects.create(
+                    surf_spot=spot, user=a.user, date=date(2024, 11, 1), duration=timedelta(hours=1), wave_rating=4)
+            with self.captureOnCommitCallbacks(execute=True):
+                past.wave_rating = 3
+                past.save()  # same spot and day: the snapshot stands
+            self.assertEqual(tide.call_count, 2)
+
+        self.assertEqual(SurfSessionConditions.objects.get(pk=today.pk).wind_speed, 12.5)
+        snapshot = SurfSessionConditions.objects.get(pk=past.pk)
+        self.assertEqual((snapshot.tide_height, snapshot.tide_trend, snapshot.high_tide, snapshot.low_tide), (1.1, 1, 1.3, 0.2))
+        self.assertIsNone(snapshot.wind_speed)
+        self.assertTrue(snapshot.complete)
+        self.client.login(username='a', password='password')
+        self.assertContains(self.client.get(reverse('view_surf_session', args=[past.pk])), '1.1 m and rising')
+
+        SurfSessionConditions.objects.all().delete()
+        with patch('tide.conditions.get_tide_data', side_effect=requests.exceptions.Timeout), \
+                patch('tide.conditions.get_weather', return_value=weather), self.assertLogs('tide.conditions', 'WARNING'):
+            self.assertEqual(backfill(), {'captured': 2, 'incomplete': 2})
+        with patch('tide.conditions.get_tide_data', return_value={'error': {'message': 'No data was found.'}}), \
+                patch('tide.conditions.get_weather', return_value=weather):
+            self.assertEqual(backfill(), {'captured': 2, 'incomplete': 2})
+        with patch('tide.conditions.get_tide_data', return_value=self.tide_payload) as tide, \
+                patch('tide.conditions.get_weather', return_value=weather):
+            self.assertEqual(backfill(), {'captured': 2, 'incomplete': 0})
+            self.assertEqual(backfill(), {'captured': 0, 'incomplete': 0})
+        self.assertEqual(tide.call_count, 2)  # one per station-day
+        self.assertEqual(list(SurfSessionConditions.objects.filter(surf_session__wave_rating=3, tide_trend=1)
+                              .values_list('surf_session', flat=True)), [past.pk])
+
+
+class SearchTests(TestCase):
+    """Writes are indexed as they happen and search pages through ranked results."""
+
+    def test_index_follows_writes_and_pages(self):
+        a = create_profile('kelly')
+        posts = [StatusMessage.objects.create(profile=a, message=f'Overhead barrels at Nantasket {i}') for i in range(3)]
+        Comment.objects.create(status_message=posts[0], profile=a, comment_text='Nantasket was glassy')
+        StatusMessage.objects.create(profile=a, message='Flat all week')
+
+        page = search('nantasket')
+        self.assertEqual(len(page), 4)
+        self.assertEqual(search('nantasket', kinds=['comment']).object_list[0].search_kind, 'comment')
+        self.assertEqual([p.pk for p in search('kell')], [a.pk])  # last term matches as a prefix
+        self.assertEqual(len(search('barrel* -"(')), 3)  # stemmed, search syntax ignored
+
+        first = search('nantasket', per_page=3)
+        rest = search('nantasket', cursor=first.next_cursor, per_page=3)
+        self.assertTrue(first.has_next)
+        self.assertFalse(rest.has_next)
+        seen = [(r.search_kind, r.pk) for r in [*first, *rest]]
+        self.assertEqual(len(set(seen)), 4)
+
+        posts[1].message = 'Crowded'
+        posts[1].save()
+        posts[2].delete()
+        self.assertEqual(len(search('nantasket')), 2)
+
+        self.client.login(username='kelly', password='password')
+        response = self.client.get(reverse('search'), {'q': 'glassy'})
+        self.assertContains(response, 'Nantasket was glassy')
+
+    def test_old_documents_that_match_better_rank_first(self):
+        best = SearchDocument.objects.create(kind='status', object_id=1, body='Nantasket Nantasket barrels at Nantasket')
+        SearchDocument.objects.bulk_create(
+            SearchDocument(kind='status', object_id=i, body=f'Crowded and blown out, drove past Nantasket on day {i}')
+            for i in range(2, 2600)
+        )
+        rows = ranked_rows(['nantasket'], limit=5)
+        self.assertEqual(rows[0][0], best.pk)
+
+
+class LiveEventTests(TestCase):
+    """The event stream pushes new statuses and comments as small JSON deltas."""
+
+    async def test_stream_receives_status_and_comment_events(self):
+        author = await sync_to_async(create_profile)('author')
+        client = AsyncClient()
+        await client.aforce_login(author.user)
+        response = await client.get(reverse('feed_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        def post_and_comment():
+            with self.captureOnCommitCallbacks(execute=True):
+                status = StatusMessage.objects.create(profile=author, message='Offshore all day')
+            with self.captureOnCommitCallbacks(execute=True):
+                Comment.objects.create(status_message=status, profile=author, comment_text='Still going')
+            return status
+
+        status = await sync_to_async(post_and_comment)()
+        self.assertEqual(
+            await anext(stream),
+            f'event: status\ndata: {{"type": "status", "id": {status.pk}, "profile_id": {author.pk}}}\n\n'.encode(),
+        )
+        self.assertIn(b'event: comment', await anext(stream))
+        # a client disconnecting cancels the pending read, which unsubscribes it
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(len(events.hub), 0)
+
+        response = await client.get(reverse('status_card', args=[status.pk]))
+        self.assertContains(response, 'Still going')
@@ -0,0 +1,163 @@
+# File: upstream.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Shared HTTP client for upstream APIs with per-provider timeouts, request coalescing and circuit breakers.
+
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .cache import CacheStats, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds; overridden per provider by settings.UPSTREAM_TIMEOUTS
+DEFAULT_TIMEOUT = (3.05, 10)
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30
+
+
+class UpstreamUnavailable(requests.exceptions.RequestException):
+    """Raised without contacting a provider whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker. After failure_threshold consecutive failures the
+    circuit opens and calls fail fast for reset_timeout seconds; then one probe call
+    is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go upstream now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True  # this caller is the probe
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit for %s closed", self.name)
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit for %s opened after %d failures", self.name, self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def is_provider_failure(error):
+    """
+    True for errors that say the provider is unhealthy (timeouts, connection errors,
+    429 and 5xx responses, and successful responses whose body is not JSON, such as a
+    proxy's maintenance page) rather than that our request was bad.
+    """
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                              requests.exceptions.JSONDecodeError))
+
+
+class UpstreamClient:
+    """
+    A keep-alive session for one provider. Identical GETs in flight at the same time
+    share one request, every request has the provider's timeout, and repeated provider
+    failures open the circuit so callers fail fast with UpstreamUnavailable.
+    """
+
+    def __init__(self, name, retries=0):
+        self.name = name
+        self.retries = retries
+        self.stats = CacheStats()
+        options = getattr(settings, 'UPSTREAM_BREAKER', {})
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=options.get('failure_threshold', DEFAULT_FAILURE_THRESHOLD),
+            reset_timeout=options.get('reset_timeout', DEFAULT_RESET_TIMEOUT),
+        )
+        self._inflight = SingleFlight(self.stats)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'UPSTREAM_TIMEOUTS', {}).get(self.name, DEFAULT_TIMEOUT)
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    retries = Retry(
+                        total=self.retries,
+                        backoff_factor=0.5,
+                        status_forcelist=(429, 500, 502, 503, 504),
+                        allowed_methods=('GET',),
+                        raise_on_status=False,
+                    )
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+                    session = requests.Session()
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def get_json(self, url, params):
+        """
+        GET url with params and return the decoded JSON body.
+        Raises UpstreamUnavailable while the circuit is open, or another
+        requests.exceptions.RequestException if the request fails.
+        """
+        key = (url, tuple(sorted(params.items())))
+        return self._inflight.do(key, lambda: self._request(url, params))
+
+    def _request(self, url, params):
+        if not self.breaker.allow():
+            self.stats.incr('rejected')
+            raise UpstreamUnavailable(f"{self.name} is unavailable (circuit open)")
+
+        self.stats.incr('request')
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            if isinstance(e, requests.exceptions.RequestException) and not is_provider_failure(e):
+                self.breaker.record_success()  # the provider answered; the request itself was bad
+            else:
+                self.stats.incr('failure')
+                self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return data
+
+
+noaa = UpstreamClient('noaa', retries=1)
+openweather = UpstreamClient('openweather')
+google_geocoding = UpstreamClient('google_geocoding')
@@ -35,14 +35,20 @@ urlpatterns = [
     path('status/<int:pk>/delete/', views.DeleteStatusMessageView.as_view(), name='delete_status_message'),
     path('profile/<int:pk>/news_feed/', views.ShowNewsFeedView.as_view(), name='news_feed'),
     path('tide-data/<str:station_id>/', views.tide_data_view, name='tide_data'),
+    path('tide-data/<str:station_id>/chart.json', views.tide_chart_view, name='tide_chart'),
     path('location/', views.location_input_view, name='location_input'),
     path('nearest-station/<float:latitude>/<float:longitude>/', views.nearest_station_view, name='nearest_station'),
+    path('compare-stations/', views.compare_stations_view, name='compare_stations'),
+    path('compare-stations/chart.json', views.compare_chart_view, name='compare_chart'),
     path('weather/<float:lat>/<float:lon>/', views.weather_view, name='weather_view'),
     path('tide-info/', views.tide_info_view, name='tide_info'),
     path('save_station/', views.SaveStationView.as_view(), name='save_station'),
     path('saved-locations/', views.SavedLocationsView.as_view(), name='saved_locations'),
     path('all_friends/', views.AllFriendsView.as_view(), name='all_friends'),
     path('surf_sessions/', views.SurfSessionListView.as_view(), name='surf_sessions'),
+    path('surf_sessions/report/', views.SurfSessionReportView.as_view(), name='surf_session_report'),
+    path('surf_sessions/import/', views.ImportSurfSessionsView.as_view(), name='import_surf_sessions'),
+    path('surf_sessions/export/', views.ExportSurfSessionsView.as_view(), name='export_surf_sessions'),
     path('surf_sessions/new/', views.CreateSurfSessionView.as_view(), name='create_surf_session'),
     path('surf_sessions/<int:pk>/update/', views.UpdateSurfSessionView.as_view(), name='update_surf_session'),
     path('surf_sessions/<int:pk>/delete/', views.DeleteSurfSessionView.as_view(), name='delete_surf_session'),
@@ -50,5 +56,10 @@ urlpatterns = [
     path('comment/status/<int:status_message_id>/', views.CreateCommentView.as_view(), name='create_comment'),
     path('comment/reply/<int:parent_comment_id>/', views.CreateCommentView.as_view(), name='reply_to_comment'),
     path('comment/delete/<int:pk>/', views.DeleteCommentView.as_view(), name='delete_comment'),
+    path('comment/<int:pk>/replies/', views.comment_replies_view, name='comment_replies'),
     path('surf_sessions_public/', views.SurfSessionPublicListView.as_view(), name='surf_sessions_public'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('status/<int:pk>/card/', views.StatusCardView.as_view(), name='status_card'),
+    path('events/feed/', views.event_stream_view, name='feed_events'),
+    path('events/profile/<int:pk>/', views.event_stream_view, name='profile_events'),
 ]
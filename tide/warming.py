@@ -0,0 +1,84 @@
+# File: warming.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: Pre-fetches tide and weather data for saved surf spots so their pages are served from a warm cache.
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import requests
+
+from .models import SurfSpot
+from .noaa import warm_tide_data
+from .prediction import get_harmonic_model
+from .weather import grid_cell, grid_resolution, warm_weather
+
+logger = logging.getLogger(__name__)
+
+
+class WarmPlan:
+    """
+    The deduplicated set of upstream requests needed to keep every saved spot warm:
+    one NOAA day per distinct (station, date) and one weather lookup per grid cell.
+    """
+
+    def __init__(self, spots, tide_tasks, weather_tasks):
+        self.spots = spots
+        self.tide_tasks = tide_tasks
+        self.weather_tasks = weather_tasks
+
+    @property
+    def naive_calls(self):
+        """Calls needed if every saved spot fetched today, tomorrow and its weather on its own."""
+        return self.spots * 3
+
+    def __len__(self):
+        return len(self.tide_tasks) + len(self.weather_tasks)
+
+
+def build_plan(today=None):
+    """
+    Collect the tide days and weather cells to warm for all SurfSpots. Tomorrow is only
+    fetched from NOAA for stations without a harmonic model, matching load_day_series().
+    """
+    today = today or datetime.today()
+    tomorrow = today + timedelta(days=1)
+    resolution = grid_resolution()
+
+    spots = 0
+    station_ids = set()
+    cells = set()
+    for station_id, lat, lng in SurfSpot.objects.values_list('station_id', 'latitude', 'longitude').iterator():
+        spots += 1
+        station_ids.add(station_id)
+        cells.add(grid_cell(lat, lng, resolution))
+
+    tide_tasks = []
+    for station_id in sorted(station_ids):
+        tide_tasks.append((station_id, today.strftime('%Y%m%d')))
+        if get_harmonic_model(station_id) is None:
+            tide_tasks.append((station_id, tomorrow.strftime('%Y%m%d')))
+    return WarmPlan(spots, tide_tasks, sorted(cells))
+
+
+def run_plan(plan, max_workers=4, min_fresh=0):
+    """
+    Execute a WarmPlan with at most max_workers requests in flight. Entries still fresh
+    for min_fresh seconds are skipped. Returns counts of 'fetched', 'skipped' and 'failed'.
+    """
+    counts = {'fetched': 0, 'skipped': 0, 'failed': 0}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='warm') as executor:
+        futures = {}
+        for station_id, date in plan.tide_tasks:
+            future = executor.submit(warm_tide_data, station_id, date, date, min_fresh=min_fresh)
+            futures[future] = f"tide {station_id} {date}"
+        for cell in plan.weather_tasks:
+            futures[executor.submit(warm_weather, cell, min_fresh=min_fresh)] = f"weather cell {cell}"
+
+        for future in as_completed(futures):
+            try:
+                counts['fetched' if future.result() else 'skipped'] += 1
+            except requests.exceptions.RequestException as e:
+                counts['failed'] += 1
+                logger.warning("Warming %s failed: %s", futures[future], e)
+    return counts
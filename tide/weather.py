@@ -0,0 +1,79 @@
+# File: weather.py
+# Author: Paul Martin Enano (enano1@bu.edu) November 11th, 2024
+# Description: OpenWeatherMap client with a cache bucketed by latitude/longitude grid cell.
+
+from decouple import config
+from django.conf import settings
+
+from . import upstream
+from .cache import StaleWhileRevalidateCache
+
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+DEFAULT_GRID_RESOLUTION = 0.05  # degrees, roughly 5 km
+DEFAULT_WEATHER_TTL = 10 * 60   # OpenWeather refreshes current conditions about every 10 minutes
+
+weather_cache = StaleWhileRevalidateCache(
+    'weather',
+    stale_ttl=getattr(settings, 'WEATHER_CACHE_STALE_TTL', 5 * 60),
+)
+
+
+def grid_resolution():
+    return getattr(settings, 'WEATHER_GRID_RESOLUTION', DEFAULT_GRID_RESOLUTION)
+
+
+def grid_cell(lat, lon, resolution=None):
+    """Return the integer (row, column) of the grid cell containing (lat, lon)."""
+    resolution = resolution or grid_resolution()
+    return round(float(lat) / resolution), round(float(lon) / resolution)
+
+
+def cell_center(cell, resolution=None):
+    """Return the (lat, lon) at the centre of a grid cell."""
+    resolution = resolution or grid_resolution()
+    return round(cell[0] * resolution, 6), round(cell[1] * resolution, 6)
+
+
+def fetch_weather(lat, lon, units='imperial'):
+    """
+    Request current conditions from OpenWeatherMap. Raises requests.exceptions.RequestException
+    on failure, including upstream.UpstreamUnavailable while OpenWeather's circuit is open.
+    """
+    params = {
+        'lat': lat,
+        'lon': lon,
+        'appid': config('OPENWEATHER_API_KEY'),
+        'units': units,
+    }
+    return upstream.openweather.get_json(OPENWEATHER_URL, params)
+
+
+def get_weather(lat, lon, units='imperial'):
+    """
+    Current weather for (lat, lon), shared by every coordinate in the same grid cell.
+    Misses fetch the weather at the cell centre; concurrent misses for a cell share one call.
+    """
+    resolution = grid_resolution()
+    cell = grid_cell(lat, lon, resolution)
+    center_lat, center_lon = cell_center(cell, resolution)
+    return weather_cache.get(
+        (resolution, cell[0], cell[1], units),
+        lambda: fetch_weather(center_lat, center_lon, units),
+        ttl=getattr(settings, 'WEATHER_CACHE_TTL', DEFAULT_WEATHER_TTL),
+    )
+
+
+def warm_weather(cell, units='imperial', min_fresh=0):
+    """
+    Pre-fetch a grid cell's current conditions unless they are still fresh for
+    min_fresh seconds. Returns True when OpenWeatherMap was called.
+    """
+    resolution = grid_resolution()
+    center_lat, center_lon = cell_center(cell, resolution)
+    return weather_cache.warm(
+        (resolution, cell[0], cell[1], units),
+        lambda: fetch_weather(center_lat, center_lon, units),
+        ttl=getattr(settings, 'WEATHER_CACHE_TTL', DEFAULT_WEATHER_TTL),
+        min_fresh=min_fresh,
+    )